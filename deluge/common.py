@@ -612,6 +612,52 @@ def utf8_encoded(s):
         s = s.encode("utf8", "ignore")
     return s
 
+# The piece states sent in the "pieces" torrent status key
+PIECE_MISSING = 0
+PIECE_WAITING = 1
+PIECE_DOWNLOADING = 2
+PIECE_COMPLETED = 3
+
+# The 4 piece states held in each byte of the packed pieces
+_UNPACKED_PIECES = [(byte >> 6, byte >> 4 & 3, byte >> 2 & 3, byte & 3)
+                    for byte in xrange(256)]
+
+def pack_pieces(states):
+    """
+    Packs a list of piece states into a string, using 2 bits per piece, with
+    the first piece in the highest bits of the first byte.
+
+    :param states: the piece states, from 0 to 3
+    :type states: list of int
+    :returns: the packed piece states
+    :rtype: string
+
+    """
+    states = list(states)
+    states.extend([PIECE_MISSING] * (-len(states) % 4))
+    return str(bytearray([a << 6 | b << 4 | c << 2 | d for a, b, c, d in
+                          zip(states[0::4], states[1::4],
+                              states[2::4], states[3::4])]))
+
+def unpack_pieces(data, num_pieces):
+    """
+    Unpacks the piece states packed by `:func:pack_pieces`.
+
+    :param data: the packed piece states
+    :type data: string
+    :param num_pieces: the number of pieces in the torrent
+    :type num_pieces: int
+    :returns: the piece states
+    :rtype: list of int
+
+    """
+    states = []
+    extend = states.extend
+    for byte in bytearray(data):
+        extend(_UNPACKED_PIECES[byte])
+    del states[num_pieces:]
+    return states
+
 class VersionSplit(object):
     """
     Used for comparing version numbers.
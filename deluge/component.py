@@ -61,7 +61,8 @@ class Component(object):
 
         **update()** - This method is called every 1 second by default while the
                    Componented is in a *Started* state.  The interval can be
-                   specified during instantiation.  The update() timer can be
+                   specified during instantiation, and changed with
+                   :meth:`set_update_interval`.  The update() timer can be
                    paused by instructing the :class:`ComponentRegistry` to pause
                    this Component.
 
@@ -107,6 +108,22 @@ def _component_start_timer(self):
             self._component_timer = LoopingCall(self.update)
             self._component_timer.start(self._component_interval)
 
+    def set_update_interval(self, interval):
+        """
+        Changes how often update() is called, from the next call on.  It can
+        be called from update().
+
+        :param interval: the new interval, in seconds
+        :type interval: float
+
+        """
+        self._component_interval = interval
+        if self._component_timer and self._component_timer.running:
+            # A running LoopingCall can't be given a new interval, replace it
+            self._component_timer.stop()
+            self._component_timer = LoopingCall(self.update)
+            self._component_timer.start(interval, now=False)
+
     def _component_start(self):
         def on_start(result):
             self._component_state = "Started"
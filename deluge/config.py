@@ -71,6 +71,8 @@
 import logging
 import shutil
 import os
+import atexit
+import threading
 
 import deluge.common
 
@@ -122,6 +124,139 @@ def find_json_objects(s):
 
     return objects
 
+def write_config_file(filename, data):
+    """
+    Writes the data of a config file to disk, replacing the existing file
+    atomically and keeping it as a backup.
+
+    :param filename: the path of the config file
+    :type filename: string
+    :param data: the serialized config
+    :type data: string
+
+    :returns: whether or not the write succeeded
+    :rtype: bool
+
+    """
+    # Save the new config and make sure it's written to disk
+    try:
+        log.debug("Saving new config file %s", filename + ".new")
+        f = open(filename + ".new", "wb")
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+    except (IOError, OSError), e:
+        log.error("Error writing new config file: %s", e)
+        return False
+
+    # Make a backup of the old config
+    try:
+        if os.path.exists(filename):
+            log.debug("Backing up old config file to %s~", filename)
+            shutil.copy2(filename, filename + "~")
+    except Exception, e:
+        log.error("Error backing up old config..")
+
+    # The new config file has been written successfully, so let's move it over
+    # the existing one.
+    try:
+        log.debug("Moving new config file %s to %s..", filename + ".new", filename)
+        if deluge.common.windows_check() and os.path.exists(filename):
+            os.remove(filename)
+        os.rename(filename + ".new", filename)
+    except Exception, e:
+        log.error("Error moving new config file: %s", e)
+        return False
+    return True
+
+class ConfigWriter(object):
+    """
+    Writes the config files from a background thread, so that the disk writes
+    and fsyncs don't block the reactor.  When a file is saved again before
+    its previous save was written, only the latest data is written.
+    """
+    def __init__(self):
+        # The data waiting to be written {filename: (config, data)}
+        self.__pending = {}
+        # The filenames being written
+        self.__writing = set()
+        self.__condition = threading.Condition()
+        self.__thread = None
+
+    def write(self, config, filename, data):
+        """
+        Queues the data of a config file to be written, unless it's the data
+        already saved and no other save of the file is waiting to be written.
+
+        :param config: the config the data is from
+        :type config: :class:`Config`
+        :param filename: the path of the config file
+        :type filename: string
+        :param data: the serialized config
+        :type data: string
+
+        """
+        self.__condition.acquire()
+        try:
+            if filename not in self.__pending and \
+                    filename not in self.__writing and \
+                    data == config._saved_data:
+                return
+            self.__pending[filename] = (config, data)
+            if not self.__thread or not self.__thread.isAlive():
+                self.__thread = threading.Thread(target=self.run,
+                                                 name="ConfigWriter")
+                self.__thread.setDaemon(True)
+                self.__thread.start()
+            self.__condition.notifyAll()
+        finally:
+            self.__condition.release()
+
+    def flush(self):
+        """
+        Blocks until all the queued config files have been written to disk.
+        """
+        self.__condition.acquire()
+        try:
+            while self.__pending or self.__writing:
+                self.__condition.wait()
+        finally:
+            self.__condition.release()
+
+    def run(self):
+        while True:
+            self.__condition.acquire()
+            try:
+                while not self.__pending:
+                    self.__condition.wait()
+                filename, (config, data) = self.__pending.popitem()
+                self.__writing.add(filename)
+            finally:
+                self.__condition.release()
+
+            written = False
+            try:
+                written = write_config_file(filename, data)
+            except Exception, e:
+                # Keep the thread running, flush() would wait on it forever
+                log.error("Error saving config file %s", filename)
+                log.exception(e)
+            finally:
+                self.__condition.acquire()
+                try:
+                    if written:
+                        config._on_written(filename, data)
+                    self.__writing.discard(filename)
+                    self.__condition.notifyAll()
+                finally:
+                    self.__condition.release()
+
+_writer = ConfigWriter()
+
+# Make sure the saves still being written aren't lost when exiting
+atexit.register(_writer.flush)
+
 
 class Config(object):
     """
@@ -147,6 +282,10 @@ def __init__(self, filename, defaults=None, config_dir=None):
         # is set.
         self._save_timer = None
 
+        # The serialized config last written to, or loaded from, the file.
+        # It is compared to rather than reading the file back on each save.
+        self._saved_data = None
+
         if defaults:
             for key, value in defaults.iteritems():
                 self.set_item(key, value)
@@ -233,9 +372,20 @@ def do_change_callbacks(key, value):
         except:
             pass
 
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        """
+        Marks the config as changed so that it will be saved soon.  Several
+        changes within a few seconds are coalesced into a single save, which
+        is written to disk from a background thread.  This should be used
+        instead of :meth:`save` after changing the config in place, eg. a
+        dict value.
+        """
+        from twisted.internet import reactor
         # We set the save_timer for 5 seconds if not already set
         if not self._save_timer or not self._save_timer.active():
-            self._save_timer = reactor.callLater(5, self.save)
+            self._save_timer = reactor.callLater(5, self.save_in_background)
 
     def __getitem__(self, key):
         """
@@ -287,10 +437,7 @@ def del_item(self, key):
         >>> del config["test"]
         """
         del self.__config[key]
-        # We set the save_timer for 5 seconds if not already set
-        from twisted.internet import reactor
-        if not self._save_timer or not self._save_timer.active():
-            self._save_timer = reactor.callLater(5, self.save)
+        self.mark_dirty()
 
 
     def register_change_callback(self, callback):
@@ -388,6 +535,9 @@ def load(self, filename=None):
             log.warning("Unable to open config file %s: %s", filename, e)
             return
 
+        if filename == self.__config_file:
+            self._saved_data = data
+
         objects = find_json_objects(data)
 
         if not len(objects):
@@ -419,65 +569,59 @@ def load(self, filename=None):
 
     def save(self, filename=None):
         """
-        Save configuration to disk
+        Save configuration to disk, the file is only written if the config
+        changed since it was last saved.
 
         :param filename: if None, uses filename set in object initiliazation
         :rtype bool:
         :return: whether or not the save succeeded.
 
         """
+        if self._save_timer and self._save_timer.active():
+            self._save_timer.cancel()
+
         if not filename:
             filename = self.__config_file
-        # Check to see if the current config differs from the one on disk
-        # We will only write a new config file if there is a difference
-        try:
-            data = open(filename, "rb").read()
-            objects = find_json_objects(data)
-            start, end = objects[0]
-            version = json.loads(data[start:end])
-            start, end = objects[1]
-            loaded_data = json.loads(data[start:end])
-            if self.__config == loaded_data and self.__version == version:
-                # The config has not changed so lets just return
-                if self._save_timer and self._save_timer.active():
-                    self._save_timer.cancel()
-                return True
-        except IOError, e:
-            log.warning("Unable to open config file: %s because: %s", filename, e)
+        data = self.__serialize()
+        # Wait for any background save, so that it can't overwrite this one
+        # and the saved data is up to date
+        _writer.flush()
+        if filename == self.__config_file and data == self._saved_data:
+            # The config has not changed so lets just return
+            return True
 
-        # Save the new config and make sure it's written to disk
-        try:
-            log.debug("Saving new config file %s", filename + ".new")
-            f = open(filename + ".new", "wb")
-            json.dump(self.__version, f, indent=2)
-            json.dump(self.__config, f, indent=2)
-            f.flush()
-            os.fsync(f.fileno())
-            f.close()
-        except IOError, e:
-            log.error("Error writing new config file: %s", e)
+        if not write_config_file(filename, data):
             return False
+        self._on_written(filename, data)
+        return True
 
-        # Make a backup of the old config
-        try:
-            log.debug("Backing up old config file to %s~", filename)
-            shutil.move(filename, filename + "~")
-        except Exception, e:
-            log.error("Error backing up old config..")
+    def save_in_background(self):
+        """
+        Saves the config like :meth:`save`, but the file is written from a
+        background thread.  Use :meth:`flush` to wait for it to be written.
+        """
+        if self._save_timer and self._save_timer.active():
+            self._save_timer.cancel()
 
-        # The new config file has been written successfully, so let's move it over
-        # the existing one.
-        try:
-            log.debug("Moving new config file %s to %s..", filename + ".new", filename)
-            shutil.move(filename + ".new", filename)
-        except Exception, e:
-            log.error("Error moving new config file: %s", e)
-            return False
-        else:
-            return True
-        finally:
-            if self._save_timer and self._save_timer.active():
-                self._save_timer.cancel()
+        _writer.write(self, self.__config_file, self.__serialize())
+
+    def flush(self):
+        """
+        Writes any pending changes to disk and blocks until all the config
+        files being saved in the background have been written.
+        """
+        if self._save_timer and self._save_timer.active():
+            self.save_in_background()
+        _writer.flush()
+
+    def _on_written(self, filename, data):
+        # Called from the ConfigWriter's thread with its lock held
+        if filename == self.__config_file:
+            self._saved_data = data
+
+    def __serialize(self):
+        return json.dumps(self.__version, indent=2) + \
+            json.dumps(self.__config, indent=2)
 
     def run_converter(self, input_range, output_version, func):
         """
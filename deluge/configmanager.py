@@ -109,6 +109,12 @@ def save(self):
         # We need to return True to keep the timer active
         return True
 
+    def flush(self):
+        """Writes any pending changes of the configs and waits until they
+        are on disk."""
+        for value in self.config_files.values():
+            value.flush()
+
     def get_config(self, config_file, defaults=None):
         """Get a reference to the Config object for this filename"""
         log.debug("Getting config '%s'", config_file)
@@ -136,3 +142,7 @@ def get_config_dir(filename=None):
 
 def close(config):
     return _configmanager.close(config)
+
+def flush():
+    """Makes sure all the config changes have been written to disk"""
+    return _configmanager.flush()
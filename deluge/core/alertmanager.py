@@ -49,10 +49,15 @@
 
 log = logging.getLogger(__name__)
 
+# The alerts are polled every MIN_INTERVAL seconds while they keep coming, the
+# interval doubles every time there were none up to MAX_INTERVAL seconds.
+MIN_INTERVAL = 0.05
+MAX_INTERVAL = 0.5
+
 class AlertManager(component.Component):
     def __init__(self):
         log.debug("AlertManager initialized..")
-        component.Component.__init__(self, "AlertManager", interval=0.05)
+        component.Component.__init__(self, "AlertManager", interval=MIN_INTERVAL)
         self.session = component.get("Core").session
 
         self.session.set_alert_mask(
@@ -64,14 +69,42 @@ def __init__(self):
             lt.alert.category_t.ip_block_notification |
             lt.alert.category_t.performance_warning)
 
+        # The size of libtorrent's alert queue, None if it isn't known
+        try:
+            self.alert_queue_size = self.session.settings().alert_queue_size
+        except AttributeError:
+            self.alert_queue_size = None
+
         # handlers is a dictionary of lists {"alert_type": [handler1,h2,..]}
         self.handlers = {}
+        # The handlers resolved for each alert class {alert_class: [handlers]}
+        self.handlers_by_class = {}
 
         self.delayed_calls = []
 
+        # The interval the alerts are currently polled at
+        self.poll_interval = MIN_INTERVAL
+
+        # The counters returned by get_stats()
+        self.stats = {
+            "alerts": 0,
+            "handled": 0,
+            "ignored": 0,
+            "batches": 0,
+            "queue_depth": 0,
+            "max_queue_depth": 0,
+            "queue_full": 0
+        }
+
     def update(self):
         self.delayed_calls = [dc for dc in self.delayed_calls if dc.active()]
-        self.handle_alerts()
+        if self.handle_alerts():
+            interval = MIN_INTERVAL
+        else:
+            interval = min(self.poll_interval * 2, MAX_INTERVAL)
+        if interval != self.poll_interval:
+            self.poll_interval = interval
+            self.set_update_interval(interval)
 
     def stop(self):
         for dc in self.delayed_calls:
@@ -94,6 +127,7 @@ def register_handler(self, alert_type, handler):
 
         # Append the handler to the list in the handlers dictionary
         self.handlers[alert_type].append(handler)
+        self.handlers_by_class = {}
         log.debug("Registered handler for alert %s", alert_type)
 
     def deregister_handler(self, handler):
@@ -107,27 +141,122 @@ def deregister_handler(self, handler):
             if handler in value:
                 # Handler is in this alert type list
                 value.remove(handler)
+        self.handlers_by_class = {}
+
+    def get_handlers(self, alert):
+        """
+        Returns the handlers registered for the type of alert, they are
+        looked up by name only once per alert class.
+
+        :param alert: the libtorrent alert
+        :returns: the handler functions
+        :rtype: list
+
+        """
+        try:
+            return self.handlers_by_class[type(alert)]
+        except KeyError:
+            handlers = tuple(self.handlers.get(type(alert).__name__, ()))
+            self.handlers_by_class[type(alert)] = handlers
+            return handlers
+
+    def pop_alerts(self):
+        """
+        Pops all the libtorrent alerts in the session queue.
+
+        :returns: the alerts
+        :rtype: list
+
+        """
+        if hasattr(self.session, "pop_alerts"):
+            return self.session.pop_alerts()
+
+        alerts = []
+        alert = self.session.pop_alert()
+        while alert is not None:
+            alerts.append(alert)
+            alert = self.session.pop_alert()
+        return alerts
 
     def handle_alerts(self, wait=False):
         """
         Pops all libtorrent alerts in the session queue and handles them
-        appropriately.
+        appropriately.  The handlers for all the alerts are called in order
+        during a single reactor turn.
 
         :param wait: bool, if True then the handler functions will be run right
             away and waited to return before processing the next alert
+
+        :returns: the number of alerts popped
+        :rtype: int
         """
-        alert = self.session.pop_alert()
-        # Loop through all alerts in the queue
-        while alert is not None:
-            alert_type = type(alert).__name__
-            # Display the alert message
-            log.debug("%s: %s", alert_type, alert.message())
-            # Call any handlers for this alert type
-            if alert_type in self.handlers:
-                for handler in self.handlers[alert_type]:
-                    if not wait:
-                        self.delayed_calls.append(reactor.callLater(0, handler, alert))
-                    else:
-                        handler(alert)
+        alerts = self.pop_alerts()
+        if not alerts:
+            return 0
 
-            alert = self.session.pop_alert()
+        self.update_stats(alerts)
+
+        batch = []
+        debug = log.isEnabledFor(logging.DEBUG)
+        for alert in alerts:
+            if debug:
+                # Display the alert message
+                log.debug("%s: %s", type(alert).__name__, alert.message())
+            handlers = self.get_handlers(alert)
+            if handlers:
+                batch.append((alert, handlers))
+
+        self.stats["handled"] += len(batch)
+        self.stats["ignored"] += len(alerts) - len(batch)
+        if batch:
+            if wait:
+                self.dispatch_alerts(batch)
+            else:
+                self.delayed_calls.append(
+                    reactor.callLater(0, self.dispatch_alerts, batch))
+        return len(alerts)
+
+    def dispatch_alerts(self, batch):
+        """
+        Calls the handlers of a batch of alerts.
+
+        :param batch: the alerts and their handlers
+        :type batch: list of (alert, handlers) tuples
+
+        """
+        for alert, handlers in batch:
+            for handler in handlers:
+                try:
+                    handler(alert)
+                except Exception, e:
+                    log.error("Error handling %s", type(alert).__name__)
+                    log.exception(e)
+
+    def update_stats(self, alerts):
+        self.stats["alerts"] += len(alerts)
+        self.stats["batches"] += 1
+        self.stats["queue_depth"] = len(alerts)
+        if len(alerts) > self.stats["max_queue_depth"]:
+            self.stats["max_queue_depth"] = len(alerts)
+
+        # libtorrent drops the alerts which don't fit in its queue
+        if self.alert_queue_size is None:
+            return
+        if len(alerts) >= self.alert_queue_size:
+            self.stats["queue_full"] += 1
+            log.warning("The alert queue was full, %s alerts were popped and "
+                        "some may have been dropped", len(alerts))
+
+    def get_stats(self):
+        """
+        Returns the alert counters.
+
+        :returns: the number of alerts popped ("alerts"), handled or ignored as
+            they have no handlers ("handled", "ignored"), the number of times
+            the alerts were popped ("batches"), the number of alerts popped the
+            last time and at most ("queue_depth", "max_queue_depth") and how
+            many times the libtorrent alert queue was full ("queue_full")
+        :rtype: dict
+
+        """
+        return self.stats.copy()
@@ -44,6 +44,8 @@
 import tempfile
 from urlparse import urljoin
 
+from twisted.internet import threads
+from twisted.internet.defer import DeferredList
 import twisted.web.client
 import twisted.web.error
 
@@ -63,6 +65,9 @@
 from deluge.core.preferencesmanager import PreferencesManager
 from deluge.core.authmanager import AuthManager
 from deluge.core.eventmanager import EventManager
+from deluge.core.statustable import StatusTable
+from deluge.core.statuscache import StatusCache
+from deluge.core.statuspublisher import StatusPublisher
 from deluge.core.rpcserver import export
 
 log = logging.getLogger(__name__)
@@ -114,6 +119,13 @@ def __init__(self, listen_interface=None):
         self.torrentmanager = TorrentManager()
         self.filtermanager = FilterManager(self)
         self.authmanager = AuthManager()
+        # Keeps the status held by the torrents up to date
+        self.statuscache = StatusCache(self)
+
+        # Serves the bulk torrent status requests
+        self.statustable = StatusTable(self)
+        # Pushes the status changes to the subscribed sessions
+        self.statuspublisher = StatusPublisher(self)
 
         # New release check information
         self.new_release = None
@@ -236,6 +248,69 @@ def add_torrent_file(self, filename, filedump, options):
 
         return torrent_id
 
+    @export
+    def add_torrent_files(self, torrent_files):
+        """
+        Adds several torrent files to the session in one pass.  The files are
+        decoded in the reactor's thread pool and then added together, writing
+        the session state only once.  A `TorrentsAddedEvent` is emitted with
+        the torrents that were added.
+
+        :param torrent_files: the (filename, filedump, options) of each torrent
+            to add, with filedump a base64 encoded string of the torrent file
+            contents
+        :type torrent_files: list of tuples
+
+        :returns: a Deferred which returns a (success, result) tuple for each
+            torrent file, where result is the torrent_id or an error message
+        :rtype: twisted.internet.defer.Deferred
+
+        """
+        # The owner has to be looked up now, as the session is no longer
+        # known once the files have been decoded.
+        owner = component.get("RPCServer").get_session_user()
+
+        def decode_torrent_file(filedump):
+            filedump = base64.decodestring(filedump)
+            return filedump, lt.torrent_info(lt.bdecode(filedump))
+
+        def on_decoded(results):
+            torrents = []
+            for (filename, filedump, options), (success, result) in \
+                    zip(torrent_files, results):
+                if not success:
+                    log.error("Unable to decode torrent file %s: %s",
+                              filename, result.getErrorMessage())
+                    continue
+                filedump, torrent_info = result
+                torrents.append({
+                    "torrent_info": torrent_info,
+                    "filedump": filedump,
+                    "options": options,
+                    "filename": filename,
+                    "owner": owner
+                })
+
+            torrent_ids = iter(self.torrentmanager.add_multiple(torrents))
+            added = []
+            for success, result in results:
+                if not success:
+                    added.append((False, result.getErrorMessage()))
+                    continue
+                torrent_id = torrent_ids.next()
+                if torrent_id:
+                    added.append((True, torrent_id))
+                else:
+                    added.append((False, "Unable to add torrent"))
+            return added
+
+        d = DeferredList([
+            threads.deferToThread(decode_torrent_file, filedump)
+            for filename, filedump, options in torrent_files
+        ], consumeErrors=True)
+        d.addCallback(on_decoded)
+        return d
+
     @export
     def add_torrent_url(self, url, options, headers=None):
         """
@@ -252,8 +327,27 @@ def add_torrent_url(self, url, options, headers=None):
         :returns: a Deferred which returns the torrent_id as a str or None
         """
         log.info("Attempting to add url %s", url)
-        def on_download_success(filename):
+        def on_download_success((filename, filedump)):
             # We got the file, so add it to the session
+            return self.add_torrent_file(filename, filedump, options)
+
+        d = self.download_torrent_file(url, headers)
+        d.addCallback(on_download_success)
+        return d
+
+    def download_torrent_file(self, url, headers=None):
+        """
+        Downloads a torrent file to a temporary file and reads it back.
+
+        :param url: the url pointing to the torrent file
+        :type url: string
+        :param headers: any optional headers to send
+        :type headers: dict
+
+        :returns: a Deferred which returns a (filename, filedump) tuple, with
+            filedump base64 encoded
+        """
+        def on_download_success(filename):
             f = open(filename, "rb")
             data = f.read()
             f.close()
@@ -261,9 +355,7 @@ def on_download_success(filename):
                 os.remove(filename)
             except Exception, e:
                 log.warning("Couldn't remove temp file: %s", e)
-            return self.add_torrent_file(
-                filename, base64.encodestring(data), options
-            )
+            return filename, base64.encodestring(data)
 
         def on_download_fail(failure):
             if failure.check(twisted.web.error.PageRedirect):
@@ -445,13 +537,7 @@ def get_torrents_status(self, filter_dict, keys, diff=False):
         returns all torrents , optionally filtered by filter_dict.
         """
         torrent_ids = self.filtermanager.filter_torrent_ids(filter_dict)
-        status_dict = {}.fromkeys(torrent_ids)
-
-        # Get the torrent status for each torrent_id
-        for torrent_id in torrent_ids:
-            status_dict[torrent_id] = self.get_torrent_status(torrent_id, keys, diff)
-
-        return status_dict
+        return self.statustable.get_status(torrent_ids, keys, diff)
 
     @export
     def get_filter_tree(self , show_zero_hits=True, hide_cat=None):
@@ -467,6 +553,42 @@ def get_session_state(self):
         # Get the torrent list from the TorrentManager
         return self.torrentmanager.get_torrent_list()
 
+    @export
+    def get_session_restore_progress(self):
+        """
+        Returns how far the daemon has got restoring the torrents from the
+        session state on startup.
+
+        :returns: the number of torrents restored and the number to restore
+        :rtype: tuple
+
+        """
+        return self.torrentmanager.get_restore_progress()
+
+    @export
+    def get_resume_data_stats(self):
+        """
+        Returns how often the torrents' resume data was saved, or skipped
+        because it hadn't changed.
+
+        :returns: the "saved", "skipped", "failed" and "queued" counters
+        :rtype: dict
+
+        """
+        return self.torrentmanager.get_resume_data_stats()
+
+    @export
+    def get_alert_stats(self):
+        """
+        Returns the counters of the libtorrent alerts handled, see
+        :meth:`deluge.core.alertmanager.AlertManager.get_stats`.
+
+        :returns: the alert counters
+        :rtype: dict
+
+        """
+        return self.alertmanager.get_stats()
+
     @export
     def get_config(self):
         """Get all the preferences as a dictionary"""
@@ -543,11 +665,16 @@ def set_torrent_options(self, torrent_ids, options):
         """Sets the torrent options for torrent_ids"""
         for torrent_id in torrent_ids:
             self.torrentmanager[torrent_id].set_options(options)
+        self.torrentmanager.save_torrents_state(torrent_ids)
 
     @export
     def set_torrent_trackers(self, torrent_id, trackers):
         """Sets a torrents tracker list.  trackers will be [{"url", "tier"}]"""
-        return self.torrentmanager[torrent_id].set_trackers(trackers)
+        result = self.torrentmanager[torrent_id].set_trackers(trackers)
+        self.filtermanager.update_index(torrent_id, "tracker_host")
+        self.filtermanager.update_search_indexes(torrent_id)
+        self.torrentmanager.save_torrents_state([torrent_id])
+        return result
 
     @export
     def set_torrent_max_connections(self, torrent_id, value):
@@ -631,6 +758,8 @@ def set_torrents_owner(self, torrent_ids, username):
             torrent_ids = [torrent_ids]
         for torrent_id in torrent_ids:
             self.torrentmanager[torrent_id].set_owner(username)
+            self.filtermanager.update_index(torrent_id, "owner")
+        self.torrentmanager.save_torrents_state(torrent_ids)
         return None
 
     @export
@@ -35,7 +35,6 @@
 import os
 import logging
 from twisted.internet import reactor
-import twisted.internet.error
 
 import deluge.component as component
 import deluge.configmanager
@@ -109,7 +108,7 @@ def get_proclist():
             def win_handler(ctrl_type):
                 log.debug("ctrl_type: %s", ctrl_type)
                 if ctrl_type == CTRL_CLOSE_EVENT or ctrl_type == CTRL_SHUTDOWN_EVENT:
-                    self._shutdown()
+                    reactor.callFromThread(reactor.stop)
                     return 1
             SetConsoleCtrlHandler(win_handler)
 
@@ -155,11 +154,12 @@ def win_handler(ctrl_type):
             open(deluge.configmanager.get_config_dir("deluged.pid"), "wb").write(
                 "%s;%s\n" % (os.getpid(), port))
 
+            # The components are shutdown before the reactor stops, so that
+            # they can still wait on it, e.g. for the torrents to pause.
+            reactor.addSystemEventTrigger("before", "shutdown", self._shutdown)
+
             component.start()
-            try:
-                reactor.run()
-            finally:
-                self._shutdown()
+            reactor.run()
 
     @export()
     def shutdown(self, *args, **kwargs):
@@ -172,11 +172,14 @@ def _shutdown(self, *args, **kwargs):
             log.exception(e)
             log.error("Error removing deluged.pid!")
 
-        component.shutdown()
-        try:
-            reactor.stop()
-        except twisted.internet.error.ReactorNotRunning:
-            log.debug("Tried to stop the reactor but it is not running..")
+        def on_shutdown(result):
+            # Make sure the config changes made on shutdown are on disk
+            deluge.configmanager.flush()
+            return result
+
+        d = component.shutdown()
+        d.addBoth(on_shutdown)
+        return d
 
     @export()
     def get_method_list(self):
@@ -185,6 +188,46 @@ def get_method_list(self):
         """
         return self.rpcserver.get_method_list()
 
+    @export()
+    def get_event_stats(self):
+        """
+        Returns the number of times each event was emitted, and sent to the
+        interested sessions.
+
+        :returns: a dict of {event_name: (emitted, sent)}
+        :rtype: dict
+        """
+        return self.rpcserver.get_event_stats()
+
+    @export()
+    def subscribe_status(self, filter_dict, keys, interval=1.0):
+        """
+        Subscribes this session to status updates of the torrents matching
+        `filter_dict`.  Every `interval` seconds, the values that changed are
+        sent to the session in a TorrentsStatusUpdatedEvent.  A session only
+        has one subscription, subscribing again replaces it.
+
+        :param filter_dict: the filter, see `core.get_torrents_status`
+        :type filter_dict: dict
+        :param keys: the status keys to send, an empty list means all keys
+        :type keys: list
+        :param interval: how often, in seconds, the changes are sent
+        :type interval: float
+
+        :returns: the current status of the matching torrents
+        :rtype: dict
+
+        """
+        return self.core.statuspublisher.subscribe(
+            self.rpcserver.get_session_id(), filter_dict, keys, interval)
+
+    @export()
+    def unsubscribe_status(self):
+        """
+        Stops the status updates to this session.
+        """
+        self.core.statuspublisher.unsubscribe(self.rpcserver.get_session_id())
+
     @export(1)
     def authorized_call(self, rpc):
         """
@@ -33,13 +33,20 @@
 #
 #
 
+import time
 import logging
 import deluge.component as component
+from deluge.core.authmanager import AUTH_LEVEL_ADMIN
+from deluge.core.searchindex import SearchIndex, to_unicode
 
 STATE_SORT = ["All", "Downloading", "Seeding", "Active", "Paused", "Queued"]
 
 log = logging.getLogger(__name__)
 
+# The torrents with more files than this don't have their file paths in the
+# keyword index, the keyword filter looks through their files instead
+MAX_KEYWORD_INDEX_FILES = 1000
+
 #special purpose filters:
 def filter_keywords(torrent_ids, values):
     #cleanup.
@@ -56,71 +63,65 @@ def filter_one_keyword(torrent_ids, keyword):
     search torrent on keyword.
     searches title,state,tracker-status,tracker,files
     """
-    all_torrents = component.get("TorrentManager").torrents
-    #filter:
-    found = False
-    for torrent_id in torrent_ids:
-        torrent = all_torrents[torrent_id]
-        if keyword in torrent.filename.lower():
-            yield torrent_id
-        elif keyword in torrent.state.lower():
-            yield torrent_id
-        elif torrent.trackers and keyword in torrent.trackers[0]["url"]:
-            yield torrent_id
-        elif keyword in torrent_id:
-            yield torrent_id
-        #i want to find broken torrents (search on "error", or "unregistered")
-        elif keyword in torrent.tracker_status.lower():
-            yield torrent_id
-        else:
-            for t_file in torrent.get_files():
-                if keyword in t_file["path"].lower():
-                    yield torrent_id
-                    break
+    filtermanager = component.get("FilterManager")
+    # The filename, tracker, torrent_id and files
+    matches = filtermanager.keyword_index.search(keyword)
+    for torrent_id in filtermanager.keyword_unindexed_files:
+        if torrent_id in matches:
+            continue
+        for t_file in filtermanager.torrents[torrent_id].get_files():
+            if keyword in t_file["path"].lower():
+                matches.add(torrent_id)
+                break
+    #i want to find broken torrents (search on "error", or "unregistered")
+    for field in ("state", "tracker_status"):
+        for value, ids in filtermanager.indexes[field].iteritems():
+            if keyword in value.lower():
+                matches.update(ids)
+
+    return [torrent_id for torrent_id in torrent_ids if torrent_id in matches]
 
 def filter_by_name(torrent_ids, search_string):
-    all_torrents = component.get("TorrentManager").torrents
+    filtermanager = component.get("FilterManager")
     try:
         search_string, match_case = search_string[0].split('::match')
     except ValueError:
         search_string = search_string[0]
         match_case = False
 
-    if match_case is False:
-        search_string = search_string.lower()
-
-    for torrent_id in torrent_ids:
-        torrent_name = all_torrents[torrent_id].get_name()
-        if match_case is False:
-            torrent_name = all_torrents[torrent_id].get_name().lower()
-        else:
-            torrent_name = all_torrents[torrent_id].get_name()
+    matches = filtermanager.name_index.search(search_string)
+    if match_case is not False:
+        # The index ignores case, so check the candidates
+        all_torrents = filtermanager.torrents
+        matches = [torrent_id for torrent_id in matches
+                   if search_string in all_torrents[torrent_id].get_name()]
 
-        if search_string in torrent_name:
-            yield torrent_id
+    return [torrent_id for torrent_id in torrent_ids if torrent_id in matches]
 
 def tracker_error_filter(torrent_ids, values):
-    filtered_torrent_ids = []
-    tm = component.get("TorrentManager")
+    filtermanager = component.get("FilterManager")
 
     # If this is a tracker_host, then we need to filter on it
     if values[0] != "Error":
-        for torrent_id in torrent_ids:
-            if values[0] == tm[torrent_id].get_status(["tracker_host"])["tracker_host"]:
-                filtered_torrent_ids.append(torrent_id)
-        return filtered_torrent_ids
-
-    # Check all the torrent's tracker_status for 'Error:' and only return torrent_ids
-    # that have this substring in their tracker_status
-    for torrent_id in torrent_ids:
-        if _("Error") + ":" in tm[torrent_id].get_status(["tracker_status"])["tracker_status"]:
-            filtered_torrent_ids.append(torrent_id)
+        matches = filtermanager.indexes["tracker_host"].get(values[0], ())
+        return [torrent_id for torrent_id in torrent_ids if torrent_id in matches]
 
-    return filtered_torrent_ids
+    # Only return the torrent_ids that have 'Error:' in their tracker_status
+    return [torrent_id for torrent_id in torrent_ids
+            if torrent_id in filtermanager.tracker_errors]
 
 class FilterManager(component.Component):
     """FilterManager
 
+    The values of the state, tracker_host and owner fields, and of the tree
+    fields registered as indexed, are kept in inverted indexes which are
+    updated as the torrents change.  Filtering and counting on those fields
+    doesn't need the status of the torrents, the size of each index entry is
+    the count shown in the filter tree.
+
+    With `check_indexes` set, every :meth:`get_filter_tree` call compares the
+    indexes with a full recount and logs any difference.
+
     """
     def __init__(self, core):
         component.Component.__init__(self, "FilterManager")
@@ -132,16 +133,70 @@ def __init__(self, core):
         self.register_filter("name", filter_by_name)
         self.tree_fields = {}
 
-        self.register_tree_field("state", self._init_state_tree)
+        # The inverted indexes {field: {value: set(torrent_ids)}, ...}
+        self.indexes = {}
+        # The indexed value of each torrent {field: {torrent_id: value}, ...}
+        self.index_values = {}
+        # The torrents with an error in their tracker_status
+        self.tracker_errors = set()
+        # Compare the indexes with a full recount on each get_filter_tree
+        self.check_indexes = False
+        # The number of active torrents is only recounted once per status tick
+        self.active_count = 0
+        self.active_count_time = 0.0
+        # How to get the value of the fields indexed by default
+        self.index_getters = {
+            "state": lambda torrent: torrent.state,
+            "tracker_host": lambda torrent: torrent.get_tracker_host(),
+            "owner": lambda torrent: torrent.owner,
+            "tracker_status": lambda torrent: torrent.tracker_status
+        }
+        # Not a tree field, the keyword filter searches the distinct values
+        self.create_index("tracker_status")
+
+        # The search indexes used by the name and keyword filters.  The
+        # keyword index includes the file paths so it's only built when first
+        # searched, and it only holds trigrams as the shorter ones match
+        # nearly every torrent.
+        self.name_index = SearchIndex(
+            lambda torrent_id: self.torrents[torrent_id].get_name())
+        self.keyword_index = SearchIndex(
+            self.get_keyword_text, lambda: self.torrents.torrents.keys(),
+            lazy=True, min_gram_size=3)
+        # The torrents whose files are left out of the keyword index
+        self.keyword_unindexed_files = set()
+
+        self.register_tree_field("state", self._init_state_tree, indexed=True)
         def _init_tracker_tree():
             return {"Error": 0}
-        self.register_tree_field("tracker_host", _init_tracker_tree)
+        self.register_tree_field("tracker_host", _init_tracker_tree, indexed=True)
 
         self.register_filter("tracker_host", tracker_error_filter)
 
         def _init_users_tree():
             return {"": 0}
-        self.register_tree_field("owner", _init_users_tree)
+        self.register_tree_field("owner", _init_users_tree, indexed=True)
+
+        eventmanager = component.get("EventManager")
+        eventmanager.register_event_handler("TorrentAddedEvent",
+                                            self.on_torrent_added)
+        eventmanager.register_event_handler("TorrentRemovedEvent",
+                                            self.on_torrent_removed)
+        eventmanager.register_event_handler("TorrentStateChangedEvent",
+                                            self.on_torrent_state_changed)
+        eventmanager.register_event_handler("TorrentFileRenamedEvent",
+                                            self.on_torrent_file_renamed)
+        eventmanager.register_event_handler("TorrentFolderRenamedEvent",
+                                            self.on_torrent_folder_renamed)
+
+        # The tracker alerts are handled after the TorrentManager has set the
+        # torrent's tracker_status
+        alertmanager = component.get("AlertManager")
+        for alert_type in ("tracker_reply_alert", "tracker_announce_alert",
+                           "tracker_warning_alert", "tracker_error_alert"):
+            alertmanager.register_handler(alert_type, self.on_alert_tracker)
+        alertmanager.register_handler("metadata_received_alert",
+                                      self.on_alert_metadata_received)
 
     def filter_torrent_ids(self, filter_dict):
         """
@@ -187,28 +242,43 @@ def filter_torrent_ids(self, filter_dict):
                 torrent_ids = list(set(self.registered_filters[field](torrent_ids, values)))
                 del filter_dict[field]
 
+        #Indexed fields:
+        for field, values in filter_dict.items():
+            if field in self.indexes:
+                torrent_ids = self.filter_index(field, torrent_ids, values)
+                del filter_dict[field]
 
         if not filter_dict: #return if there's  nothing more to filter
             return torrent_ids
 
         #leftover filter arguments:
         #default filter on status fields.
-        status_func = self.core.get_torrent_status #premature optimalisation..
-        for torrent_id in list(torrent_ids):
-            status = status_func(torrent_id, filter_dict.keys()) #status={key:value}
-            for field, values in filter_dict.iteritems():
-                if (not status[field] in values) and torrent_id in torrent_ids:
-                    torrent_ids.remove(torrent_id)
+        status = self.core.statustable.get_status(torrent_ids, filter_dict.keys())
+        return [torrent_id for torrent_id in torrent_ids if all(
+            status[torrent_id][field] in values
+            for field, values in filter_dict.iteritems()
+        )]
 
-        return torrent_ids
+    def filter_index(self, field, torrent_ids, values):
+        """
+        Returns the torrent_ids with any of `values` for the indexed `field`.
+        """
+        index = self.indexes[field]
+        matches = set()
+        for value in values:
+            matches.update(index.get(value, ()))
+        return [torrent_id for torrent_id in torrent_ids if torrent_id in matches]
 
     def get_filter_tree(self, show_zero_hits=True, hide_cat=None):
         """
         returns {field: [(value,count)] }
         for use in sidebar.
         """
-        torrent_ids = self.torrents.get_torrent_list()
-        status_func = self.core.get_torrent_status #premature optimalisation..
+        if self.check_indexes:
+            for field, value, indexed, counted in self.verify_indexes():
+                log.error("The %s index has %s torrents for %r instead of %s",
+                          field, indexed, value, counted)
+
         tree_keys = list(self.tree_fields.keys())
         if hide_cat:
             for cat in hide_cat:
@@ -216,16 +286,34 @@ def get_filter_tree(self, show_zero_hits=True, hide_cat=None):
 
         items = dict( (field, self.tree_fields[field]()) for field in tree_keys)
 
+        # The session might not be allowed to see every torrent, the index
+        # counts then have to be restricted to the ones it can see
+        if component.get("RPCServer").get_session_auth_level() == AUTH_LEVEL_ADMIN:
+            torrent_ids = self.torrents.torrents
+            count = len
+        else:
+            torrent_ids = self.torrents.get_torrent_list()
+            visible_ids = set(torrent_ids)
+            count = lambda ids: len(visible_ids.intersection(ids))
+
+        #count indexed fields.
+        for field in tree_keys:
+            if field in self.indexes:
+                for value, ids in self.indexes[field].iteritems():
+                    items[field][value] = items[field].get(value, 0) + count(ids)
+
         #count status fields.
-        for torrent_id in list(torrent_ids):
-            status = status_func(torrent_id, tree_keys) #status={key:value}
-            for field in tree_keys:
-                value = status[field]
-                items[field][value] = items[field].get(value, 0) + 1
+        status_keys = [field for field in tree_keys if field not in self.indexes]
+        if status_keys:
+            status = self.core.statustable.get_status(torrent_ids, status_keys)
+            for torrent_status in status.itervalues():
+                for field in status_keys:
+                    value = torrent_status[field]
+                    items[field][value] = items[field].get(value, 0) + 1
 
         if "tracker_host" in items:
             items["tracker_host"]["All"] = len(torrent_ids)
-            items["tracker_host"]["Error"] = len(tracker_error_filter(torrent_ids, ("Error",)))
+            items["tracker_host"]["Error"] = count(self.tracker_errors)
 
         if "state" in tree_keys and not show_zero_hits:
             self._hide_state_items(items["state"])
@@ -241,38 +329,209 @@ def get_filter_tree(self, show_zero_hits=True, hide_cat=None):
         return sorted_items
 
     def _init_state_tree(self):
-        return {"All":len(self.torrents.get_torrent_list()),
+        torrent_ids = self.torrents.get_torrent_list()
+        return {"All":len(torrent_ids),
             "Downloading":0,
             "Seeding":0,
             "Paused":0,
             "Checking":0,
             "Queued":0,
             "Error":0,
-            "Active":len(self.filter_state_active(self.torrents.get_torrent_list()))
+            "Active":self.count_state_active(torrent_ids)
             }
 
+    def count_state_active(self, torrent_ids):
+        """
+        Returns the number of active torrents in `torrent_ids`.  The count for
+        all the torrents is only recomputed once per status table tick.
+        """
+        if len(torrent_ids) != len(self.torrents.torrents):
+            return len(self.filter_state_active(torrent_ids))
+
+        now = time.time()
+        if now - self.active_count_time > self.core.statustable.tick:
+            self.active_count = len(self.filter_state_active(torrent_ids))
+            self.active_count_time = now
+        return self.active_count
+
     def register_filter(self, id, filter_func, filter_value = None):
         self.registered_filters[id] = filter_func
 
     def deregister_filter(self, id):
         del self.registered_filters[id]
 
-    def register_tree_field(self, field, init_func = lambda : {}):
+    def register_tree_field(self, field, init_func = lambda : {}, indexed=False):
+        """
+        Registers a field to be counted in the filter tree.
+
+        An indexed field is filtered and counted from an inverted index instead
+        of the torrents status.  Whoever changes the value of an indexed field,
+        other than on the torrent being added or removed, has to call
+        :meth:`update_index` afterwards.
+
+        :param field: the status field
+        :type field: string
+        :param init_func: returns the initial {value: count} of the tree
+        :type init_func: function
+        :param indexed: if True, an inverted index is kept for the field
+        :type indexed: bool
+
+        """
         self.tree_fields[field] = init_func
+        if indexed:
+            self.create_index(field)
 
     def deregister_tree_field(self, field):
         if field in self.tree_fields:
             del self.tree_fields[field]
+        if field in self.indexes:
+            del self.indexes[field]
+            del self.index_values[field]
+
+    def create_index(self, field):
+        """
+        Creates the inverted index for `field` from the torrents in the session.
+        """
+        self.indexes[field] = {}
+        self.index_values[field] = {}
+        for torrent_id in self.torrents.torrents:
+            self.update_index(torrent_id, field)
+
+    def get_index_value(self, torrent_id, field):
+        if field in self.index_getters:
+            return self.index_getters[field](self.torrents[torrent_id])
+        return self.core.pluginmanager.get_status(torrent_id, [field]).get(field)
+
+    def update_index(self, torrent_id, fields=None):
+        """
+        Updates the indexes with the current values of a torrent.
+
+        :param torrent_id: the torrent_id
+        :type torrent_id: string
+        :param fields: the indexed field(s) that changed, all of them if None
+        :type fields: string or list
+
+        """
+        if fields is None:
+            fields = self.indexes.keys()
+        elif isinstance(fields, basestring):
+            fields = [fields]
+
+        for field in fields:
+            if field not in self.indexes:
+                continue
+            index = self.indexes[field]
+            values = self.index_values[field]
+            value = self.get_index_value(torrent_id, field)
+            if torrent_id in values:
+                old_value = values[torrent_id]
+                if old_value == value:
+                    continue
+                index[old_value].discard(torrent_id)
+                if not index[old_value]:
+                    del index[old_value]
+            values[torrent_id] = value
+            index.setdefault(value, set()).add(torrent_id)
+
+    def verify_indexes(self):
+        """
+        Recounts the values of the indexed fields from the torrents and
+        compares them with the indexes.
+
+        :returns: the differences found, a list of tuples
+            (field, value, indexed count, recounted count)
+        :rtype: list
+
+        """
+        differences = []
+        for field, index in self.indexes.iteritems():
+            counts = {}
+            for torrent_id in self.torrents.torrents:
+                value = self.get_index_value(torrent_id, field)
+                counts[value] = counts.get(value, 0) + 1
+
+            for value in set(counts.keys() + index.keys()):
+                indexed = len(index.get(value, ()))
+                if indexed != counts.get(value, 0):
+                    differences.append((field, value, indexed, counts.get(value, 0)))
+        return differences
+
+    def get_keyword_text(self, torrent_id):
+        """
+        Returns the text searched by the keyword filter, besides the state and
+        the tracker status.  The file paths are left out for the torrents with
+        more than `MAX_KEYWORD_INDEX_FILES` files.
+        """
+        torrent = self.torrents[torrent_id]
+        texts = [torrent.filename or "", torrent_id]
+        if torrent.trackers:
+            texts.append(torrent.trackers[0]["url"])
+        files = torrent.get_files()
+        if len(files) > MAX_KEYWORD_INDEX_FILES:
+            self.keyword_unindexed_files.add(torrent_id)
+        else:
+            self.keyword_unindexed_files.discard(torrent_id)
+            texts.extend([t_file["path"] for t_file in files])
+        return u"\n".join([to_unicode(text) for text in texts])
+
+    def update_search_indexes(self, torrent_id):
+        self.name_index.update(torrent_id)
+        self.keyword_index.update(torrent_id)
+
+    def remove_from_indexes(self, torrent_id):
+        for field, values in self.index_values.iteritems():
+            if torrent_id not in values:
+                continue
+            index = self.indexes[field]
+            value = values.pop(torrent_id)
+            index[value].discard(torrent_id)
+            if not index[value]:
+                del index[value]
+        self.tracker_errors.discard(torrent_id)
+        self.name_index.remove(torrent_id)
+        self.keyword_index.remove(torrent_id)
+        self.keyword_unindexed_files.discard(torrent_id)
 
     def filter_state_active(self, torrent_ids):
-        get_status = self.core.get_torrent_status
-        for torrent_id in list(torrent_ids):
-            status = get_status(torrent_id, ["download_payload_rate", "upload_payload_rate"])
-            if status["download_payload_rate"] or status["upload_payload_rate"]:
-                pass #ok
-            else:
-                torrent_ids.remove(torrent_id)
-        return torrent_ids
+        keys = ["download_payload_rate", "upload_payload_rate"]
+        status = self.core.statustable.get_status(torrent_ids, keys)
+        return [torrent_id for torrent_id in torrent_ids
+                if status[torrent_id]["download_payload_rate"] or
+                status[torrent_id]["upload_payload_rate"]]
+
+    def on_torrent_added(self, torrent_id, from_state):
+        self.update_index(torrent_id)
+        self.update_search_indexes(torrent_id)
+
+    def on_torrent_removed(self, torrent_id):
+        self.remove_from_indexes(torrent_id)
+
+    def on_torrent_state_changed(self, torrent_id, state):
+        if torrent_id in self.torrents.torrents:
+            self.update_index(torrent_id, "state")
+
+    def on_alert_tracker(self, alert):
+        torrent_id = str(alert.handle.info_hash())
+        if torrent_id not in self.torrents.torrents:
+            return
+        self.update_index(torrent_id, ["tracker_host", "tracker_status"])
+        if _("Error") + ":" in self.torrents[torrent_id].tracker_status:
+            self.tracker_errors.add(torrent_id)
+        else:
+            self.tracker_errors.discard(torrent_id)
+
+    def on_torrent_file_renamed(self, torrent_id, index, name):
+        if torrent_id in self.torrents.torrents:
+            self.update_search_indexes(torrent_id)
+
+    def on_torrent_folder_renamed(self, torrent_id, old, new):
+        if torrent_id in self.torrents.torrents:
+            self.update_search_indexes(torrent_id)
+
+    def on_alert_metadata_received(self, alert):
+        torrent_id = str(alert.handle.info_hash())
+        if torrent_id in self.torrents.torrents:
+            self.update_search_indexes(torrent_id)
 
     def _hide_state_items(self, state_items):
         "for hide(show)-zero hits"
@@ -102,6 +102,7 @@
     "move_completed": False,
     "move_completed_path": deluge.common.get_default_download_dir(),
     "new_release_check": True,
+    "shutdown_timeout": 30,
     "proxies": {
         "peer": {
             "type": 0,
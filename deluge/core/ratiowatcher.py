@@ -0,0 +1,157 @@
+#
+# ratiowatcher.py
+#
+# Copyright (C) 2026 agent <agent@local>
+#
+# Deluge is free software.
+#
+# You may redistribute it and/or modify it under the terms of the
+# GNU General Public License, as published by the Free Software
+# Foundation; either version 3 of the License, or (at your option)
+# any later version.
+#
+# deluge is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with deluge.    If not, write to:
+# 	The Free Software Foundation, Inc.,
+# 	51 Franklin Street, Fifth Floor
+# 	Boston, MA  02110-1301, USA.
+#
+#    In addition, as a special exception, the copyright holders give
+#    permission to link the code of portions of this program with the OpenSSL
+#    library.
+#    You must obey the GNU General Public License in all respects for all of
+#    the code used other than OpenSSL. If you modify file(s) with this
+#    exception, you may extend this exception to your version of the file(s),
+#    but you are not obligated to do so. If you do not wish to do so, delete
+#    this exception statement from your version. If you delete this exception
+#    statement from all source files in the program, then also delete it here.
+#
+#
+
+"""
+The RatioWatcher works out when the seeding torrents which stop at a ratio
+are going to reach it, so that only the torrents due are checked instead of
+every torrent on every update.
+"""
+
+import time
+import heapq
+import logging
+
+log = logging.getLogger(__name__)
+
+# The shortest and longest time to wait before checking a torrent's ratio
+# again. Torrents aren't checked less often than the longest, since their
+# upload rate may pick up, nor when they aren't seeding towards a ratio, in
+# case they missed being watched again after their options or state changed.
+MIN_CHECK_INTERVAL = 5.0
+MAX_CHECK_INTERVAL = 60.0
+
+# The states in which a torrent isn't uploading towards its stop ratio
+INACTIVE_STATES = ("Checking", "Allocating", "Paused", "Queued")
+
+class RatioWatcher(object):
+    """
+    Keeps a priority queue of the torrents by the time at which they should
+    next be checked, projected from their upload rate and the bytes left to
+    upload until their stop ratio.
+
+    :param torrents: the torrents to watch, keyed by torrent_id
+    :type torrents: dict
+
+    """
+    def __init__(self, torrents):
+        self.torrents = torrents
+        # [(due time, torrent_id), ...], entries which no longer match
+        # self.due are skipped when popped
+        self.queue = []
+        # The time each torrent is next due to be checked, {torrent_id: time}
+        self.due = {}
+        # The number of ratios checked since the start
+        self.checks = 0
+
+    def watch(self, torrent_id, delay=0):
+        """
+        Has a torrent's ratio checked on the next update after `delay`
+        seconds, ie, after its options or state changed.
+
+        :param torrent_id: the torrent to check
+        :type torrent_id: string
+        :param delay: the number of seconds to wait
+        :type delay: float
+
+        """
+        due = time.time() + delay
+        if self.due.get(torrent_id, due + 1) <= due:
+            # It's already going to be checked earlier
+            return
+        self.due[torrent_id] = due
+        heapq.heappush(self.queue, (due, torrent_id))
+
+    def unwatch(self, torrent_id):
+        """
+        Stops watching a torrent, ie, when it's removed.
+
+        :param torrent_id: the torrent to stop watching
+        :type torrent_id: string
+
+        """
+        self.due.pop(torrent_id, None)
+
+    def update(self, now=None):
+        """
+        Checks the ratio of all the torrents which are due.
+
+        :param now: the current time, defaults to time.time()
+        :type now: float
+        :returns: the torrents which reached their stop ratio
+        :rtype: list of strings
+
+        """
+        if now is None:
+            now = time.time()
+        reached = []
+        queue = self.queue
+        while queue and queue[0][0] <= now:
+            due, torrent_id = heapq.heappop(queue)
+            if self.due.get(torrent_id) != due:
+                continue
+            del self.due[torrent_id]
+            if torrent_id not in self.torrents:
+                continue
+
+            self.checks += 1
+            delay = self.check(self.torrents[torrent_id])
+            if delay is None:
+                reached.append(torrent_id)
+            else:
+                self.due[torrent_id] = now + delay
+                heapq.heappush(queue, (now + delay, torrent_id))
+        return reached
+
+    def check(self, torrent):
+        """
+        Returns None if the torrent reached its stop ratio, otherwise the
+        number of seconds after which to check it again.
+        """
+        if (not torrent.options["stop_at_ratio"] or not torrent.is_finished or
+                torrent.state in INACTIVE_STATES):
+            return MAX_CHECK_INTERVAL
+
+        stop_ratio = torrent.options["stop_ratio"]
+        if torrent.get_ratio() >= stop_ratio:
+            return None
+
+        # The ratio is worked out from the total_done, see Torrent.get_ratio
+        status = torrent.status
+        left = stop_ratio * status.total_done - status.all_time_upload
+        if left <= 0 or status.upload_payload_rate <= 0:
+            # Nothing was downloaded, or uploaded lately
+            return MAX_CHECK_INTERVAL
+        return min(max(left / float(status.upload_payload_rate),
+                       MIN_CHECK_INTERVAL), MAX_CHECK_INTERVAL)
@@ -0,0 +1,140 @@
+#
+# resumedatastore.py
+#
+# Copyright (C) 2026 agent <agent@local>
+#
+# Deluge is free software.
+#
+# You may redistribute it and/or modify it under the terms of the
+# GNU General Public License, as published by the Free Software
+# Foundation; either version 3 of the License, or (at your option)
+# any later version.
+#
+# deluge is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with deluge.    If not, write to:
+# 	The Free Software Foundation, Inc.,
+# 	51 Franklin Street, Fifth Floor
+# 	Boston, MA  02110-1301, USA.
+#
+#    In addition, as a special exception, the copyright holders give
+#    permission to link the code of portions of this program with the OpenSSL
+#    library.
+#    You must obey the GNU General Public License in all respects for all of
+#    the code used other than OpenSSL. If you modify file(s) with this
+#    exception, you may extend this exception to your version of the file(s),
+#    but you are not obligated to do so. If you do not wish to do so, delete
+#    this exception statement from your version. If you delete this exception
+#    statement from all source files in the program, then also delete it here.
+#
+#
+
+"""
+Stores the fastresume data of each torrent in it's own file.
+
+The files are spread in sub-directories named after the first two characters
+of the torrent_id, so that no directory holds too many files.  Saving or
+removing the resume data of a torrent only touches that torrent's file, and
+the resume data is read one torrent at a time as the torrents are loaded.
+
+"""
+
+import os
+import logging
+
+import deluge.common
+
+log = logging.getLogger(__name__)
+
+class ResumeDataStore(object):
+    """
+    A directory of per-torrent fastresume files.
+
+    :param path: the store directory
+    :type path: string
+
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def get_path(self, torrent_id):
+        return os.path.join(self.path, torrent_id[:2], torrent_id + ".fastresume")
+
+    def get(self, torrent_id):
+        """
+        Returns the resume data of a torrent.
+
+        :param torrent_id: the torrent_id
+        :type torrent_id: string
+
+        :returns: the bencoded resume data, or None if there's none
+        :rtype: string
+
+        """
+        try:
+            resume_file = open(self.get_path(torrent_id), "rb")
+            try:
+                return resume_file.read()
+            finally:
+                resume_file.close()
+        except IOError, e:
+            if os.path.isfile(self.get_path(torrent_id)):
+                log.warning("Unable to load the resume data of %s: %s",
+                            torrent_id, e)
+            return None
+
+    def put(self, torrent_id, resume_data):
+        """
+        Saves the resume data of a torrent.  The data is written to a
+        temporary file which then replaces the previous one, so a failed
+        write never leaves a partial file behind.
+
+        :param torrent_id: the torrent_id
+        :type torrent_id: string
+        :param resume_data: the bencoded resume data
+        :type resume_data: string
+
+        :returns: True if the data was saved
+        :rtype: bool
+
+        """
+        path = self.get_path(torrent_id)
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            resume_file = open(path + ".tmp", "wb")
+            try:
+                resume_file.write(resume_data)
+                resume_file.flush()
+            finally:
+                resume_file.close()
+            if deluge.common.windows_check() and os.path.isfile(path):
+                # Windows can't rename over an existing file
+                os.remove(path)
+            os.rename(path + ".tmp", path)
+        except (IOError, OSError), e:
+            log.warning("Unable to save the resume data of %s: %s",
+                        torrent_id, e)
+            return False
+        return True
+
+    def delete(self, torrent_id):
+        """
+        Removes the resume data of a torrent, if there's any.
+
+        :param torrent_id: the torrent_id
+        :type torrent_id: string
+
+        """
+        path = self.get_path(torrent_id)
+        if not os.path.isfile(path):
+            return
+        try:
+            os.remove(path)
+        except OSError, e:
+            log.warning("Unable to delete the resume data of %s: %s",
+                        torrent_id, e)
@@ -36,25 +36,20 @@
 """RPCServer Module"""
 
 import sys
-import zlib
 import os
 import stat
 import logging
 import traceback
 
-from twisted.internet.protocol import Factory, Protocol
+from twisted.internet.protocol import Factory
 from twisted.internet import reactor, defer
 
 from OpenSSL import crypto, SSL
 from types import FunctionType
 
-try:
-    import rencode
-except ImportError:
-    import deluge.rencode as rencode
-
 import deluge.component as component
 import deluge.configmanager
+from deluge.transfer import DelugeTransferProtocol, encode_payload
 from deluge.core.authmanager import (AUTH_LEVEL_NONE, AUTH_LEVEL_DEFAULT,
                                      AUTH_LEVEL_ADMIN)
 from deluge.error import (DelugeError, NotAuthorizedError, WrappedException,
@@ -63,6 +58,23 @@
 RPC_RESPONSE = 1
 RPC_ERROR = 2
 RPC_EVENT = 3
+RPC_EVENT_BATCH = 4
+
+# How long, in seconds, the events are held to be sent in one batch to the
+# sessions which accept batched events
+EVENT_BATCH_WINDOW = 0.1
+
+# The events of which only the latest one is sent in a batch, when several
+# with the same leading args are emitted within the window.  The value is the
+# number of leading args identifying the event, eg, the torrent_id.
+COALESCED_EVENTS = {
+    "TorrentStateChangedEvent": 1,
+    "TorrentQueueChangedEvent": 0,
+    "TorrentResumedEvent": 1,
+    "ConfigValueChangedEvent": 1,
+    "SessionPausedEvent": 0,
+    "SessionResumedEvent": 0,
+}
 
 log = logging.getLogger(__name__)
 
@@ -134,54 +146,34 @@ def getContext(self):
         ctx.use_privatekey_file(os.path.join(ssl_dir, "daemon.pkey"))
         return ctx
 
-class DelugeRPCProtocol(Protocol):
-    __buffer = None
+class DelugeRPCProtocol(DelugeTransferProtocol):
 
-    def dataReceived(self, data):
+    def message_received(self, request):
         """
-        This method is called whenever data is received from a client.  The
-        only message that a client sends to the server is a RPC Request message.
-        If the RPC Request message is valid, then the method is called in
-        :meth:`dispatch`.
+        This method is called whenever a message is received from a client.
+        The only message that a client sends to the server is a RPC Request
+        message.  If the RPC Request message is valid, then the method is
+        called in :meth:`dispatch`.
 
-        :param data: the data from the client. It should be a zlib compressed
-            rencoded string.
-        :type data: str
+        :param request: the decoded RPC Request message
+        :type request: tuple
 
         """
-        if self.__buffer:
-            # We have some data from the last dataReceived() so lets prepend it
-            data = self.__buffer + data
-            self.__buffer = None
-
-        while data:
-            dobj = zlib.decompressobj()
-            try:
-                request = rencode.loads(dobj.decompress(data))
-            except Exception, e:
-                #log.debug("Received possible invalid message (%r): %s", data, e)
-                # This could be cut-off data, so we'll save this in the buffer
-                # and try to prepend it on the next dataReceived()
-                self.__buffer = data
-                return
-            else:
-                data = dobj.unused_data
-
-            if type(request) is not tuple:
-                log.debug("Received invalid message: type is not tuple")
-                return
+        if type(request) is not tuple:
+            log.debug("Received invalid message: type is not tuple")
+            return
 
-            if len(request) < 1:
-                log.debug("Received invalid message: there are no items")
-                return
+        if len(request) < 1:
+            log.debug("Received invalid message: there are no items")
+            return
 
-            for call in request:
-                if len(call) != 4:
-                    log.debug("Received invalid rpc request: number of items "
-                              "in request is %s", len(call))
-                    continue
-                #log.debug("RPCRequest: %s", format_request(call))
-                reactor.callLater(0, self.dispatch, *call)
+        for call in request:
+            if len(call) != 4:
+                log.debug("Received invalid rpc request: number of items "
+                          "in request is %s", len(call))
+                continue
+            #log.debug("RPCRequest: %s", format_request(call))
+            reactor.callLater(0, self.dispatch, *call)
 
     def sendData(self, data):
         """
@@ -192,7 +184,7 @@ def sendData(self, data):
         :type data: object
 
         """
-        self.transport.write(zlib.compress(rencode.dumps(data)))
+        self.transfer_message(data)
 
     def connectionMade(self):
         """
@@ -218,7 +210,9 @@ def connectionLost(self, reason):
         if self.transport.sessionno in self.factory.session_protocols:
             del self.factory.session_protocols[self.transport.sessionno]
         if self.transport.sessionno in self.factory.interested_events:
-            del self.factory.interested_events[self.transport.sessionno]
+            for event in self.factory.interested_events.pop(self.transport.sessionno):
+                self.factory.event_sessions[event].discard(self.transport.sessionno)
+        self.factory.batched_sessions.discard(self.transport.sessionno)
 
         log.info("Deluge client disconnected: %s", reason.value)
 
@@ -269,6 +263,9 @@ def sendError():
 
         if method == "daemon.info":
             # This is a special case and used in the initial connection process
+            # The client may tell us the protocol version it understands
+            if "protocol_version" in kwargs:
+                self.set_transfer_version(kwargs["protocol_version"])
             self.sendData((RPC_RESPONSE, request_id, deluge.common.get_version()))
             return
         elif method == "daemon.login":
@@ -276,6 +273,9 @@ def sendError():
             # We need to authenticate the user here
             log.debug("RPC dispatch daemon.login")
             try:
+                protocol_version = kwargs.pop('protocol_version', None)
+                if protocol_version is not None:
+                    self.set_transfer_version(protocol_version)
                 client_version = kwargs.pop('client_version', None)
                 if client_version is None:
                     raise IncompatibleClient(deluge.common.get_version())
@@ -299,9 +299,14 @@ def sendError():
             # interested in receiving.
             # We are expecting a sequence from the client.
             try:
-                if self.transport.sessionno not in self.factory.interested_events:
-                    self.factory.interested_events[self.transport.sessionno] = []
-                self.factory.interested_events[self.transport.sessionno].extend(args[0])
+                session_id = self.transport.sessionno
+                interest = self.factory.interested_events.setdefault(session_id, set())
+                for event in args[0]:
+                    interest.add(event)
+                    self.factory.event_sessions.setdefault(event, set()).add(session_id)
+                # The client can handle the events sent in batches
+                if kwargs.get("batched"):
+                    self.factory.batched_sessions.add(session_id)
             except Exception, e:
                 sendError()
             else:
@@ -377,8 +382,23 @@ def __init__(self, port=58846, interface="", allow_remote=False, listen=True):
         self.factory.authorized_sessions = {}
         # Holds the protocol objects with the session_id as key
         self.factory.session_protocols = {}
-        # Holds the interested event list for the sessions
+        # Holds the set of interesting events for the sessions
         self.factory.interested_events = {}
+        # Holds the set of interested sessions for the events
+        self.factory.event_sessions = {}
+        # Holds the sessions which accept batched events
+        self.factory.batched_sessions = set()
+
+        # The events waiting to be sent to the batched sessions
+        # [[event_name, args, session_ids], ...]
+        self.event_batch = []
+        # The index in the batch of the coalesced events {event_key: index}
+        self.event_batch_keys = {}
+        self.event_batch_timer = None
+
+        # The number of times each event was emitted and sent to sessions
+        # {event_name: [emitted, sent], ...}
+        self.event_stats = {}
 
         self.listen = listen
         if not listen:
@@ -525,15 +545,80 @@ def emit_event(self, event):
         :param event: the event to emit
         :type event: :class:`deluge.event.DelugeEvent`
         """
-        log.debug("intevents: %s", self.factory.interested_events)
+        stats = self.event_stats.setdefault(event.name, [0, 0])
+        stats[0] += 1
+
         # Find sessions interested in this event
-        for session_id, interest in self.factory.interested_events.iteritems():
-            if event.name in interest:
-                log.debug("Emit Event: %s %s", event.name, event.args)
-                # This session is interested so send a RPC_EVENT
-                self.factory.session_protocols[session_id].sendData(
-                    (RPC_EVENT, event.name, event.args)
-                )
+        session_ids = self.factory.event_sessions.get(event.name)
+        if not session_ids:
+            return
+
+        log.debug("Emit Event: %s %s", event.name, event.args)
+        batched_ids = session_ids & self.factory.batched_sessions
+        if batched_ids:
+            self.batch_event(event, batched_ids)
+            session_ids = session_ids - batched_ids
+            if not session_ids:
+                return
+
+        # Encode the RPC_EVENT once for all the interested sessions
+        payload = encode_payload((RPC_EVENT, event.name, event.args))
+        for session_id in session_ids:
+            self.factory.session_protocols[session_id].transfer_payload(payload)
+        stats[1] += len(session_ids)
+
+    def batch_event(self, event, session_ids):
+        """
+        Adds the event to the batch sent to the batched sessions at the end of
+        the window.  A coalesced event replaces the one emitted before it, and
+        is moved to the end of the batch so that the events are still sent in
+        the order they were emitted.
+
+        :param event: the event
+        :type event: :class:`deluge.event.DelugeEvent`
+        :param session_ids: the batched sessions interested in the event
+        :type session_ids: set
+
+        """
+        if event.name in COALESCED_EVENTS:
+            key = (event.name,) + tuple(event.args[:COALESCED_EVENTS[event.name]])
+            if key in self.event_batch_keys:
+                # Leave a hole rather than removing the replaced event, so the
+                # indexes of the events after it stay valid
+                index = self.event_batch_keys[key]
+                session_ids = session_ids | self.event_batch[index][2]
+                self.event_batch[index] = None
+            self.event_batch_keys[key] = len(self.event_batch)
+        self.event_batch.append([event.name, event.args, session_ids])
+
+        if not self.event_batch_timer or not self.event_batch_timer.active():
+            self.event_batch_timer = reactor.callLater(EVENT_BATCH_WINDOW,
+                                                       self.send_event_batch)
+
+    def send_event_batch(self):
+        """
+        Sends the batched events in one message to each session, sessions
+        getting the same events share the encoded message.
+        """
+        batch = [batched for batched in self.event_batch if batched]
+        self.event_batch = []
+        self.event_batch_keys = {}
+
+        # Group the sessions by the events they get {(index, ..): [ids]}
+        sessions = {}
+        for session_id in self.factory.batched_sessions:
+            indexes = tuple([index for index, (name, args, session_ids) in
+                             enumerate(batch) if session_id in session_ids])
+            if indexes:
+                sessions.setdefault(indexes, []).append(session_id)
+
+        for indexes, session_ids in sessions.iteritems():
+            events = [(batch[index][0], batch[index][1]) for index in indexes]
+            payload = encode_payload((RPC_EVENT_BATCH, events))
+            for session_id in session_ids:
+                self.factory.session_protocols[session_id].transfer_payload(payload)
+            for name, args in events:
+                self.event_stats[name][1] += len(session_ids)
 
     def emit_event_for_session_id(self, session_id, event):
         """
@@ -556,6 +641,21 @@ def emit_event_for_session_id(self, session_id, event):
         log.debug("Sending event \"%s\" with args \"%s\" to session id \"%s\".",
                   event.name, event.args, session_id)
         self.factory.session_protocols[session_id].sendData((RPC_EVENT, event.name, event.args))
+        stats = self.event_stats.setdefault(event.name, [0, 0])
+        stats[0] += 1
+        stats[1] += 1
+
+    def get_event_stats(self):
+        """
+        Returns the number of times each event was emitted, and sent to
+        sessions.
+
+        :returns: a dict of {event_name: (emitted, sent)}
+        :rtype: dict
+
+        """
+        return dict([(name, tuple(stats)) for name, stats in
+                     self.event_stats.iteritems()])
 
 
 def check_ssl_keys():
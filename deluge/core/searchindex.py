@@ -0,0 +1,182 @@
+#
+# searchindex.py
+#
+# Copyright (C) 2026 agent <agent@local>
+#
+# Deluge is free software.
+#
+# You may redistribute it and/or modify it under the terms of the
+# GNU General Public License, as published by the Free Software
+# Foundation; either version 3 of the License, or (at your option)
+# any later version.
+#
+# deluge is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with deluge.    If not, write to:
+# 	The Free Software Foundation, Inc.,
+# 	51 Franklin Street, Fifth Floor
+# 	Boston, MA  02110-1301, USA.
+#
+#    In addition, as a special exception, the copyright holders give
+#    permission to link the code of portions of this program with the OpenSSL
+#    library.
+#    You must obey the GNU General Public License in all respects for all of
+#    the code used other than OpenSSL. If you modify file(s) with this
+#    exception, you may extend this exception to your version of the file(s),
+#    but you are not obligated to do so. If you do not wish to do so, delete
+#    this exception statement from your version. If you delete this exception
+#    statement from all source files in the program, then also delete it here.
+#
+#
+
+"""
+A n-gram index to answer substring searches without scanning every text.
+
+Every substring of up to 3 characters of the indexed texts is mapped to the
+documents containing it.  A query of up to 3 characters is then a single
+lookup, a longer query is the intersection of the documents containing each
+of it's trigrams, checked against the texts to drop the false positives.
+
+An index of long texts can leave out the shorter n-grams, which are found in
+almost every document anyway, the queries shorter than the n-grams indexed are
+then checked against every text.
+
+"""
+
+import logging
+
+log = logging.getLogger(__name__)
+
+# The length of the longest n-grams indexed
+GRAM_SIZE = 3
+
+def to_unicode(text):
+    if isinstance(text, str):
+        return text.decode("utf8", "ignore")
+    return text
+
+def get_grams(text, min_size=1):
+    """
+    Returns the set of all the n-grams, of `min_size` to `GRAM_SIZE`
+    characters, of `text`.
+    """
+    grams = set()
+    length = len(text)
+    for size in xrange(min_size, GRAM_SIZE + 1):
+        grams.update([text[i:i + size] for i in xrange(length - size + 1)])
+    return grams
+
+class SearchIndex(object):
+    """
+    Indexes the texts of documents for case insensitive substring searches.
+
+    :param get_text: returns the text of a document, called with the doc_id
+    :type get_text: function
+    :param get_doc_ids: returns the doc_ids of all the documents, only needed
+        for a lazy index
+    :type get_doc_ids: function
+    :param lazy: if True, the index is only built on the first search, until
+        then the updates are ignored
+    :type lazy: bool
+    :param min_gram_size: the length of the shortest n-grams indexed, up to
+        `GRAM_SIZE`
+    :type min_gram_size: int
+
+    """
+    def __init__(self, get_text, get_doc_ids=None, lazy=False, min_gram_size=1):
+        self.get_text = get_text
+        self.get_doc_ids = get_doc_ids
+        self.built = not lazy
+        self.min_gram_size = min(min_gram_size, GRAM_SIZE)
+        # The lowercased text of each document {doc_id: text, ...}
+        self.texts = {}
+        # The documents containing each n-gram {gram: set(doc_ids), ...}
+        self.grams = {}
+
+    def build(self):
+        """
+        Indexes all the documents, replacing any previous index.
+        """
+        log.debug("Building the search index..")
+        self.texts = {}
+        self.grams = {}
+        self.built = True
+        for doc_id in self.get_doc_ids():
+            self.update(doc_id)
+
+    def update(self, doc_id):
+        """
+        Indexes, or re-indexes, the text of a document.
+
+        :param doc_id: the document
+        :type doc_id: string
+
+        """
+        if not self.built:
+            return
+        text = to_unicode(self.get_text(doc_id)).lower()
+        if self.texts.get(doc_id) == text:
+            return
+        self.remove(doc_id)
+        self.texts[doc_id] = text
+        for gram in get_grams(text, self.min_gram_size):
+            self.grams.setdefault(gram, set()).add(doc_id)
+
+    def remove(self, doc_id):
+        """
+        Removes a document from the index.
+
+        :param doc_id: the document
+        :type doc_id: string
+
+        """
+        text = self.texts.pop(doc_id, None)
+        if text is None:
+            return
+        for gram in get_grams(text, self.min_gram_size):
+            doc_ids = self.grams[gram]
+            doc_ids.discard(doc_id)
+            if not doc_ids:
+                del self.grams[gram]
+
+    def search(self, query):
+        """
+        Finds the documents containing `query`, ignoring case.
+
+        :param query: the substring to search for
+        :type query: string
+
+        :returns: the matching doc_ids
+        :rtype: set
+
+        """
+        if not self.built:
+            self.build()
+
+        query = to_unicode(query).lower()
+        if not query:
+            return set(self.texts)
+        if len(query) < self.min_gram_size:
+            texts = self.texts
+            return set([doc_id for doc_id in texts if query in texts[doc_id]])
+        if len(query) <= GRAM_SIZE:
+            return set(self.grams.get(query, ()))
+
+        # Start with the rarest trigram to keep the intersections small
+        trigrams = set([query[i:i + GRAM_SIZE]
+                        for i in xrange(len(query) - GRAM_SIZE + 1)])
+        candidates = sorted([self.grams.get(gram, ()) for gram in trigrams],
+                            key=len)
+        doc_ids = set(candidates[0])
+        for other in candidates[1:]:
+            if not doc_ids:
+                break
+            doc_ids.intersection_update(other)
+
+        # The trigrams may be in the text without being next to each other
+        texts = self.texts
+        return set([doc_id for doc_id in doc_ids if query in texts[doc_id]])
@@ -0,0 +1,195 @@
+#
+# statejournal.py
+#
+# Copyright (C) 2026 agent <agent@local>
+#
+# Deluge is free software.
+#
+# You may redistribute it and/or modify it under the terms of the
+# GNU General Public License, as published by the Free Software
+# Foundation; either version 3 of the License, or (at your option)
+# any later version.
+#
+# deluge is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with deluge.    If not, write to:
+# 	The Free Software Foundation, Inc.,
+# 	51 Franklin Street, Fifth Floor
+# 	Boston, MA  02110-1301, USA.
+#
+#    In addition, as a special exception, the copyright holders give
+#    permission to link the code of portions of this program with the OpenSSL
+#    library.
+#    You must obey the GNU General Public License in all respects for all of
+#    the code used other than OpenSSL. If you modify file(s) with this
+#    exception, you may extend this exception to your version of the file(s),
+#    but you are not obligated to do so. If you do not wish to do so, delete
+#    this exception statement from your version. If you delete this exception
+#    statement from all source files in the program, then also delete it here.
+#
+#
+
+"""
+The state journal records the changes to the torrents state between two full
+saves of the torrents.state file.
+
+Adding or removing a torrent only appends a small record to the journal
+instead of rewriting the whole state file.  When the state is loaded, the
+journal is replayed on top of the torrents.state file and it is emptied
+every time the full state is saved again.
+
+"""
+
+import os
+import cPickle
+import logging
+
+log = logging.getLogger(__name__)
+
+# The record types
+ADD = "add"
+UPDATE = "update"
+REMOVE = "remove"
+
+class StateJournal(object):
+    """
+    An append-only file of (type, data) records, where data is the
+    TorrentState for the add and update records and the torrent_id for the
+    remove records.
+
+    :param path: the journal file
+    :type path: string
+    :param max_records: the number of records after which the state should
+        be saved in full to compact the journal
+    :type max_records: int
+
+    """
+    def __init__(self, path, max_records=1000):
+        self.path = path
+        self.max_records = max_records
+        # The number of records in the journal
+        self.records = 0
+
+    def append(self, records):
+        """
+        Appends records to the journal and syncs it to disk.
+
+        :param records: the (type, data) records
+        :type records: list
+
+        :returns: True if the records were written
+        :rtype: bool
+
+        """
+        try:
+            journal = open(self.path, "ab")
+            try:
+                for record in records:
+                    cPickle.dump(record, journal, cPickle.HIGHEST_PROTOCOL)
+                journal.flush()
+                os.fsync(journal.fileno())
+            finally:
+                journal.close()
+        except (IOError, OSError, cPickle.PicklingError), e:
+            log.warning("Unable to write to the state journal: %s", e)
+            return False
+
+        self.records += len(records)
+        return True
+
+    def replay(self, torrents):
+        """
+        Applies the journal records to a list of TorrentState objects.
+
+        A record which can't be read, ie, the last one if the daemon was
+        killed while writing it, ends the replay, and it's cut off the journal
+        so that the records appended afterwards can be replayed.
+
+        :param torrents: the TorrentStates loaded from the state file
+        :type torrents: list
+
+        :returns: the TorrentStates with the journal applied
+        :rtype: list
+
+        """
+        self.records = 0
+        if not os.path.isfile(self.path):
+            return torrents
+
+        torrent_ids = [torrent.torrent_id for torrent in torrents]
+        states = dict(zip(torrent_ids, torrents))
+
+        # The offset of the end of the last record read
+        good_offset = 0
+        torn = False
+        journal = open(self.path, "rb")
+        try:
+            while True:
+                try:
+                    record_type, data = cPickle.load(journal)
+                except EOFError:
+                    torn = journal.tell() != good_offset
+                    break
+                except Exception, e:
+                    log.warning("Stopping the state journal replay at an "
+                                "unreadable record: %s", e)
+                    torn = True
+                    break
+
+                good_offset = journal.tell()
+                self.records += 1
+                if record_type == REMOVE:
+                    states.pop(data, None)
+                elif record_type in (ADD, UPDATE):
+                    if data.torrent_id not in states:
+                        torrent_ids.append(data.torrent_id)
+                    states[data.torrent_id] = data
+        finally:
+            journal.close()
+
+        if torn:
+            self.truncate(good_offset)
+
+        log.debug("Replayed %s records from the state journal", self.records)
+        ret = []
+        for torrent_id in torrent_ids:
+            # A torrent removed and added again is listed twice
+            if torrent_id in states:
+                ret.append(states.pop(torrent_id))
+        return ret
+
+    def truncate(self, offset):
+        """
+        Cuts the journal at `offset`, dropping an unreadable record.
+
+        :param offset: the size to cut the journal to
+        :type offset: int
+
+        """
+        log.warning("Truncating the state journal to %s bytes", offset)
+        try:
+            journal = open(self.path, "r+b")
+            try:
+                journal.truncate(offset)
+                journal.flush()
+                os.fsync(journal.fileno())
+            finally:
+                journal.close()
+        except (IOError, OSError), e:
+            log.warning("Unable to truncate the state journal: %s", e)
+
+    def clear(self):
+        """
+        Empties the journal, this must be done once the full state was saved.
+        """
+        try:
+            if os.path.isfile(self.path):
+                os.remove(self.path)
+        except OSError, e:
+            log.warning("Unable to remove the state journal: %s", e)
+            return
+        self.records = 0
@@ -0,0 +1,124 @@
+#
+# statuscache.py
+#
+# Copyright (C) 2026 agent <agent@local>
+#
+# Deluge is free software.
+#
+# You may redistribute it and/or modify it under the terms of the
+# GNU General Public License, as published by the Free Software
+# Foundation; either version 3 of the License, or (at your option)
+# any later version.
+#
+# deluge is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with deluge.    If not, write to:
+# 	The Free Software Foundation, Inc.,
+# 	51 Franklin Street, Fifth Floor
+# 	Boston, MA  02110-1301, USA.
+#
+#    In addition, as a special exception, the copyright holders give
+#    permission to link the code of portions of this program with the OpenSSL
+#    library.
+#    You must obey the GNU General Public License in all respects for all of
+#    the code used other than OpenSSL. If you modify file(s) with this
+#    exception, you may extend this exception to your version of the file(s),
+#    but you are not obligated to do so. If you do not wish to do so, delete
+#    this exception statement from your version. If you delete this exception
+#    statement from all source files in the program, then also delete it here.
+#
+#
+
+"""
+The StatusCache keeps the libtorrent status held by each
+:class:`deluge.core.torrent.Torrent` up to date, so that reading the status of
+a torrent doesn't need a synchronous `torrent_handle.status()` call.
+
+With libtorrent 0.16 and later, libtorrent is asked to post the status of the
+torrents that changed since the last time, in a `state_update_alert`, once per
+tick.  With older versions the status of every torrent is polled instead.
+
+"""
+
+import logging
+
+import deluge.component as component
+
+log = logging.getLogger(__name__)
+
+class StatusCache(component.Component):
+    """
+    Updates the cached status of the torrents.
+
+    :param core: the Core object
+    :param tick: how often, in seconds, the status is updated
+    :type tick: float
+
+    """
+    def __init__(self, core, tick=1.0):
+        component.Component.__init__(self, "StatusCache", interval=tick,
+                                     depend=["AlertManager", "TorrentManager"])
+        self.core = core
+        # Whether libtorrent can post the status updates as alerts
+        self.alert_driven = hasattr(core.session, "post_torrent_updates")
+
+        if self.alert_driven:
+            component.get("AlertManager").register_handler(
+                "state_update_alert", self.on_alert_state_update)
+
+    def update(self):
+        if self.alert_driven:
+            self.core.session.post_torrent_updates()
+        else:
+            self.poll()
+
+    def poll(self):
+        """
+        Fetches the status of every torrent, used when libtorrent can't post
+        the status updates.
+        """
+        torrents = self.core.torrentmanager.torrents
+        session = self.core.session
+
+        if hasattr(session, "get_torrent_status"):
+            # Get the status of every torrent with a single call
+            # Use the same flags torrent_handle.status() uses by default
+            statuses = session.get_torrent_status(lambda status: True,
+                                                  0xffffffff)
+        else:
+            statuses = [torrent.handle.status() for torrent in
+                        torrents.itervalues()]
+        self.update_status(statuses)
+
+    def on_alert_state_update(self, alert):
+        self.update_status(alert.status)
+
+    def update_status(self, statuses):
+        """
+        Stores the new status of torrents, and updates their state when
+        libtorrent's state of the torrent changed.
+
+        :param statuses: the libtorrent torrent_status objects
+        :type statuses: list
+
+        """
+        torrents = self.core.torrentmanager.torrents
+        for status in statuses:
+            torrent_id = str(status.handle.info_hash())
+            try:
+                torrent = torrents[torrent_id]
+            except KeyError:
+                continue
+
+            old_status = torrent.status
+            torrent.status = status
+            if status.state == old_status.state and \
+                    status.paused == old_status.paused and \
+                    status.error == old_status.error:
+                continue
+
+            torrent.update_state(status)
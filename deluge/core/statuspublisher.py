@@ -0,0 +1,218 @@
+#
+# statuspublisher.py
+#
+# Copyright (C) 2026 agent <agent@local>
+#
+# Deluge is free software.
+#
+# You may redistribute it and/or modify it under the terms of the
+# GNU General Public License, as published by the Free Software
+# Foundation; either version 3 of the License, or (at your option)
+# any later version.
+#
+# deluge is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with deluge.    If not, write to:
+# 	The Free Software Foundation, Inc.,
+# 	51 Franklin Street, Fifth Floor
+# 	Boston, MA  02110-1301, USA.
+#
+#    In addition, as a special exception, the copyright holders give
+#    permission to link the code of portions of this program with the OpenSSL
+#    library.
+#    You must obey the GNU General Public License in all respects for all of
+#    the code used other than OpenSSL. If you modify file(s) with this
+#    exception, you may extend this exception to your version of the file(s),
+#    but you are not obligated to do so. If you do not wish to do so, delete
+#    this exception statement from your version. If you delete this exception
+#    statement from all source files in the program, then also delete it here.
+#
+#
+
+"""
+The StatusPublisher pushes torrent status changes to subscribed sessions.
+
+A session subscribes with `daemon.subscribe_status` and from then on receives
+a :class:`deluge.event.TorrentsStatusUpdatedEvent` holding only the values
+that changed, at the interval it asked for, instead of having to poll
+`core.get_torrents_status`.  Subscriptions with the same filter, keys and
+interval share a single :class:`SubscriptionGroup`, so the status and the
+changes are computed once per update for all of them.
+
+"""
+
+import time
+import logging
+
+import deluge.component as component
+from deluge.event import TorrentsStatusUpdatedEvent
+
+log = logging.getLogger(__name__)
+
+class SubscriptionGroup(object):
+    """
+    The sessions subscribed to the same filter, keys and interval.
+    """
+    def __init__(self, filter_dict, keys, interval):
+        self.filter_dict = filter_dict
+        self.keys = keys
+        self.interval = interval
+        # The session_ids subscribed to this group
+        self.sessions = set()
+        # The last status sent to the sessions {torrent_id: {key: value}}
+        self.status = {}
+        self.next_update = time.time() + interval
+
+class StatusPublisher(component.Component):
+    """
+    Keeps track of the status subscriptions and publishes the changes.
+
+    :param core: the Core object
+    :param tick: how often, in seconds, the subscriptions are checked for
+        being due, this is also the shortest interval allowed
+    :type tick: float
+
+    """
+    def __init__(self, core, tick=0.5):
+        component.Component.__init__(self, "StatusPublisher", interval=tick)
+        self.core = core
+        self.tick = tick
+        # {(filter, keys, interval): SubscriptionGroup, ...}
+        self.groups = {}
+        # The group key each session is subscribed to {session_id: key, ...}
+        self.subscriptions = {}
+
+    def stop(self):
+        self.groups = {}
+        self.subscriptions = {}
+
+    def subscribe(self, session_id, filter_dict, keys, interval):
+        """
+        Subscribes a session to the status changes of the torrents matching
+        `filter_dict`.  A session only has one subscription, subscribing again
+        replaces the previous one.
+
+        :param session_id: the session to send the changes to
+        :type session_id: int
+        :param filter_dict: the filter for the torrents, see
+            `core.get_torrents_status`
+        :type filter_dict: dict
+        :param keys: the status keys to send, an empty list means all keys
+        :type keys: list
+        :param interval: how often, in seconds, the changes should be sent
+        :type interval: float
+
+        :returns: the current status of the matching torrents, the changes
+            sent afterwards are relative to it
+        :rtype: dict
+
+        """
+        self.unsubscribe(session_id)
+
+        interval = max(float(interval), self.tick)
+        group_key = (self.make_filter_key(filter_dict), tuple(sorted(keys)),
+                     interval)
+        group = self.groups.get(group_key)
+        if group is None:
+            group = SubscriptionGroup(filter_dict, list(keys), interval)
+            group.status = self.get_group_status(group)
+            self.groups[group_key] = group
+
+        log.debug("Session %s subscribed to status updates for: %s",
+                  session_id, group_key)
+        group.sessions.add(session_id)
+        self.subscriptions[session_id] = group_key
+
+        return dict([(torrent_id, dict(status)) for torrent_id, status in
+                     group.status.iteritems()])
+
+    def unsubscribe(self, session_id):
+        """
+        Removes the subscription of a session, if it has one.
+
+        :param session_id: the session
+        :type session_id: int
+
+        """
+        group_key = self.subscriptions.pop(session_id, None)
+        if group_key is None:
+            return
+
+        group = self.groups[group_key]
+        group.sessions.discard(session_id)
+        if not group.sessions:
+            del self.groups[group_key]
+
+    def update(self):
+        rpcserver = component.get("RPCServer")
+        for session_id in self.subscriptions.keys():
+            if not rpcserver.is_session_valid(session_id):
+                # The client disconnected
+                self.unsubscribe(session_id)
+
+        now = time.time()
+        for group in self.groups.values():
+            if now < group.next_update:
+                continue
+            group.next_update = now + group.interval
+
+            changes, removed = self.update_group(group)
+            if not changes and not removed:
+                continue
+
+            event = TorrentsStatusUpdatedEvent(changes, removed)
+            for session_id in group.sessions:
+                rpcserver.emit_event_for_session_id(session_id, event)
+
+    def update_group(self, group):
+        """
+        Gets the current status for the group and returns what changed since
+        the last update.
+
+        :param group: the group to update
+        :type group: :class:`SubscriptionGroup`
+
+        :returns: the changed values {torrent_id: {key: value}}, and the
+            torrent_ids which were removed or no longer match the filter
+        :rtype: tuple
+
+        """
+        status = self.get_group_status(group)
+        changes = {}
+        for torrent_id, torrent_status in status.iteritems():
+            prev = group.status.get(torrent_id)
+            if prev is None:
+                # The torrent is new to this group, send everything
+                changes[torrent_id] = torrent_status
+                continue
+
+            changed = dict([
+                (key, value) for key, value in torrent_status.iteritems()
+                if key not in prev or prev[key] != value
+            ])
+            if changed:
+                changes[torrent_id] = changed
+
+        removed = [torrent_id for torrent_id in group.status
+                   if torrent_id not in status]
+        group.status = status
+        return changes, removed
+
+    def get_group_status(self, group):
+        # The filter manager modifies the filter it's given so pass it a copy
+        filter_dict = dict([
+            (key, list(value) if isinstance(value, (list, tuple)) else value)
+            for key, value in group.filter_dict.iteritems()
+        ])
+        torrent_ids = self.core.filtermanager.filter_torrent_ids(filter_dict)
+        return self.core.statustable.get_status(torrent_ids, group.keys)
+
+    def make_filter_key(self, filter_dict):
+        return tuple(sorted([
+            (key, tuple(value) if isinstance(value, (list, tuple)) else value)
+            for key, value in filter_dict.iteritems()
+        ]))
@@ -0,0 +1,221 @@
+#
+# statustable.py
+#
+# Copyright (C) 2026 agent <agent@local>
+#
+# Deluge is free software.
+#
+# You may redistribute it and/or modify it under the terms of the
+# GNU General Public License, as published by the Free Software
+# Foundation; either version 3 of the License, or (at your option)
+# any later version.
+#
+# deluge is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with deluge.    If not, write to:
+# 	The Free Software Foundation, Inc.,
+# 	51 Franklin Street, Fifth Floor
+# 	Boston, MA  02110-1301, USA.
+#
+#    In addition, as a special exception, the copyright holders give
+#    permission to link the code of portions of this program with the OpenSSL
+#    library.
+#    You must obey the GNU General Public License in all respects for all of
+#    the code used other than OpenSSL. If you modify file(s) with this
+#    exception, you may extend this exception to your version of the file(s),
+#    but you are not obligated to do so. If you do not wish to do so, delete
+#    this exception statement from your version. If you delete this exception
+#    statement from all source files in the program, then also delete it here.
+#
+#
+
+"""
+The StatusTable answers bulk torrent status requests from a table that is
+refreshed at most once per tick.
+
+Instead of every `core.get_torrents_status` call building a complete status
+dict for each torrent, the statuses kept by the StatusCache are read in a
+single pass and only the keys that clients have asked for are stored, one
+column (list) per status key.
+Any number of requests issued within the same tick are then served from
+those columns.
+
+"""
+
+import time
+import logging
+
+import deluge.component as component
+
+log = logging.getLogger(__name__)
+
+class StatusTable(object):
+    """
+    Holds the torrents status in a columnar table.
+
+    :param core: the Core object
+    :param tick: how long, in seconds, the table is considered fresh
+    :type tick: float
+    :param column_timeout: how long, in seconds, a column is kept in the
+        table without being requested
+    :type column_timeout: float
+
+    """
+    def __init__(self, core, tick=1.0, column_timeout=30):
+        self.core = core
+        self.tick = tick
+        self.column_timeout = column_timeout
+
+        # The torrent_ids in row order
+        self.torrent_ids = []
+        # Maps the torrent_id to it's row index {torrent_id: row, ...}
+        self.rows = {}
+        # One list of values per status key {key: [value, ...], ...}
+        self.columns = {}
+        # The last time a column was requested {key: time, ...}
+        self.column_times = {}
+        # The time of the last refresh of the table
+        self.last_refresh = 0.0
+        # Set when the table rows no longer match the session
+        self.dirty = True
+
+        eventmanager = component.get("EventManager")
+        eventmanager.register_event_handler("TorrentAddedEvent",
+                                            self.on_torrent_added)
+        eventmanager.register_event_handler("TorrentRemovedEvent",
+                                            self.on_torrent_removed)
+        eventmanager.register_event_handler("TorrentStateChangedEvent",
+                                            self.on_torrent_state_changed)
+
+    def get_status(self, torrent_ids, keys, diff=False):
+        """
+        Returns the status of `torrent_ids` for `keys`.
+
+        :param torrent_ids: the torrents to get the status for
+        :type torrent_ids: list
+        :param keys: the status keys to get, an empty list means all keys
+        :type keys: list
+        :param diff: if True, only return the values that changed since the
+            last call made by the calling session
+        :type diff: bool
+
+        :returns: a dictionary of {torrent_id: {key: value, ...}, ...}
+        :rtype: dict
+
+        """
+        if not keys:
+            # All keys were requested, there's no gain in building columns
+            # for every key so just ask each torrent for it's full status.
+            return dict([
+                (torrent_id, self.core.get_torrent_status(torrent_id, keys, diff))
+                for torrent_id in torrent_ids
+            ])
+
+        self.update(keys)
+
+        torrents = self.core.torrentmanager.torrents
+        columns = [(key, self.columns[key]) for key in keys
+                   if key in self.columns]
+        leftover_keys = [key for key in keys if key not in self.columns]
+        get_plugin_status = self.core.pluginmanager.get_status
+
+        status_dict = {}
+        for torrent_id in torrent_ids:
+            if torrent_id not in self.rows:
+                # Torrent was added after the last refresh
+                status_dict[torrent_id] = self.core.get_torrent_status(
+                    torrent_id, keys, diff)
+                continue
+
+            row = self.rows[torrent_id]
+            status = dict([(key, column[row]) for key, column in columns])
+            if leftover_keys:
+                status.update(get_plugin_status(torrent_id, leftover_keys))
+
+            if diff:
+                status = torrents[torrent_id].diff_status(status)
+            status_dict[torrent_id] = status
+
+        return status_dict
+
+    def update(self, keys):
+        """
+        Makes sure the table is fresh and that it holds columns for `keys`.
+
+        :param keys: the status keys that will be read from the table
+        :type keys: list
+
+        """
+        now = time.time()
+        for key in keys:
+            self.column_times[key] = now
+
+        if self.dirty or now - self.last_refresh > self.tick:
+            # Drop the columns nobody asked for in a while
+            for key, last_used in self.column_times.items():
+                if now - last_used > self.column_timeout:
+                    del self.column_times[key]
+                    self.columns.pop(key, None)
+            self.refresh(self.column_times.keys())
+            return
+
+        missing_keys = [key for key in keys if key not in self.columns]
+        if missing_keys:
+            self.fill_columns(missing_keys)
+
+    def refresh(self, keys):
+        """
+        Rebuilds the table columns for `keys` from the status of the torrents,
+        which is kept up to date by the StatusCache.
+
+        :param keys: the status keys to build columns for
+        :type keys: list
+
+        """
+        torrents = self.core.torrentmanager.torrents
+
+        self.torrent_ids = torrents.keys()
+        self.rows = dict([(torrent_id, row) for row, torrent_id in
+                          enumerate(self.torrent_ids)])
+        self.columns = {}
+        self.last_refresh = time.time()
+        self.dirty = False
+
+        self.fill_columns(keys)
+
+    def fill_columns(self, keys):
+        """
+        Builds the columns for `keys` from the status held by the torrents.
+        Keys which are not torrent status keys, ie, plugin status keys, will
+        not get a column.
+
+        :param keys: the status keys to build columns for
+        :type keys: list
+
+        """
+        torrents = self.core.torrentmanager.torrents
+        columns = dict([(key, []) for key in keys])
+        status = {}
+        for torrent_id in self.torrent_ids:
+            status = torrents[torrent_id].get_status(keys, update=False)
+            for key, column in columns.iteritems():
+                column.append(status.get(key))
+
+        # Only keep the columns of keys known to the torrents, the others are
+        # left for the plugins to fill in
+        for key in keys:
+            if key in status:
+                self.columns[key] = columns[key]
+
+    def on_torrent_added(self, torrent_id, from_state):
+        self.dirty = True
+
+    def on_torrent_removed(self, torrent_id):
+        self.dirty = True
+
+    def on_torrent_state_changed(self, torrent_id, state):
+        self.dirty = True
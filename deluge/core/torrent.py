@@ -37,17 +37,24 @@
 import os
 import time
 import logging
+import operator
+from array import array
+from itertools import izip
 from urllib import unquote
-from urlparse import urlparse
 
 from deluge._libtorrent import lt
 
 import deluge.common
 import deluge.component as component
 from deluge.configmanager import ConfigManager, get_config_dir
+from deluge.core.trackerhost import get_tracker_host
 from deluge.event import *
 
 TORRENT_STATE = deluge.common.TORRENT_STATE
+PIECE_MISSING = deluge.common.PIECE_MISSING
+PIECE_WAITING = deluge.common.PIECE_WAITING
+PIECE_DOWNLOADING = deluge.common.PIECE_DOWNLOADING
+PIECE_COMPLETED = deluge.common.PIECE_COMPLETED
 
 log = logging.getLogger(__name__)
 
@@ -102,6 +109,136 @@ def __init__(self):
         self["file_priorities"] = []
         self["mapped_files"] = {}
 
+def decode_string(value):
+    try:
+        return value.decode("utf8", "ignore")
+    except UnicodeDecodeError:
+        return value
+
+class TorrentMetadata(object):
+    """
+    Holds the parts of a torrent's metadata which don't change while it's in
+    the session, so that they don't have to be fetched from libtorrent and
+    decoded on every status request. The file sizes and offsets are kept in
+    arrays and the paths in a tuple, in the files' order. The directories are
+    indexed, parents before their children, so that the files' progress can
+    be rolled up into them in a single pass.
+
+    :param torrent_info: the torrent's metadata
+    :type torrent_info: libtorrent.torrent_info
+
+    """
+    __slots__ = ("name", "comment", "private", "total_size", "num_files",
+                 "num_pieces", "piece_length", "paths", "sizes", "offsets",
+                 "inverse_sizes", "file_directories", "directories",
+                 "directory_parents", "directory_sizes")
+
+    def __init__(self, torrent_info):
+        files = torrent_info.files()
+        paths = []
+        # Doubles hold the sizes exactly up to 8 PiB on every platform
+        self.sizes = array("d")
+        self.offsets = array("d")
+        # 1 / size, or 0 for empty files, to turn the completed bytes into a
+        # fraction with a multiplication
+        self.inverse_sizes = array("d")
+        # The index of each file's directory, -1 for the top level
+        self.file_directories = array("l")
+        directories = []
+        directory_indexes = {}
+        self.directory_parents = array("l")
+
+        def get_directory(path):
+            if not path:
+                return -1
+            index = directory_indexes.get(path)
+            if index is None:
+                parent = get_directory(path.rpartition("/")[0])
+                index = directory_indexes[path] = len(directories)
+                directories.append(path)
+                self.directory_parents.append(parent)
+            return index
+
+        for file in files:
+            path = decode_string(file.path)
+            paths.append(path)
+            self.sizes.append(file.size)
+            self.offsets.append(file.offset)
+            self.inverse_sizes.append(file.size and 1.0 / file.size or 0.0)
+            self.file_directories.append(get_directory(path.rpartition("/")[0]))
+        self.paths = tuple(paths)
+        self.directories = tuple(directories)
+        self.directory_sizes = self.__sum_directories(self.sizes)
+
+        name = ""
+        if paths:
+            name = torrent_info.file_at(0).path.split("/", 1)[0]
+        if not name:
+            name = torrent_info.name()
+        self.name = decode_string(name)
+        self.comment = decode_string(torrent_info.comment())
+        self.private = torrent_info.priv()
+        self.total_size = torrent_info.total_size()
+        self.num_files = torrent_info.num_files()
+        self.num_pieces = torrent_info.num_pieces()
+        self.piece_length = torrent_info.piece_length()
+
+    def get_files(self):
+        """
+        Returns the list of the files' dicts, as returned by
+        `Torrent.get_files`.
+        """
+        return [{
+            "index": index,
+            "path": path,
+            "size": int(size),
+            "offset": int(offset)
+        } for index, (path, size, offset) in enumerate(
+            zip(self.paths, self.sizes, self.offsets))]
+
+    def get_file_progress(self, file_progress):
+        """
+        Returns the files' progress, from 0.0 to 1.0.
+
+        :param file_progress: the completed bytes of each file
+        :type file_progress: list of int
+        :returns: the progress of each file
+        :rtype: list of float
+
+        """
+        return map(operator.mul, file_progress, self.inverse_sizes)
+
+    def get_progress_tree(self, file_progress):
+        """
+        Returns the directories' progress, from 0.0 to 1.0.
+
+        :param file_progress: the completed bytes of each file
+        :type file_progress: list of int
+        :returns: the progress of each directory, keyed by its path
+        :rtype: dict
+
+        """
+        done = self.__sum_directories(file_progress)
+        return dict((path, size and completed / size or 0.0)
+                    for path, completed, size in
+                    izip(self.directories, done, self.directory_sizes))
+
+    def __sum_directories(self, values):
+        """
+        Sums the files' values into their directories and every directory's
+        into its parents', in reverse order so that children come first.
+        """
+        totals = array("d", [0.0]) * len(self.directories)
+        for directory, value in izip(self.file_directories, values):
+            if directory >= 0:
+                totals[directory] += value
+        parents = self.directory_parents
+        for index in xrange(len(totals) - 1, -1, -1):
+            parent = parents[index]
+            if parent >= 0:
+                totals[parent] += totals[index]
+        return totals
+
 class Torrent(object):
     """Torrent holds information about torrents added to the libtorrent session.
     """
@@ -153,6 +290,9 @@ def __init__(self, handle, options, state=None, filename=None, magnet=None, owne
         except RuntimeError:
             self.torrent_info = None
 
+        # The TorrentMetadata, built once the metadata is needed and available
+        self.metadata = None
+
         # Default total_uploaded to 0, this may be changed by the state
         self.total_uploaded = 0
 
@@ -225,6 +365,12 @@ def __init__(self, handle, options, state=None, filename=None, magnet=None, owne
         self.forcing_recheck = False
         self.forcing_recheck_paused = False
 
+        # Whether the resume data changed since it was last saved, torrents
+        # restored from state already have theirs saved
+        self.resume_data_dirty = state is None
+        # The number of pieces we had when the resume data was last saved
+        self.resume_data_pieces = self.status.num_pieces
+
         log.debug("Torrent object created.")
 
     ## Options methods ##
@@ -246,19 +392,35 @@ def set_options(self, options):
             if OPTIONS_FUNCS.has_key(key):
                 OPTIONS_FUNCS[key](value)
         self.options.update(options)
+        self.resume_data_dirty = True
+        if ("stop_at_ratio" in options or "stop_ratio" in options or
+                "remove_at_ratio" in options):
+            self.watch_ratio()
 
     def get_options(self):
         return self.options
 
+    def get_metadata(self):
+        """
+        Returns the torrent's TorrentMetadata, or None if the metadata isn't
+        available yet.
+        """
+        if self.metadata is None and self.handle.has_metadata():
+            self.torrent_info = self.handle.get_torrent_info()
+            self.metadata = TorrentMetadata(self.torrent_info)
+        return self.metadata
+
+    def invalidate_metadata(self):
+        """
+        Drops the cached TorrentMetadata, ie, after files were renamed or the
+        metadata was received.
+        """
+        self.metadata = None
+
     def get_name(self):
-        if self.handle.has_metadata():
-            name = self.torrent_info.file_at(0).path.split("/", 1)[0]
-            if not name:
-                name = self.torrent_info.name()
-            try:
-                return name.decode("utf8", "ignore")
-            except UnicodeDecodeError:
-                return name
+        metadata = self.get_metadata()
+        if metadata:
+            return metadata.name
         elif self.magnet:
             try:
                 keys = dict([k.split('=') for k in self.magnet.split('?')[-1].split('&')])
@@ -337,12 +499,25 @@ def set_auto_managed(self, auto_managed):
 
     def set_stop_ratio(self, stop_ratio):
         self.options["stop_ratio"] = stop_ratio
+        self.watch_ratio()
 
     def set_stop_at_ratio(self, stop_at_ratio):
         self.options["stop_at_ratio"] = stop_at_ratio
+        self.watch_ratio()
 
     def set_remove_at_ratio(self, remove_at_ratio):
         self.options["remove_at_ratio"] = remove_at_ratio
+        self.watch_ratio()
+
+    def watch_ratio(self):
+        """Has the TorrentManager check this torrent's ratio on its next
+        update, after the options it's stopped at changed"""
+        try:
+            torrentmanager = component.get("TorrentManager")
+        except KeyError:
+            # The torrent is used on its own, ie, by the benchmark scripts
+            return
+        torrentmanager.ratio_watcher.watch(self.torrent_id)
 
     def set_move_completed(self, move_completed):
         self.options["move_completed"] = move_completed
@@ -412,6 +587,7 @@ def set_trackers(self, trackers):
             self.force_reannounce()
 
         self.tracker_host = None
+        self.resume_data_dirty = True
 
     ### End Options methods ###
 
@@ -422,11 +598,26 @@ def set_tracker_status(self, status):
         """Sets the tracker status"""
         self.tracker_status = self.get_tracker_host() + ": " + status
 
-    def update_state(self):
-        """Updates the state based on what libtorrent's state for the torrent is"""
+    def update_state(self, status=None):
+        """Updates the state based on what libtorrent's state for the torrent is,
+        a TorrentStateChangedEvent is emitted if it changed
+
+        :param status: the libtorrent status of the torrent, if None a fresh
+            one is fetched from the handle
+        """
+        # The state isn't set yet while the torrent is being created
+        old_state = getattr(self, "state", None)
+        self.__update_state(status)
+        if old_state and self.state != old_state:
+            component.get("EventManager").emit(TorrentStateChangedEvent(self.torrent_id, self.state))
+
+    def __update_state(self, status):
+        if status is None:
+            self.status = status = self.handle.status()
+
         # Set the initial state based on the lt state
         LTSTATE = deluge.common.LT_TORRENT_STATE
-        ltstate = int(self.handle.status().state)
+        ltstate = int(status.state)
 
         # Set self.state to the ltstate right away just incase we don't hit some
         # of the logic below
@@ -440,10 +631,10 @@ def update_state(self):
 
         # First we check for an error from libtorrent, and set the state to that
         # if any occurred.
-        if len(self.handle.status().error) > 0:
+        if len(status.error) > 0:
             # This is an error'd torrent
             self.state = "Error"
-            self.set_status_message(self.handle.status().error)
+            self.set_status_message(status.error)
             if self.handle.is_paused():
                 self.handle.auto_managed(False)
             return
@@ -522,24 +713,10 @@ def get_ratio(self):
 
     def get_files(self):
         """Returns a list of files this torrent contains"""
-        if self.torrent_info == None and self.handle.has_metadata():
-            torrent_info = self.handle.get_torrent_info()
-        else:
-            torrent_info = self.torrent_info
-
-        if not torrent_info:
+        metadata = self.get_metadata()
+        if not metadata:
             return []
-
-        ret = []
-        files = torrent_info.files()
-        for index, file in enumerate(files):
-            ret.append({
-                'index': index,
-                'path': file.path.decode("utf8", "ignore"),
-                'size': file.size,
-                'offset': file.offset
-            })
-        return ret
+        return metadata.get_files()
 
     def get_peers(self):
         """Returns a list of peers and various information about them"""
@@ -581,18 +758,18 @@ def get_queue_position(self):
 
     def get_file_progress(self):
         """Returns the file progress as a list of floats.. 0.0 -> 1.0"""
-        if not self.handle.has_metadata():
+        metadata = self.get_metadata()
+        if not metadata:
             return 0.0
+        return metadata.get_file_progress(self.handle.file_progress())
 
-        file_progress = self.handle.file_progress()
-        ret = []
-        for i,f in enumerate(self.get_files()):
-            try:
-                ret.append(float(file_progress[i]) / float(f["size"]))
-            except ZeroDivisionError:
-                ret.append(0.0)
-
-        return ret
+    def get_file_progress_tree(self):
+        """Returns the progress of the torrent's directories, 0.0 -> 1.0, as a
+        dict keyed by their path"""
+        metadata = self.get_metadata()
+        if not metadata:
+            return {}
+        return metadata.get_progress_tree(self.handle.file_progress())
 
     def get_tracker_host(self):
         """Returns just the hostname of the currently connected tracker
@@ -608,27 +785,8 @@ def get_tracker_host(self):
             tracker = self.trackers[0]["url"]
 
         if tracker:
-            url = urlparse(tracker.replace("udp://", "http://"))
-            if hasattr(url, "hostname"):
-                host = (url.hostname or 'DHT')
-                # Check if hostname is an IP address and just return it if that's the case
-                import socket
-                try:
-                    socket.inet_aton(host)
-                except socket.error:
-                    pass
-                else:
-                    # This is an IP address because an exception wasn't raised
-                    return url.hostname
-
-                parts = host.split(".")
-                if len(parts) > 2:
-                    if parts[-2] in ("co", "com", "net", "org") or parts[-1] in ("uk"):
-                        host = ".".join(parts[-3:])
-                    else:
-                        host = ".".join(parts[-2:])
-                self.tracker_host = host
-                return host
+            self.tracker_host = get_tracker_host(tracker)
+            return self.tracker_host
         return ""
 
     def get_last_seen_complete(self):
@@ -641,176 +799,78 @@ def get_last_seen_complete(self):
         self.calculate_last_seen_complete()
         return self._last_seen_complete
 
-    def get_status(self, keys, diff=False):
+    def get_status(self, keys, diff=False, update=False):
         """
         Returns the status of the torrent based on the keys provided
 
-        :param keys: the keys to get the status on
+        :param keys: the keys to get the status on, all of the keys in
+        `DEFAULT_STATUS_KEYS` if empty
         :type keys: list of str
         :param diff: if True, will return a diff of the changes since the last
         call to get_status based on the session_id
         :type diff: bool
+        :param update: if True, a new status is fetched from the handle instead
+        of using the one held in `self.status`, which the StatusCache keeps up
+        to date
+        :type update: bool
 
         :returns: a dictionary of the status keys and their values
         :rtype: dict
 
         """
 
-        # Create the full dictionary
-        self.status = self.handle.status()
-        if self.handle.has_metadata():
-            self.torrent_info = self.handle.get_torrent_info()
+        if not keys:
+            keys = DEFAULT_STATUS_KEYS
 
-        # Adjust progress to be 0-100 value
-        progress = self.status.progress * 100
+        fields = []
+        sources = set()
+        for key in keys:
+            if key in STATUS_FIELDS:
+                source, getter = STATUS_FIELDS[key]
+                fields.append((key, getter))
+                sources.add(source)
 
-        # Adjust status.distributed_copies to return a non-negative value
-        distributed_copies = self.status.distributed_copies
-        if distributed_copies < 0:
-            distributed_copies = 0.0
+        # Only refresh the sources the requested keys are read from
+        if update and "status" in sources:
+            self.status = self.handle.status()
 
-        # Calculate the seeds:peers ratio
-        if self.status.num_incomplete == 0:
-            # Use -1.0 to signify infinity
-            seeds_peers_ratio = -1.0
-        else:
-            seeds_peers_ratio = self.status.num_complete / float(self.status.num_incomplete)
-
-        full_status = {
-            "active_time": self.status.active_time,
-            "all_time_download": self.status.all_time_download,
-            "compact": self.options["compact_allocation"],
-            "distributed_copies": distributed_copies,
-            "download_payload_rate": self.status.download_payload_rate,
-            "file_priorities": self.options["file_priorities"],
-            "hash": self.torrent_id,
-            "is_auto_managed": self.options["auto_managed"],
-            "is_finished": self.is_finished,
-            "max_connections": self.options["max_connections"],
-            "max_download_speed": self.options["max_download_speed"],
-            "max_upload_slots": self.options["max_upload_slots"],
-            "max_upload_speed": self.options["max_upload_speed"],
-            "message": self.statusmsg,
-            "move_on_completed_path": self.options["move_completed_path"],
-            "move_on_completed": self.options["move_completed"],
-            "move_completed_path": self.options["move_completed_path"],
-            "move_completed": self.options["move_completed"],
-            "next_announce": self.status.next_announce.seconds,
-            "num_peers": self.status.num_peers - self.status.num_seeds,
-            "num_seeds": self.status.num_seeds,
-            "owner": self.owner,
-            "paused": self.status.paused,
-            "prioritize_first_last": self.options["prioritize_first_last_pieces"],
-            "sequential_download": self.options["sequential_download"],
-            "progress": progress,
-            "shared": self.options["shared"],
-            "remove_at_ratio": self.options["remove_at_ratio"],
-            "save_path": self.options["download_location"],
-            "seeding_time": self.status.seeding_time,
-            "seeds_peers_ratio": seeds_peers_ratio,
-            "seed_rank": self.status.seed_rank,
-            "state": self.state,
-            "stop_at_ratio": self.options["stop_at_ratio"],
-            "stop_ratio": self.options["stop_ratio"],
-            "time_added": self.time_added,
-            "total_done": self.status.total_done,
-            "total_payload_download": self.status.total_payload_download,
-            "total_payload_upload": self.status.total_payload_upload,
-            "total_peers": self.status.list_peers - self.status.list_seeds,
-            "total_seeds":  self.status.list_seeds,
-            "total_uploaded": self.status.all_time_upload,
-            "total_wanted": self.status.total_wanted,
-            "tracker": self.status.current_tracker,
-            "trackers": self.trackers,
-            "tracker_status": self.tracker_status,
-            "upload_payload_rate": self.status.upload_payload_rate
-        }
+        # Create the desired status dictionary and return it
+        status_dict = {}
+        for key, getter in fields:
+            status_dict[key] = getter(self)
 
-        def ti_comment():
-            if self.handle.has_metadata():
-                try:
-                    return self.torrent_info.comment().decode("utf8", "ignore")
-                except UnicodeDecodeError:
-                    return self.torrent_info.comment()
-            return ""
+        if diff:
+            return self.diff_status(status_dict)
 
-        def ti_priv():
-            if self.handle.has_metadata():
-                return self.torrent_info.priv()
-            return False
-        def ti_total_size():
-            if self.handle.has_metadata():
-                return self.torrent_info.total_size()
-            return 0
-        def ti_num_files():
-            if self.handle.has_metadata():
-                return self.torrent_info.num_files()
-            return 0
-        def ti_num_pieces():
-            if self.handle.has_metadata():
-                return self.torrent_info.num_pieces()
-            return 0
-        def ti_piece_length():
-            if self.handle.has_metadata():
-                return self.torrent_info.piece_length()
-            return 0
-        def ti_pieces_info():
-            if self.handle.has_metadata():
-                return self.get_pieces_info()
-            return None
-
-        fns = {
-            "comment": ti_comment,
-            "eta": self.get_eta,
-            "file_progress": self.get_file_progress,
-            "files": self.get_files,
-            "is_seed": self.handle.is_seed,
-            "name": self.get_name,
-            "num_files": ti_num_files,
-            "num_pieces": ti_num_pieces,
-            "pieces": ti_pieces_info,
-            "peers": self.get_peers,
-            "piece_length": ti_piece_length,
-            "private": ti_priv,
-            "queue": self.handle.queue_position,
-            "ratio": self.get_ratio,
-            "total_size": ti_total_size,
-            "tracker_host": self.get_tracker_host,
-            "last_seen_complete": self.get_last_seen_complete
-        }
+        return status_dict
 
-        # Create the desired status dictionary and return it
-        status_dict = {}
+    def diff_status(self, status_dict):
+        """
+        Returns only the items of `status_dict` that changed since the last
+        status dict handed out to the calling session.
 
-        if len(keys) == 0:
-            status_dict = full_status
-            for key in fns:
-                status_dict[key] = fns[key]()
-        else:
-            for key in keys:
-                if key in full_status:
-                    status_dict[key] = full_status[key]
-                elif key in fns:
-                    status_dict[key] = fns[key]()
+        :param status_dict: the current status values
+        :type status_dict: dict
+
+        :returns: the changed status keys and their values
+        :rtype: dict
 
+        """
         session_id = self.rpcserver.get_session_id()
-        if diff:
-            if session_id in self.prev_status:
-                # We have a previous status dict, so lets make a diff
-                status_diff = {}
-                for key, value in status_dict.items():
-                    if key in self.prev_status[session_id]:
-                        if value != self.prev_status[session_id][key]:
-                            status_diff[key] = value
-                    else:
+        if session_id in self.prev_status:
+            # We have a previous status dict, so lets make a diff
+            status_diff = {}
+            for key, value in status_dict.items():
+                if key in self.prev_status[session_id]:
+                    if value != self.prev_status[session_id][key]:
                         status_diff[key] = value
-
-                self.prev_status[session_id] = status_dict
-                return status_diff
+                else:
+                    status_diff[key] = value
 
             self.prev_status[session_id] = status_dict
-            return status_dict
+            return status_diff
 
+        self.prev_status[session_id] = status_dict
         return status_dict
 
     def apply_options(self):
@@ -833,7 +893,6 @@ def pause(self):
             # show it as 'Paused'.  We need to emit a torrent_paused signal because
             # the torrent_paused alert from libtorrent will not be generated.
             self.update_state()
-            component.get("EventManager").emit(TorrentStateChangedEvent(self.torrent_id, "Paused"))
         else:
             try:
                 self.handle.pause()
@@ -907,6 +966,7 @@ def move_storage(self, dest):
         except:
             return False
 
+        self.resume_data_dirty = True
         return True
 
     def save_resume_data(self):
@@ -914,6 +974,21 @@ def save_resume_data(self):
         returned in a libtorrent alert"""
         self.handle.save_resume_data()
         self.waiting_on_resume_data = True
+        self.resume_data_dirty = False
+        self.resume_data_pieces = self.status.num_pieces
+
+    def needs_resume_data(self):
+        """Returns True if the resume data changed since it was last saved,
+        because libtorrent says so, pieces completed or the options, trackers
+        or storage changed"""
+        if self.resume_data_dirty:
+            return True
+        if self.status.num_pieces != self.resume_data_pieces:
+            return True
+        # Only available with libtorrent 0.16 and later
+        if hasattr(self.handle, "need_save_resume_data"):
+            return self.handle.need_save_resume_data()
+        return False
 
     def write_torrentfile(self):
         """Writes the torrent file"""
@@ -923,6 +998,7 @@ def write_torrentfile(self):
         log.debug("Writing torrent file: %s", path)
         try:
             self.torrent_info = self.handle.get_torrent_info()
+            self.invalidate_metadata()
             # Regenerate the file priorities
             self.set_file_priorities([])
             md = lt.bdecode(self.torrent_info.metadata())
@@ -974,6 +1050,7 @@ def force_recheck(self):
             return False
         self.forcing_recheck = True
         self.forcing_recheck_paused = paused
+        self.resume_data_dirty = True
         return True
 
     def rename_files(self, filenames):
@@ -1025,37 +1102,166 @@ def calculate_last_seen_complete(self):
         self._last_seen_complete = time.time()
 
     def get_pieces_info(self):
-        pieces = {}
-        # First get the pieces availability.
+        """
+        Returns the state of every piece, missing, waiting (available from a
+        peer), downloading or completed, packed with
+        `deluge.common.pack_pieces`.
+        """
+        have = self.handle.status().pieces
         availability = self.handle.piece_availability()
-        # Pieces from connected peers
-        for peer_info in self.handle.get_peer_info():
-            if peer_info.downloading_piece_index < 0:
-                # No piece index, then we're not downloading anything from
-                # this peer
-                continue
-            pieces[peer_info.downloading_piece_index] = 2
+        if len(availability) < len(have):
+            availability = list(availability)
+            availability.extend([0] * (len(have) - len(availability)))
 
-        # Now, the rest of the pieces
-        for idx, piece in enumerate(self.handle.status().pieces):
-            if idx in pieces:
-                # Piece beeing downloaded, handled above
-                continue
-            elif piece:
-                # Completed Piece
-                pieces[idx] = 3
-                continue
-            elif availability[idx] > 0:
-                # Piece not downloaded nor beeing downloaded but available
-                pieces[idx] = 1
-                continue
-            # If we reached here, it means the piece is missing, ie, there's
-            # no known peer with this piece, or this piece has not been asked
-            # for so far.
-            pieces[idx] = 0
-
-        sorted_indexes = pieces.keys()
-        sorted_indexes.sort()
-        # Return only the piece states, no need for the piece index
-        # Keep the order
-        return [pieces[idx] for idx in sorted_indexes]
+        states = [h and PIECE_COMPLETED or (a > 0 and PIECE_WAITING or
+                                            PIECE_MISSING)
+                  for h, a in zip(have, availability)]
+
+        # Pieces being downloaded from connected peers
+        num_pieces = len(states)
+        for peer_info in self.handle.get_peer_info():
+            if 0 <= peer_info.downloading_piece_index < num_pieces:
+                states[peer_info.downloading_piece_index] = PIECE_DOWNLOADING
+
+        return deluge.common.pack_pieces(states)
+
+# The torrent status fields, mapped to the source they're read from and a
+# function returning their value for a torrent. The sources are:
+#   "status": the libtorrent torrent_status held in `Torrent.status`
+#   "options": the torrent options
+#   "metadata": the torrent's TorrentMetadata, which needs the metadata
+#   "computed": the torrent's own attributes or its handle
+# `Torrent.get_status` only refreshes the sources its keys need.
+STATUS_FIELDS = {}
+
+def _status_attribute(attr):
+    return lambda torrent: getattr(torrent.status, attr)
+
+def _option(option):
+    return lambda torrent: torrent.options[option]
+
+def _attribute(attr):
+    return lambda torrent: getattr(torrent, attr)
+
+def _metadata(attr, default):
+    def getter(torrent):
+        metadata = torrent.get_metadata()
+        if metadata:
+            return getattr(metadata, attr)
+        return default
+    return getter
+
+def _progress(torrent):
+    # Adjust progress to be 0-100 value
+    return torrent.status.progress * 100
+
+def _distributed_copies(torrent):
+    # Adjust status.distributed_copies to return a non-negative value
+    distributed_copies = torrent.status.distributed_copies
+    if distributed_copies < 0:
+        return 0.0
+    return distributed_copies
+
+def _seeds_peers_ratio(torrent):
+    # Calculate the seeds:peers ratio
+    if torrent.status.num_incomplete == 0:
+        # Use -1.0 to signify infinity
+        return -1.0
+    return torrent.status.num_complete / float(torrent.status.num_incomplete)
+
+def _pieces(torrent):
+    if torrent.handle.has_metadata():
+        return torrent.get_pieces_info()
+    return None
+
+for key, attr in (
+        ("active_time", "active_time"),
+        ("all_time_download", "all_time_download"),
+        ("download_payload_rate", "download_payload_rate"),
+        ("num_seeds", "num_seeds"),
+        ("paused", "paused"),
+        ("seeding_time", "seeding_time"),
+        ("seed_rank", "seed_rank"),
+        ("total_done", "total_done"),
+        ("total_payload_download", "total_payload_download"),
+        ("total_payload_upload", "total_payload_upload"),
+        ("total_seeds", "list_seeds"),
+        ("total_uploaded", "all_time_upload"),
+        ("total_wanted", "total_wanted"),
+        ("tracker", "current_tracker"),
+        ("upload_payload_rate", "upload_payload_rate")):
+    STATUS_FIELDS[key] = ("status", _status_attribute(attr))
+
+for key, option in (
+        ("compact", "compact_allocation"),
+        ("file_priorities", "file_priorities"),
+        ("is_auto_managed", "auto_managed"),
+        ("max_connections", "max_connections"),
+        ("max_download_speed", "max_download_speed"),
+        ("max_upload_slots", "max_upload_slots"),
+        ("max_upload_speed", "max_upload_speed"),
+        ("move_on_completed_path", "move_completed_path"),
+        ("move_on_completed", "move_completed"),
+        ("move_completed_path", "move_completed_path"),
+        ("move_completed", "move_completed"),
+        ("prioritize_first_last", "prioritize_first_last_pieces"),
+        ("sequential_download", "sequential_download"),
+        ("shared", "shared"),
+        ("remove_at_ratio", "remove_at_ratio"),
+        ("save_path", "download_location"),
+        ("stop_at_ratio", "stop_at_ratio"),
+        ("stop_ratio", "stop_ratio")):
+    STATUS_FIELDS[key] = ("options", _option(option))
+
+for key, attr in (
+        ("hash", "torrent_id"),
+        ("is_finished", "is_finished"),
+        ("message", "statusmsg"),
+        ("owner", "owner"),
+        ("state", "state"),
+        ("time_added", "time_added"),
+        ("trackers", "trackers"),
+        ("tracker_status", "tracker_status")):
+    STATUS_FIELDS[key] = ("computed", _attribute(attr))
+
+del key, attr, option
+
+STATUS_FIELDS.update({
+    "distributed_copies": ("status", _distributed_copies),
+    "eta": ("status", lambda torrent: torrent.get_eta()),
+    "last_seen_complete": ("status",
+                           lambda torrent: torrent.get_last_seen_complete()),
+    "next_announce": ("status",
+                      lambda torrent: torrent.status.next_announce.seconds),
+    "num_peers": ("status", lambda torrent: torrent.status.num_peers -
+                                            torrent.status.num_seeds),
+    "progress": ("status", _progress),
+    "ratio": ("status", lambda torrent: torrent.get_ratio()),
+    "seeds_peers_ratio": ("status", _seeds_peers_ratio),
+    "total_peers": ("status", lambda torrent: torrent.status.list_peers -
+                                              torrent.status.list_seeds),
+    "tracker_host": ("status", lambda torrent: torrent.get_tracker_host()),
+    "comment": ("metadata", _metadata("comment", "")),
+    "file_progress": ("metadata", lambda torrent: torrent.get_file_progress()),
+    "file_progress_tree": ("metadata",
+                           lambda torrent: torrent.get_file_progress_tree()),
+    "files": ("metadata", lambda torrent: torrent.get_files()),
+    "name": ("metadata", lambda torrent: torrent.get_name()),
+    "num_files": ("metadata", _metadata("num_files", 0)),
+    "num_pieces": ("metadata", _metadata("num_pieces", 0)),
+    "piece_length": ("metadata", _metadata("piece_length", 0)),
+    "private": ("metadata", _metadata("private", False)),
+    "total_size": ("metadata", _metadata("total_size", 0)),
+    "pieces": ("computed", _pieces),
+    "is_seed": ("computed", lambda torrent: torrent.handle.is_seed()),
+    "peers": ("computed", lambda torrent: torrent.get_peers()),
+    "queue": ("computed", lambda torrent: torrent.handle.queue_position()),
+})
+
+# The fields too expensive to be computed for every torrent when all the keys
+# are requested, they're only returned when asked for by name
+NAMED_STATUS_KEYS = frozenset(["file_progress_tree"])
+
+# The keys returned by `Torrent.get_status` when no keys are requested
+DEFAULT_STATUS_KEYS = [key for key in STATUS_FIELDS
+                       if key not in NAMED_STATUS_KEYS]
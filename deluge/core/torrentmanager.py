@@ -43,8 +43,12 @@
 import operator
 import logging
 import re
+from collections import OrderedDict
 
-from twisted.internet.task import LoopingCall
+from twisted.internet import reactor, threads
+from twisted.internet.defer import DeferredList, succeed
+from twisted.internet.task import LoopingCall, deferLater
+from twisted.python.failure import Failure
 
 from deluge._libtorrent import lt
 
@@ -56,10 +60,22 @@
 from deluge.core.torrent import Torrent
 from deluge.core.torrent import TorrentOptions
 import deluge.core.oldstateupgrader
+from deluge.core.statejournal import StateJournal, ADD, UPDATE, REMOVE
+from deluge.core.resumedatastore import ResumeDataStore
+from deluge.core.ratiowatcher import RatioWatcher
 from deluge.common import utf8_encoded
 
 log = logging.getLogger(__name__)
 
+# The number of torrents restored from the session state per reactor turn
+RESTORE_CHUNK_SIZE = 50
+
+# How often the alerts are handled while waiting on the torrents at shutdown
+SHUTDOWN_ALERTS_INTERVAL = 0.05
+
+# The number of queued torrents asked for their resume data every second
+RESUME_DATA_BATCH_SIZE = 100
+
 class TorrentState:
     def __init__(self,
             torrent_id=None,
@@ -137,6 +153,10 @@ def __init__(self):
         log.debug("TorrentManager init..")
         # Set the libtorrent session
         self.session = component.get("Core").session
+        # Records the torrents added or removed since the last full save of
+        # the state
+        self.state_journal = StateJournal(
+            os.path.join(get_config_dir(), "state", "torrents.state.journal"))
         # Set the alertmanager
         self.alerts = component.get("AlertManager")
         # Get the core config
@@ -148,6 +168,8 @@ def __init__(self):
 
         # Create the torrents dict { torrent_id: Torrent }
         self.torrents = {}
+        # Works out when the torrents reach their stop ratio
+        self.ratio_watcher = RatioWatcher(self.torrents)
         self.last_seen_complete_loop = None
 
         # This is a list of torrent_id when we shutdown the torrentmanager.
@@ -155,11 +177,21 @@ def __init__(self):
         # and that their resume data has been written.
         self.shutdown_torrent_pause_list = []
 
-        # self.num_resume_data used to save resume_data in bulk
-        self.num_resume_data = 0
+        # The fastresume data of each torrent
+        self.resume_data_store = ResumeDataStore(
+            os.path.join(get_config_dir(), "state", "resume"))
+
+        # The torrents whose resume data changed, waiting to save it in order
+        self.resume_data_queue = OrderedDict()
+        # The number of times torrents were asked for their resume data, were
+        # skipped because it hadn't changed, and failed to save it
+        self.resume_data_stats = {"saved": 0, "skipped": 0, "failed": 0}
 
-        # Keeps track of resume data that needs to be saved to disk
-        self.resume_data = {}
+        # The states of the torrents still to be restored from the session
+        # state, { torrent_id: TorrentState }, and the number to restore
+        self.restore_pending = {}
+        self.restore_total = 0
+        self.restoring = False
 
         # Register set functions
         self.config.register_set_function("max_connections_per_torrent",
@@ -205,6 +237,10 @@ def __init__(self):
         self.alerts.register_handler("file_completed_alert",
             self.on_alert_file_completed)
 
+        # A torrent's ratio may need checking once it starts seeding again
+        component.get("EventManager").register_event_handler(
+            "TorrentStateChangedEvent", self.on_torrent_state_changed)
+
     def start(self):
         # Get the pluginmanager reference
         self.plugins = component.get("CorePluginManager")
@@ -218,8 +254,10 @@ def start(self):
         # Save the state every 5 minutes
         self.save_state_timer = LoopingCall(self.save_state)
         self.save_state_timer.start(200, False)
-        self.save_resume_data_timer = LoopingCall(self.save_resume_data)
+        self.save_resume_data_timer = LoopingCall(self.queue_dirty_resume_data)
         self.save_resume_data_timer.start(190)
+        self.resume_data_queue_timer = LoopingCall(self.save_queued_resume_data)
+        self.resume_data_queue_timer.start(1, False)
 
         if self.last_seen_complete_loop:
             self.last_seen_complete_loop.start(60)
@@ -232,11 +270,17 @@ def stop(self):
         if self.save_resume_data_timer.running:
             self.save_resume_data_timer.stop()
 
+        if self.resume_data_queue_timer.running:
+            self.resume_data_queue_timer.stop()
+
         if self.last_seen_complete_loop:
             self.last_seen_complete_loop.stop()
 
         # Save state on shutdown
         self.save_state()
+        # Stop restoring the session, the torrents left were saved above
+        self.restoring = False
+        self.restore_pending = {}
 
         # Make another list just to make sure all paused torrents will be
         # passed to self.save_resume_data(). With
@@ -253,41 +297,87 @@ def stop(self):
                 self.torrents[key].handle.pause()
                 self.shutdown_torrent_pause_list.append(key)
                 save_resume_data_list.append(key)
+            elif self.torrents[key].needs_resume_data():
+                save_resume_data_list.append(key)
 
+        self.resume_data_queue.clear()
         self.save_resume_data(save_resume_data_list)
 
         # We have to wait for all torrents to pause and write their resume data
-        wait = True
-        while wait:
-            if self.shutdown_torrent_pause_list:
-                wait = True
-            else:
-                wait = False
-                for torrent in self.torrents.values():
-                    if torrent.waiting_on_resume_data:
-                        wait = True
-                        break
+        return self.wait_on_shutdown(self.config["shutdown_timeout"])
+
+    def get_shutdown_waiting(self):
+        """
+        Returns the torrents which haven't yet paused or written their resume
+        data since the torrentmanager was stopped.
+
+        :returns: the torrent_ids
+        :rtype: set
+
+        """
+        waiting = set(self.shutdown_torrent_pause_list)
+        for torrent_id, torrent in self.torrents.iteritems():
+            if torrent.waiting_on_resume_data:
+                waiting.add(torrent_id)
+        return waiting
+
+    def wait_on_shutdown(self, timeout):
+        """
+        Handles the alerts in batches until all the torrents have paused and
+        written their resume data, or until the timeout is reached.  The resume
+        data is stored as it arrives, so the torrents missing the deadline keep
+        their previous resume data.
 
-            time.sleep(0.01)
-            # Wait for all alerts
+        This doesn't block the reactor unless it has already been stopped.
+
+        :param timeout: the number of seconds to wait at most
+        :type timeout: int
+
+        :returns: a Deferred which returns the torrent_ids of the torrents
+            which missed the deadline
+        :rtype: twisted.internet.defer.Deferred
+
+        """
+        deadline = time.time() + timeout
+
+        def waiting():
             self.alerts.handle_alerts(True)
+            return bool(self.get_shutdown_waiting()) and time.time() < deadline
+
+        def on_finished(result):
+            missed = sorted(self.get_shutdown_waiting())
+            if missed:
+                log.warning("%s torrents didn't pause or write their resume "
+                            "data within %ss of the shutdown: %s", len(missed),
+                            timeout, ", ".join(missed))
+            return missed
+
+        if not reactor.running:
+            # Nothing else can run anyway, so just wait for the alerts here
+            while waiting():
+                time.sleep(SHUTDOWN_ALERTS_INTERVAL)
+            return succeed(on_finished(None))
+
+        def check():
+            if not waiting():
+                wait_loop.stop()
+
+        wait_loop = LoopingCall(check)
+        d = wait_loop.start(SHUTDOWN_ALERTS_INTERVAL)
+        d.addCallback(on_finished)
+        return d
 
     def update(self):
-        for torrent_id, torrent in self.torrents.items():
-            if torrent.options["stop_at_ratio"] and torrent.state not in (
-                                "Checking", "Allocating", "Paused", "Queued"):
-                # If the global setting is set, but the per-torrent isn't..
-                # Just skip to the next torrent.
-                # This is so that a user can turn-off the stop at ratio option
-                # on a per-torrent basis
-                if not torrent.options["stop_at_ratio"]:
-                    continue
-                if torrent.get_ratio() >= torrent.options["stop_ratio"] and torrent.is_finished:
-                    if torrent.options["remove_at_ratio"]:
-                        self.remove(torrent_id)
-                        break
-                    if not torrent.handle.is_paused():
-                        torrent.pause()
+        # Only the torrents due are checked, see RatioWatcher
+        for torrent_id in self.ratio_watcher.update():
+            torrent = self.torrents[torrent_id]
+            if torrent.options["remove_at_ratio"]:
+                self.remove(torrent_id)
+            elif not torrent.handle.is_paused():
+                torrent.pause()
+
+    def on_torrent_state_changed(self, torrent_id, state):
+        self.ratio_watcher.watch(torrent_id)
 
     def __getitem__(self, torrent_id):
         """Return the Torrent with torrent_id"""
@@ -344,7 +434,8 @@ def legacy_delete_resume_data(self, torrent_id):
             log.warning("Unable to delete the fastresume file: %s", e)
 
     def add(self, torrent_info=None, state=None, options=None, save_state=True,
-            filedump=None, filename=None, magnet=None, resume_data=None, owner=None):
+            filedump=None, filename=None, magnet=None, resume_data=None, owner=None,
+            pause_alerts=True):
         """Add a torrent to the manager and returns it's torrent_id"""
 
         if owner is None:
@@ -359,7 +450,7 @@ def add(self, torrent_info=None, state=None, options=None, save_state=True,
         log.debug("torrentmanager.add")
         add_torrent_params = {}
 
-        if filedump is not None:
+        if filedump is not None and torrent_info is None:
             try:
                 torrent_info = lt.torrent_info(lt.bdecode(filedump))
             except Exception, e:
@@ -367,9 +458,9 @@ def add(self, torrent_info=None, state=None, options=None, save_state=True,
                 # XXX: Probably should raise an exception here..
                 return
 
-        if torrent_info is None and state:
-            # We have no torrent_info so we need to add the torrent with information
-            # from the state object.
+        if state:
+            # We are adding the torrent with information from the state object,
+            # the torrent_info may already have been loaded from state.
 
             # Populate the options dict from state
             options = TorrentOptions()
@@ -391,9 +482,11 @@ def add(self, torrent_info=None, state=None, options=None, save_state=True,
             options["add_paused"] = state.paused
             options["shared"] = state.shared
 
-            ti = self.get_torrent_info_from_file(
-                    os.path.join(get_config_dir(),
-                                    "state", state.torrent_id + ".torrent"))
+            ti = torrent_info
+            if ti is None:
+                ti = self.get_torrent_info_from_file(
+                        os.path.join(get_config_dir(),
+                                        "state", state.torrent_id + ".torrent"))
             if ti:
                 add_torrent_params["ti"] = ti
             elif state.magnet:
@@ -474,7 +567,8 @@ def add(self, torrent_info=None, state=None, options=None, save_state=True,
 
         # We need to pause the AlertManager momentarily to prevent alerts
         # for this torrent being generated before a Torrent object is created.
-        component.pause("AlertManager")
+        if pause_alerts:
+            component.pause("AlertManager")
 
         handle = None
         try:
@@ -488,7 +582,8 @@ def add(self, torrent_info=None, state=None, options=None, save_state=True,
         if not handle or not handle.is_valid():
             log.debug("torrent handle is invalid!")
             # The torrent was not added to the session
-            component.resume("AlertManager")
+            if pause_alerts:
+                component.resume("AlertManager")
             return
 
         log.debug("handle id: %s", str(handle.info_hash()))
@@ -504,10 +599,12 @@ def add(self, torrent_info=None, state=None, options=None, save_state=True,
         torrent = Torrent(handle, options, state, filename, magnet, owner)
         # Add the torrent object to the dictionary
         self.torrents[torrent.torrent_id] = torrent
+        self.ratio_watcher.watch(torrent.torrent_id)
         if self.config["queue_new_to_top"]:
             handle.queue_position_top()
 
-        component.resume("AlertManager")
+        if pause_alerts:
+            component.resume("AlertManager")
 
         # Resume the torrent if needed
         if not options["add_paused"]:
@@ -537,20 +634,59 @@ def add(self, torrent_info=None, state=None, options=None, save_state=True,
                     log.warning("Unable to save torrent file: %s", e)
 
         if save_state:
-            # Save the session state
-            self.save_state()
+            # Record the new torrent in the session state
+            self.journal_state([(ADD, self.create_torrent_state(torrent))])
 
         # Emit torrent_added signal
         from_state = state is not None
         component.get("EventManager").emit(
             TorrentAddedEvent(torrent.torrent_id, from_state)
         )
-        log.info("Torrent %s from user \"%s\" %s",
-                 torrent.get_status(["name"])["name"],
-                 torrent.get_status(["owner"])["owner"],
-                 (from_state and "loaded" or "added"))
+        log.info("Torrent %s from user \"%s\" %s", torrent.get_name(),
+                 torrent.owner, (from_state and "loaded" or "added"))
         return torrent.torrent_id
 
+    def add_multiple(self, torrents):
+        """
+        Adds several torrents to the manager in one pass.  The AlertManager
+        is only paused once for all of them and the new torrents are
+        committed to the session state with a single journal write.
+
+        :param torrents: the keyword arguments to pass to `add` for each torrent
+        :type torrents: list of dicts
+
+        :returns: the torrent_id, or None if it wasn't added, for each torrent
+        :rtype: list
+
+        """
+        torrent_ids = []
+        records = []
+        component.pause("AlertManager")
+        try:
+            for kwargs in torrents:
+                try:
+                    torrent_id = self.add(save_state=False, pause_alerts=False,
+                                          **kwargs)
+                except Exception, e:
+                    log.error("There was an error adding the torrent %s",
+                              kwargs.get("filename"))
+                    log.exception(e)
+                    torrent_id = None
+                torrent_ids.append(torrent_id)
+                if torrent_id:
+                    records.append(
+                        (ADD, self.create_torrent_state(self.torrents[torrent_id]))
+                    )
+        finally:
+            component.resume("AlertManager")
+
+        if records:
+            self.journal_state(records)
+            component.get("EventManager").emit(
+                TorrentsAddedEvent([record[1].torrent_id for record in records])
+            )
+        return torrent_ids
+
     def load_torrent(self, torrent_id):
         """Load a torrent file from state and return it's torrent info"""
         filedump = None
@@ -601,9 +737,7 @@ def remove(self, torrent_id, remove_data=False):
             return False
 
         # Remove fastresume data if it is exists
-        resume_data = self.load_resume_data_file()
-        resume_data.pop(torrent_id, None)
-        self.save_resume_data_file(resume_data)
+        self.resume_data_store.delete(torrent_id)
 
         # Remove the .torrent file in the state
         self.torrents[torrent_id].delete_torrentfile()
@@ -631,9 +765,10 @@ def remove(self, torrent_id, remove_data=False):
             del self.torrents[torrent_id]
         except (KeyError, ValueError):
             return False
+        self.ratio_watcher.unwatch(torrent_id)
 
-        # Save the session state
-        self.save_state()
+        # Record the removal in the session state
+        self.journal_state([(REMOVE, torrent_id)])
 
         # Emit the signal to the clients
         component.get("EventManager").emit(TorrentRemovedEvent(torrent_id))
@@ -664,20 +799,18 @@ def load_state(self):
         except Exception, e:
             log.warning("Unable to update state file to a compatible version: %s", e)
 
+        # Apply the changes made since the state file was saved
+        try:
+            state.torrents = self.state_journal.replay(state.torrents)
+        except (IOError, OSError), e:
+            log.warning("Unable to read the state journal: %s", e)
+
         # Reorder the state.torrents list to add torrents in the correct queue
         # order.
         state.torrents.sort(key=operator.attrgetter("queue"))
 
-        resume_data = self.load_resume_data_file()
-
-        for torrent_state in state.torrents:
-            try:
-                self.add(state=torrent_state, save_state=False,
-                         resume_data=resume_data.get(torrent_state.torrent_id))
-            except AttributeError, e:
-                log.error("Torrent state file is either corrupt or incompatible! %s", e)
-                break
-
+        # Move the resume data from the single file of previous versions
+        self.migrate_resume_data_file()
 
         if lt.version_minor < 16:
             log.debug("libtorrent version is lower than 0.16. Start looping "
@@ -689,47 +822,221 @@ def calculate_last_seen_complete():
                 calculate_last_seen_complete
             )
 
-        component.get("EventManager").emit(SessionStartedEvent())
+        return self.restore_torrents(state.torrents)
+
+    def restore_torrents(self, torrent_states):
+        """
+        Adds the torrents from the session state in chunks, between reactor
+        turns, so that the daemon is usable while a large session is being
+        restored.  The .torrent files of a chunk are decoded in the reactor's
+        thread pool while the previous chunk is being added.  Torrents which
+        were active are restored before the paused ones.
+
+        A `SessionRestoreProgressEvent` is emitted after each chunk and
+        `SessionStartedEvent` once all the torrents have been restored.
+
+        :param torrent_states: the torrents to restore, in queue order
+        :type torrent_states: list of :class:`TorrentState`
+
+        :returns: a Deferred which fires once all the torrents are restored
+        :rtype: twisted.internet.defer.Deferred
+
+        """
+        queue_order = torrent_states
+        # The sort is stable so the queue order is kept within both groups
+        torrent_states = sorted(torrent_states, key=operator.attrgetter("paused"))
+        chunks = [torrent_states[i:i + RESTORE_CHUNK_SIZE]
+                  for i in xrange(0, len(torrent_states), RESTORE_CHUNK_SIZE)]
+
+        self.restore_pending = dict((torrent_state.torrent_id, torrent_state)
+                                    for torrent_state in torrent_states)
+        self.restore_total = len(torrent_states)
+        self.restoring = True
+
+        def load_torrent_infos(chunk):
+            return DeferredList([
+                threads.deferToThread(
+                    self.get_torrent_info_from_file,
+                    os.path.join(get_config_dir(), "state",
+                                 torrent_state.torrent_id + ".torrent"))
+                for torrent_state in chunk
+            ])
+
+        def add_chunk(results, index):
+            if not self.restoring:
+                # The torrentmanager was stopped
+                return
+            if index + 1 < len(chunks):
+                next_chunk = load_torrent_infos(chunks[index + 1])
+
+            component.pause("AlertManager")
+            try:
+                for torrent_state, (success, torrent_info) in zip(chunks[index], results):
+                    self.restore_pending.pop(torrent_state.torrent_id, None)
+                    try:
+                        self.add(state=torrent_state, save_state=False,
+                                 torrent_info=success and torrent_info or None,
+                                 pause_alerts=False,
+                                 resume_data=self.resume_data_store.get(torrent_state.torrent_id))
+                    except Exception, e:
+                        # Don't let one bad torrent state abort the restore
+                        log.error("Unable to restore torrent %s, its state is "
+                                  "either corrupt or incompatible! %s",
+                                  torrent_state.torrent_id, e)
+                        log.exception(e)
+            finally:
+                component.resume("AlertManager")
+
+            component.get("EventManager").emit(SessionRestoreProgressEvent(
+                self.restore_total - len(self.restore_pending), self.restore_total))
+
+            if self.restore_pending:
+                next_chunk.addCallback(
+                    lambda results: deferLater(reactor, 0, add_chunk, results, index + 1))
+                return next_chunk
+
+        def on_restored(result):
+            if isinstance(result, Failure):
+                log.error("Error restoring the session state: %s",
+                          result.getErrorMessage())
+            if not self.restoring:
+                return
+            self.restoring = False
+            self.restore_pending = {}
+            if torrent_states != queue_order:
+                self.restore_queue_order(queue_order, torrent_states)
+            log.info("Restored %s torrents from the session state", len(self.torrents))
+            component.get("EventManager").emit(SessionStartedEvent())
+
+        if chunks:
+            d = load_torrent_infos(chunks[0])
+            d.addCallback(add_chunk, 0)
+        else:
+            d = DeferredList([])
+        d.addBoth(on_restored)
+        return d
+
+    def restore_queue_order(self, torrent_states, added_states):
+        """
+        Puts the queued torrents back in their order from the session state,
+        libtorrent queues the torrents in the order they were added.  The
+        longest start of the saved order which the torrents were added in is
+        kept, only the torrents after it are moved to the bottom of the queue.
+
+        :param torrent_states: the torrents' states, in queue order
+        :type torrent_states: list of :class:`TorrentState`
+        :param added_states: the torrents' states, in the order they were added
+        :type added_states: list of :class:`TorrentState`
+
+        """
+        def get_queued(states):
+            return [torrent_state.torrent_id for torrent_state in states
+                    if torrent_state.queue >= 0 and
+                    torrent_state.torrent_id in self.torrents]
+
+        saved = get_queued(torrent_states)
+        kept = 0
+        for torrent_id in get_queued(added_states):
+            if kept < len(saved) and torrent_id == saved[kept]:
+                kept += 1
+
+        for torrent_id in saved[kept:]:
+            self.torrents[torrent_id].handle.queue_position_bottom()
+
+    def get_restore_progress(self):
+        """
+        Returns how far the restore of the session state has got.
+
+        :returns: the number of torrents restored and the number to restore
+        :rtype: tuple
+
+        """
+        return (self.restore_total - len(self.restore_pending), self.restore_total)
+
+    def create_torrent_state(self, torrent):
+        """
+        Creates the TorrentState to save for a torrent.
+
+        :param torrent: the torrent
+        :type torrent: :class:`deluge.core.torrent.Torrent`
+
+        :returns: the torrent's state
+        :rtype: :class:`TorrentState`
+
+        """
+        paused = False
+        if torrent.state == "Paused":
+            paused = True
+
+        return TorrentState(
+            torrent.torrent_id,
+            torrent.filename,
+            torrent.get_status(["total_uploaded"])["total_uploaded"],
+            torrent.trackers,
+            torrent.options["compact_allocation"],
+            paused,
+            torrent.options["download_location"],
+            torrent.options["max_connections"],
+            torrent.options["max_upload_slots"],
+            torrent.options["max_upload_speed"],
+            torrent.options["max_download_speed"],
+            torrent.options["prioritize_first_last_pieces"],
+            torrent.options["sequential_download"],
+            torrent.options["file_priorities"],
+            torrent.get_queue_position(),
+            torrent.options["auto_managed"],
+            torrent.is_finished,
+            torrent.options["stop_ratio"],
+            torrent.options["stop_at_ratio"],
+            torrent.options["remove_at_ratio"],
+            torrent.options["move_completed"],
+            torrent.options["move_completed_path"],
+            torrent.magnet,
+            torrent.time_added,
+            torrent.get_last_seen_complete(),
+            torrent.owner,
+            torrent.options["shared"]
+        )
+
+    def save_torrents_state(self, torrent_ids):
+        """
+        Records the current state of some torrents without saving the whole
+        session state.
+
+        :param torrent_ids: the torrent_ids
+        :type torrent_ids: list
+
+        """
+        self.journal_state([
+            (UPDATE, self.create_torrent_state(self.torrents[torrent_id]))
+            for torrent_id in torrent_ids
+        ])
+
+    def journal_state(self, records):
+        """
+        Appends records to the state journal.  The whole state is saved instead
+        if the journal can't be written or has grown too long.
+
+        :param records: the (type, data) records, see
+            :class:`deluge.core.statejournal.StateJournal`
+        :type records: list
+
+        """
+        if not self.state_journal.append(records) or \
+                self.state_journal.records >= self.state_journal.max_records:
+            self.save_state()
 
     def save_state(self):
-        """Save the state of the TorrentManager to the torrents.state file"""
+        """
+        Save the state of the TorrentManager to the torrents.state file, this
+        also empties the state journal.
+        """
         state = TorrentManagerState()
         # Create the state for each Torrent and append to the list
         for torrent in self.torrents.values():
-            paused = False
-            if torrent.state == "Paused":
-                paused = True
-
-            torrent_state = TorrentState(
-                torrent.torrent_id,
-                torrent.filename,
-                torrent.get_status(["total_uploaded"])["total_uploaded"],
-                torrent.trackers,
-                torrent.options["compact_allocation"],
-                paused,
-                torrent.options["download_location"],
-                torrent.options["max_connections"],
-                torrent.options["max_upload_slots"],
-                torrent.options["max_upload_speed"],
-                torrent.options["max_download_speed"],
-                torrent.options["prioritize_first_last_pieces"],
-                torrent.options["sequential_download"],
-                torrent.options["file_priorities"],
-                torrent.get_queue_position(),
-                torrent.options["auto_managed"],
-                torrent.is_finished,
-                torrent.options["stop_ratio"],
-                torrent.options["stop_at_ratio"],
-                torrent.options["remove_at_ratio"],
-                torrent.options["move_completed"],
-                torrent.options["move_completed_path"],
-                torrent.magnet,
-                torrent.time_added,
-                torrent.get_last_seen_complete(),
-                torrent.owner,
-                torrent.options["shared"]
-            )
-            state.torrents.append(torrent_state)
+            state.torrents.append(self.create_torrent_state(torrent))
+        # Keep the torrents which haven't been restored yet
+        state.torrents.extend(self.restore_pending.values())
 
         # Pickle the TorrentManagerState object
         try:
@@ -753,6 +1060,9 @@ def save_state(self):
             log.warning("Unable to save state file.")
             return True
 
+        # The journal changes are all in the state file now
+        self.state_journal.clear()
+
         # We return True so that the timer thread will continue
         return True
 
@@ -767,10 +1077,58 @@ def save_resume_data(self, torrent_ids=None):
 
         for torrent_id in torrent_ids:
             self.torrents[torrent_id].save_resume_data()
+            self.resume_data_queue.pop(torrent_id, None)
+            self.resume_data_stats["saved"] += 1
 
-        self.num_resume_data = len(torrent_ids)
+    def queue_dirty_resume_data(self, torrent_ids=None):
+        """
+        Queues the torrents whose resume data changed since it was last saved,
+        the others are skipped.  The queue is saved in batches by
+        `save_queued_resume_data`.
+
+        :param torrent_ids: the torrents to check, all of them if None
+        :type torrent_ids: list
+
+        """
+        if torrent_ids is None:
+            torrent_ids = self.torrents.keys()
+
+        for torrent_id in torrent_ids:
+            if torrent_id in self.resume_data_queue:
+                continue
+            if self.torrents[torrent_id].needs_resume_data():
+                self.resume_data_queue[torrent_id] = None
+            else:
+                self.resume_data_stats["skipped"] += 1
+
+    def save_queued_resume_data(self):
+        """Asks the next batch of queued torrents for their resume data"""
+        torrent_ids = []
+        while self.resume_data_queue and len(torrent_ids) < RESUME_DATA_BATCH_SIZE:
+            torrent_id = self.resume_data_queue.popitem(last=False)[0]
+            if torrent_id in self.torrents:
+                torrent_ids.append(torrent_id)
+        self.save_resume_data(torrent_ids)
+
+    def get_resume_data_stats(self):
+        """
+        Returns the resume data counters.
+
+        :returns: the number of times torrents were asked for their resume
+            data ("saved"), skipped as it hadn't changed ("skipped") or failed
+            to save it ("failed"), and the number waiting to save it ("queued")
+        :rtype: dict
+
+        """
+        stats = self.resume_data_stats.copy()
+        stats["queued"] = len(self.resume_data_queue)
+        return stats
 
     def load_resume_data_file(self):
+        """
+        Loads the torrents.fastresume file used by previous versions to hold
+        the resume data of all the torrents.
+        """
         resume_data = {}
         try:
             log.debug("Opening torrents fastresume file for load.")
@@ -788,39 +1146,25 @@ def load_resume_data_file(self):
 
         return resume_data
 
-    def save_resume_data_file(self, resume_data=None):
+    def migrate_resume_data_file(self):
         """
-        Saves the resume data file with the contents of self.resume_data.  If
-        `resume_data` is None, then we grab the resume_data from the file on
-        disk, else, we update `resume_data` with self.resume_data and save
-        that to disk.
-
-        :param resume_data: the current resume_data, this will be loaded from disk if not provided
-        :type resume_data: dict
-
+        Moves the resume data of the torrents.fastresume file to the resume
+        data store and removes the file.
         """
-        # Check to see if we're waiting on more resume data
-        if self.num_resume_data or not self.resume_data:
-            return
-
         path = os.path.join(get_config_dir(), "state", "torrents.fastresume")
+        if not os.path.isfile(path):
+            return
 
-        # First step is to load the existing file and update the dictionary
-        if resume_data is None:
-            resume_data = self.load_resume_data_file()
-
-        resume_data.update(self.resume_data)
-        self.resume_data = {}
+        log.info("Moving the fastresume file to the resume data store..")
+        for torrent_id, resume_data in self.load_resume_data_file().iteritems():
+            if not self.resume_data_store.put(torrent_id, resume_data):
+                # Keep the file to try again next time
+                return
 
         try:
-            log.debug("Saving fastresume file: %s", path)
-            fastresume_file = open(path, "wb")
-            fastresume_file.write(lt.bencode(resume_data))
-            fastresume_file.flush()
-            os.fsync(fastresume_file.fileno())
-            fastresume_file.close()
-        except IOError:
-            log.warning("Error trying to save fastresume file")
+            os.remove(path)
+        except OSError, e:
+            log.warning("Unable to remove the fastresume file: %s", e)
 
     def remove_empty_folders(self, torrent_id, folder):
         """
@@ -932,6 +1276,7 @@ def on_alert_torrent_finished(self, alert):
                     torrent.move_storage(move_path)
 
             torrent.is_finished = True
+            self.ratio_watcher.watch(torrent_id)
             component.get("EventManager").emit(TorrentFinishedEvent(torrent_id))
 
         torrent.update_state()
@@ -952,16 +1297,13 @@ def on_alert_torrent_paused(self, alert):
             return
         torrent_id = str(alert.handle.info_hash())
         # Set the torrent state
-        old_state = torrent.state
         torrent.update_state()
-        if torrent.state != old_state:
-            component.get("EventManager").emit(TorrentStateChangedEvent(torrent_id, torrent.state))
 
         # Don't save resume data for each torrent after self.stop() was called.
         # We save resume data in bulk in self.stop() in this case.
         if self.save_resume_data_timer.running:
-            # Write the fastresume file
-            self.save_resume_data((torrent_id, ))
+            # Write the fastresume file if it changed
+            self.queue_dirty_resume_data((torrent_id, ))
 
         if torrent_id in self.shutdown_torrent_pause_list:
             self.shutdown_torrent_pause_list.remove(torrent_id)
@@ -1037,6 +1379,7 @@ def on_alert_storage_moved(self, alert):
             return
         torrent.set_save_path(os.path.normpath(alert.handle.save_path()))
         torrent.set_move_completed(False)
+        torrent.resume_data_dirty = True
 
     def on_alert_torrent_resumed(self, alert):
         log.debug("on_alert_torrent_resumed")
@@ -1046,11 +1389,7 @@ def on_alert_torrent_resumed(self, alert):
             return
         torrent_id = str(alert.handle.info_hash())
         torrent.is_finished = torrent.handle.is_seed()
-        old_state = torrent.state
         torrent.update_state()
-        if torrent.state != old_state:
-            # We need to emit a TorrentStateChangedEvent too
-            component.get("EventManager").emit(TorrentStateChangedEvent(torrent_id, torrent.state))
         component.get("EventManager").emit(TorrentResumedEvent(torrent_id))
 
     def on_alert_state_changed(self, alert):
@@ -1061,11 +1400,7 @@ def on_alert_state_changed(self, alert):
         except:
             return
 
-        old_state = torrent.state
         torrent.update_state()
-        # Only emit a state changed event if the state has actually changed
-        if torrent.state != old_state:
-            component.get("EventManager").emit(TorrentStateChangedEvent(torrent_id, torrent.state))
 
     def on_alert_save_resume_data(self, alert):
         log.debug("on_alert_save_resume_data")
@@ -1078,13 +1413,10 @@ def on_alert_save_resume_data(self, alert):
             return
 
         # Libtorrent in add_torrent() expects resume_data to be bencoded
-        self.resume_data[torrent_id] = lt.bencode(alert.resume_data)
-        self.num_resume_data -= 1
+        self.resume_data_store.put(torrent_id, lt.bencode(alert.resume_data))
 
         torrent.waiting_on_resume_data = False
 
-        self.save_resume_data_file()
-
     def on_alert_save_resume_data_failed(self, alert):
         log.debug("on_alert_save_resume_data_failed: %s", alert.message())
         try:
@@ -1092,11 +1424,9 @@ def on_alert_save_resume_data_failed(self, alert):
         except:
             return
 
-        self.num_resume_data -= 1
         torrent.waiting_on_resume_data = False
-
-        self.save_resume_data_file()
-
+        torrent.resume_data_dirty = True
+        self.resume_data_stats["failed"] += 1
 
     def on_alert_file_renamed(self, alert):
         log.debug("on_alert_file_renamed")
@@ -1106,6 +1436,7 @@ def on_alert_file_renamed(self, alert):
         except:
             return
         torrent_id = str(alert.handle.info_hash())
+        torrent.invalidate_metadata()
 
         # We need to see if this file index is in a waiting_on_folder list
         folder_rename = False
@@ -1148,5 +1479,7 @@ def on_alert_file_error(self, alert):
     def on_alert_file_completed(self, alert):
         log.debug("file_completed_alert: %s", alert.message())
         torrent_id = str(alert.handle.info_hash())
+        if torrent_id in self.torrents:
+            self.torrents[torrent_id].resume_data_dirty = True
         component.get("EventManager").emit(
             TorrentFileCompletedEvent(torrent_id, alert.index))
@@ -0,0 +1,197 @@
+#
+# trackerhost.py
+#
+# Copyright (C) 2026 agent <agent@local>
+#
+# Deluge is free software.
+#
+# You may redistribute it and/or modify it under the terms of the
+# GNU General Public License, as published by the Free Software
+# Foundation; either version 3 of the License, or (at your option)
+# any later version.
+#
+# deluge is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with deluge.    If not, write to:
+# 	The Free Software Foundation, Inc.,
+# 	51 Franklin Street, Fifth Floor
+# 	Boston, MA  02110-1301, USA.
+#
+#    In addition, as a special exception, the copyright holders give
+#    permission to link the code of portions of this program with the OpenSSL
+#    library.
+#    You must obey the GNU General Public License in all respects for all of
+#    the code used other than OpenSSL. If you modify file(s) with this
+#    exception, you may extend this exception to your version of the file(s),
+#    but you are not obligated to do so. If you do not wish to do so, delete
+#    this exception statement from your version. If you delete this exception
+#    statement from all source files in the program, then also delete it here.
+#
+#
+
+"""
+Works out the host shown for a torrent's tracker, ie, the registered domain
+of the tracker's url, using the Public Suffix List when it's installed on
+the system. The results are shared by all the torrents, since many of them
+usually announce to the same few trackers.
+"""
+
+import os
+import socket
+import logging
+from urlparse import urlparse
+
+log = logging.getLogger(__name__)
+
+# The locations of the Public Suffix List as installed by distributions
+PUBLIC_SUFFIX_LIST_PATHS = (
+    "/usr/share/publicsuffix/public_suffix_list.dat",
+    "/usr/share/publicsuffix/effective_tld_names.dat",
+)
+
+# The public suffixes used when the list isn't installed
+DEFAULT_PUBLIC_SUFFIXES = """
+com net org edu gov mil int info biz name pro mobi aero asia coop jobs museum
+tel travel xxx io me tv cc ws eu us ca de fr nl be ch at se no dk fi pl cz ru
+ua it es pt gr ro hu bg lt lv ee sk si hr rs is ie lu li mx ar cl pe ve kr tw
+hk cn jp in id my sg th vn ph nz au za br tr il ir su
+
+co.uk org.uk me.uk ltd.uk plc.uk net.uk ac.uk gov.uk
+com.au net.au org.au edu.au gov.au asn.au id.au
+co.nz net.nz org.nz ac.nz govt.nz
+co.jp ne.jp or.jp ac.jp go.jp
+co.kr or.kr ne.kr
+com.br net.br org.br
+com.cn net.cn org.cn edu.cn gov.cn
+com.hk net.hk org.hk
+com.tw net.tw org.tw idv.tw
+com.mx net.mx org.mx
+com.ar net.ar org.ar
+com.tr net.tr org.tr
+com.ru net.ru org.ru
+com.ua net.ua org.ua
+co.in net.in org.in firm.in gen.in ind.in
+co.za net.za org.za
+co.il org.il net.il ac.il
+com.sg net.sg org.sg
+com.my net.my org.my
+co.id net.id or.id web.id
+com.pl net.pl org.pl
+com.es nom.es org.es
+com.pt org.pt
+"""
+
+# The most tracker urls to remember the host of
+MAX_CACHED_HOSTS = 10000
+
+_rules = None
+_hosts = {}
+
+def parse_public_suffixes(lines):
+    """
+    Parses the rules of the Public Suffix List, in its file format.
+
+    :param lines: the lines of the list
+    :type lines: iterable of str
+    :returns: the rules, wildcard rules prefixed with "*." and exception
+        rules with "!"
+    :rtype: set
+
+    """
+    rules = set()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("//"):
+            continue
+        for rule in line.split():
+            try:
+                rule = rule.decode("utf8").encode("idna")
+            except UnicodeError:
+                continue
+            rules.add(rule.lower())
+    return rules
+
+def get_public_suffixes():
+    """
+    Returns the public suffix rules, read from the system's Public Suffix List
+    the first time they're needed.
+    """
+    global _rules
+    if _rules is None:
+        for path in PUBLIC_SUFFIX_LIST_PATHS:
+            if os.path.isfile(path):
+                try:
+                    _rules = parse_public_suffixes(open(path, "rb"))
+                except IOError, e:
+                    log.warning("Unable to read the public suffix list %s: %s",
+                                path, e)
+                    continue
+                log.debug("Loaded %d public suffixes from %s",
+                          len(_rules), path)
+                break
+        else:
+            _rules = parse_public_suffixes(DEFAULT_PUBLIC_SUFFIXES.split())
+    return _rules
+
+def get_registered_domain(host):
+    """
+    Returns the registered domain of a host name, ie, its public suffix and
+    the label before it, or the host itself when it's a public suffix.
+
+    :param host: the host name
+    :type host: str
+    :returns: the registered domain
+    :rtype: str
+
+    """
+    rules = get_public_suffixes()
+    labels = host.lower().split(".")
+    # The default rule is that the last label is a public suffix
+    suffix_length = 1
+    for index in xrange(len(labels)):
+        candidate = ".".join(labels[index:])
+        if "!" + candidate in rules:
+            suffix_length = len(labels) - index - 1
+            break
+        if candidate in rules or (index + 1 < len(labels) and
+                "*." + ".".join(labels[index + 1:]) in rules):
+            suffix_length = len(labels) - index
+            break
+    if suffix_length >= len(labels):
+        return host
+    return ".".join(host.split(".")[-suffix_length - 1:])
+
+def get_tracker_host(url):
+    """
+    Returns the host to show for a tracker, its ip address or registered
+    domain, or "DHT" if the url has no host name.
+
+    :param url: the tracker's url
+    :type url: str
+    :returns: the tracker host
+    :rtype: str
+
+    """
+    try:
+        return _hosts[url]
+    except KeyError:
+        pass
+
+    host = ""
+    parsed = urlparse(url.replace("udp://", "http://"))
+    if hasattr(parsed, "hostname"):
+        host = parsed.hostname or "DHT"
+        try:
+            socket.inet_aton(host)
+        except socket.error:
+            if host != "DHT":
+                host = get_registered_domain(host)
+
+    if len(_hosts) >= MAX_CACHED_HOSTS:
+        _hosts.clear()
+    _hosts[url] = host
+    return host
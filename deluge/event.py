@@ -88,6 +88,19 @@ def __init__(self, torrent_id, from_state):
         """
         self._args = [torrent_id, from_state]
 
+class TorrentsAddedEvent(DelugeEvent):
+    """
+    Emitted once after several torrents were added to the session in one
+    pass, see `core.add_torrent_files`.  A `TorrentAddedEvent` is still
+    emitted for each of the torrents.
+    """
+    def __init__(self, torrent_ids):
+        """
+        :param torrent_ids: the torrent_ids of the torrents that were added
+        :type torrent_ids: list
+        """
+        self._args = [torrent_ids]
+
 class TorrentRemovedEvent(DelugeEvent):
     """
     Emitted when a torrent has been removed from the session.
@@ -197,6 +210,22 @@ def __init__(self, torrent_id, index):
         """
         self._args = [torrent_id, index]
 
+class TorrentsStatusUpdatedEvent(DelugeEvent):
+    """
+    Emitted to a session subscribed to torrent status updates, see
+    `daemon.subscribe_status`.  It only holds the values which changed since
+    the last update sent to the session, and the torrents which were removed
+    or no longer match the subscription's filter.
+    """
+    def __init__(self, status, removed):
+        """
+        :param status: the changed status values, {torrent_id: {key: value}}
+        :type status: dict
+        :param removed: the torrent_ids no longer in the subscription
+        :type removed: list
+        """
+        self._args = [status, removed]
+
 class CreateTorrentProgressEvent(DelugeEvent):
     """
     Emitted when creating a torrent file remotely.
@@ -222,6 +251,20 @@ class SessionStartedEvent(DelugeEvent):
     """
     pass
 
+class SessionRestoreProgressEvent(DelugeEvent):
+    """
+    Emitted while the torrents are being restored from the session state,
+    after each chunk of torrents is added.
+    """
+    def __init__(self, num_restored, num_total):
+        """
+        :param num_restored: the number of torrents restored so far
+        :type num_restored: int
+        :param num_total: the number of torrents to restore
+        :type num_total: int
+        """
+        self._args = [num_restored, num_total]
+
 class SessionPausedEvent(DelugeEvent):
     """
     Emitted when the session has been paused.
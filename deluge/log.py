@@ -37,13 +37,16 @@
 """Logging functions"""
 
 import os
+import Queue
+import atexit
 import inspect
 import logging
+import threading
 from deluge import common
-from twisted.internet import defer
 from twisted.python.log import PythonLoggingObserver
 
-__all__ = ["setupLogger", "setLoggerLevel", "getPluginLogger", "LOG"]
+__all__ = ["setupLogger", "setLoggerLevel", "flushLogger", "getPluginLogger",
+           "LOG", "QueueHandler"]
 
 LoggingLoggerClass = logging.getLoggerClass()
 
@@ -68,39 +71,42 @@ def __init__(self, logger_name):
                     datefmt="%H:%M:%S"
                 ))
 
-    @defer.inlineCallbacks
+    # The level is checked before anything else is done so that disabled
+    # log calls, which are the vast majority on the hot paths, cost no more
+    # than a method call and an integer comparison.
     def garbage(self, msg, *args, **kwargs):
-        yield LoggingLoggerClass.log(self, 1, msg, *args, **kwargs)
+        if self.isEnabledFor(1):
+            self._log(1, msg, args, **kwargs)
 
-    @defer.inlineCallbacks
     def trace(self, msg, *args, **kwargs):
-        yield LoggingLoggerClass.log(self, 5, msg, *args, **kwargs)
+        if self.isEnabledFor(5):
+            self._log(5, msg, args, **kwargs)
 
-    @defer.inlineCallbacks
     def debug(self, msg, *args, **kwargs):
-        yield LoggingLoggerClass.debug(self, msg, *args, **kwargs)
+        if self.isEnabledFor(logging.DEBUG):
+            self._log(logging.DEBUG, msg, args, **kwargs)
 
-    @defer.inlineCallbacks
     def info(self, msg, *args, **kwargs):
-        yield LoggingLoggerClass.info(self, msg, *args, **kwargs)
+        if self.isEnabledFor(logging.INFO):
+            self._log(logging.INFO, msg, args, **kwargs)
 
-    @defer.inlineCallbacks
     def warning(self, msg, *args, **kwargs):
-        yield LoggingLoggerClass.warning(self, msg, *args, **kwargs)
+        if self.isEnabledFor(logging.WARNING):
+            self._log(logging.WARNING, msg, args, **kwargs)
 
     warn = warning
 
-    @defer.inlineCallbacks
     def error(self, msg, *args, **kwargs):
-        yield LoggingLoggerClass.error(self, msg, *args, **kwargs)
+        if self.isEnabledFor(logging.ERROR):
+            self._log(logging.ERROR, msg, args, **kwargs)
 
-    @defer.inlineCallbacks
     def critical(self, msg, *args, **kwargs):
-        yield LoggingLoggerClass.critical(self, msg, *args, **kwargs)
+        if self.isEnabledFor(logging.CRITICAL):
+            self._log(logging.CRITICAL, msg, args, **kwargs)
 
-    @defer.inlineCallbacks
     def exception(self, msg, *args, **kwargs):
-        yield LoggingLoggerClass.exception(self, msg, *args, **kwargs)
+        kwargs["exc_info"] = 1
+        self.error(msg, *args, **kwargs)
 
     def findCaller(self):
         f = logging.currentframe().f_back
@@ -108,14 +114,83 @@ def findCaller(self):
         while hasattr(f, "f_code"):
             co = f.f_code
             filename = os.path.normcase(co.co_filename)
-            if filename in (__file__.replace('.pyc', '.py'),
-                            defer.__file__.replace('.pyc', '.py')):
+            if filename == _srcfile:
                 f = f.f_back
                 continue
             rv = (filename, f.f_lineno, co.co_name)
             break
         return rv
 
+_srcfile = os.path.normcase(__file__.replace('.pyc', '.py'))
+
+class QueueHandler(logging.Handler):
+    """
+    A handler which passes the records to a background thread, which then
+    formats them and writes them out using the wrapped handler, so that the
+    logging caller doesn't have to wait on the formatting or the disk.
+
+    :param handler: the handler to write the records with
+    :type handler: logging.Handler
+
+    """
+    def __init__(self, handler):
+        logging.Handler.__init__(self, handler.level)
+        self.handler = handler
+        self.queue = None
+        self.thread = None
+        self.pid = None
+
+    def setLevel(self, level):
+        logging.Handler.setLevel(self, level)
+        self.handler.setLevel(level)
+
+    def setFormatter(self, fmt):
+        self.handler.setFormatter(fmt)
+
+    def emit(self, record):
+        # The traceback can't outlive the calling frame, so render it now
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(
+                    record.exc_info)
+            record.exc_info = None
+        if self.pid != os.getpid():
+            self.__start()
+        self.queue.put(record)
+
+    def flush(self):
+        """
+        Blocks until all the queued records have been written out.
+        """
+        if self.pid == os.getpid() and self.thread.isAlive():
+            self.queue.join()
+        self.handler.flush()
+
+    def close(self):
+        self.flush()
+        self.handler.close()
+        logging.Handler.close(self)
+
+    def __start(self):
+        # The writer thread doesn't survive a fork, so a new one, with its own
+        # queue, is started in the child process.
+        self.pid = os.getpid()
+        self.queue = Queue.Queue()
+        self.thread = threading.Thread(target=self.__run,
+                                       name="LoggingQueueHandler")
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def __run(self):
+        while True:
+            record = self.queue.get()
+            try:
+                self.handler.handle(record)
+            except Exception:
+                self.handler.handleError(record)
+            finally:
+                self.queue.task_done()
+
 levels = {
     "none": logging.NOTSET,
     "info": logging.INFO,
@@ -129,13 +204,15 @@ def findCaller(self):
 }
 
 
-def setupLogger(level="error", filename=None, filemode="w"):
+def setupLogger(level="error", filename=None, filemode="w", threaded=False):
     """
     Sets up the basic logger and if `:param:filename` is set, then it will log
     to that file instead of stdout.
 
     :param level: str, the level to log
     :param filename: str, the file to log to
+    :param threaded: bool, if True the records are formatted and written out
+                     from a background thread
     """
     import logging
 
@@ -174,6 +251,9 @@ def setupLogger(level="error", filename=None, filemode="w"):
     )
 
     handler.setFormatter(formatter)
+    if threaded:
+        handler = QueueHandler(handler)
+        atexit.register(handler.flush)
     rootLogger.addHandler(handler)
     rootLogger.setLevel(level)
 
@@ -181,6 +261,15 @@ def setupLogger(level="error", filename=None, filemode="w"):
     twisted_logging.start()
     logging.getLogger("twisted").setLevel(level)
 
+def flushLogger():
+    """
+    Blocks until the records queued by the root logger's handlers have been
+    written out, ie, before forking or exiting without running the exit
+    handlers.
+    """
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
 def tweak_logging_levels():
     """This function allows tweaking the logging levels for all or some loggers.
     This is mostly usefull for developing purposes hence the contents of the
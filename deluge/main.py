@@ -188,9 +188,11 @@ def start_daemon():
     if options.rotate_logs:
         logfile_mode = 'a'
 
-    # Setup the logger
+    # Setup the logger, writing the log file from a background thread so that
+    # the daemon's reactor doesn't wait on the disk.
     deluge.log.setupLogger(level=options.loglevel, filename=options.logfile,
-                           filemode=logfile_mode)
+                           filemode=logfile_mode,
+                           threaded=bool(options.logfile))
 
     import deluge.configmanager
     if options.config:
@@ -210,6 +212,9 @@ def write_pidfile():
 
     # If the donot daemonize is set, then we just skip the forking
     if not (deluge.common.windows_check() or deluge.common.osx_check() or options.donot):
+        # The parent exits without running the exit handlers, so write out
+        # what's been logged so far first.
+        deluge.log.flushLogger()
         if os.fork():
             # We've forked and this is now the parent process, so die!
             os._exit(0)
@@ -158,7 +158,7 @@ def set_options(self, watchdir_id, options):
         #re-enable watch loop if appropriate
         if self.watchdirs[watchdir_id]['enabled']:
             self.enable_watchdir(watchdir_id)
-        self.config.save()
+        self.config.mark_dirty()
         component.get("EventManager").emit(AutoaddOptionsChangedEvent())
 
     def load_torrent(self, filename):
@@ -205,6 +205,7 @@ def update_watchdir(self, watchdir_id):
             if OPTIONS_AVAILABLE.get(option):
                 if watchdir.get(option+'_toggle', True):
                     opts[option] = value
+        torrents = []
         for filename in os.listdir(watchdir["abspath"]):
             try:
                 filepath = os.path.join(watchdir["abspath"], filename)
@@ -236,57 +237,66 @@ def update_watchdir(self, watchdir_id):
                         self.invalid_torrents[filename] = 1
                     continue
 
-                # The torrent looks good, so lets add it to the session.
-                torrent_id = component.get("TorrentManager").add(
-                    filedump=filedump, filename=filename, options=opts,
-                    owner=watchdir.get("owner", "localclient")
-                )
-                # If the torrent added successfully, set the extra options.
-                if torrent_id:
-                    if 'Label' in component.get("CorePluginManager").get_enabled_plugins():
-                        if watchdir.get('label_toggle', True) and watchdir.get('label'):
-                            label = component.get("CorePlugin.Label")
-                            if not watchdir['label'] in label.get_labels():
-                                label.add(watchdir['label'])
-                            label.set_torrent(torrent_id, watchdir['label'])
-                    if watchdir.get('queue_to_top_toggle', True) and 'queue_to_top' in watchdir:
-                        if watchdir['queue_to_top']:
-                            component.get("TorrentManager").queue_top(torrent_id)
-                        else:
-                            component.get("TorrentManager").queue_bottom(torrent_id)
-
-                # Rename, copy or delete the torrent once added to deluge.
-                if watchdir.get('append_extension_toggle'):
-                    if not watchdir.get('append_extension'):
-                        watchdir['append_extension'] = ".added"
-                    os.rename(filepath, filepath + watchdir['append_extension'])
-                elif watchdir.get('copy_torrent_toggle'):
-                    copy_torrent_path = watchdir['copy_torrent']
-                    copy_torrent_file = os.path.join(copy_torrent_path, filename)
-                    log.debug("Moving added torrent file \"%s\" to \"%s\"",
-                              os.path.basename(filepath), copy_torrent_path)
-                    try:
-                        os.rename(filepath, copy_torrent_file)
-                    except OSError, why:
-                        if why.errno == 18:
-                            # This can happen for different mount points
-                            from shutil import copyfile
+                torrents.append((filename, filepath, filedump))
+
+        if not torrents:
+            return
+
+        # The torrents look good, so lets add them to the session in one go.
+        torrent_ids = component.get("TorrentManager").add_multiple([{
+            "filedump": filedump,
+            "filename": filename,
+            "options": opts,
+            "owner": watchdir.get("owner", "localclient")
+        } for filename, filepath, filedump in torrents])
+
+        for (filename, filepath, filedump), torrent_id in zip(torrents, torrent_ids):
+            # If the torrent added successfully, set the extra options.
+            if torrent_id:
+                if 'Label' in component.get("CorePluginManager").get_enabled_plugins():
+                    if watchdir.get('label_toggle', True) and watchdir.get('label'):
+                        label = component.get("CorePlugin.Label")
+                        if not watchdir['label'] in label.get_labels():
+                            label.add(watchdir['label'])
+                        label.set_torrent(torrent_id, watchdir['label'])
+                if watchdir.get('queue_to_top_toggle', True) and 'queue_to_top' in watchdir:
+                    if watchdir['queue_to_top']:
+                        component.get("TorrentManager").queue_top(torrent_id)
+                    else:
+                        component.get("TorrentManager").queue_bottom(torrent_id)
+
+            # Rename, copy or delete the torrent once added to deluge.
+            if watchdir.get('append_extension_toggle'):
+                if not watchdir.get('append_extension'):
+                    watchdir['append_extension'] = ".added"
+                os.rename(filepath, filepath + watchdir['append_extension'])
+            elif watchdir.get('copy_torrent_toggle'):
+                copy_torrent_path = watchdir['copy_torrent']
+                copy_torrent_file = os.path.join(copy_torrent_path, filename)
+                log.debug("Moving added torrent file \"%s\" to \"%s\"",
+                          os.path.basename(filepath), copy_torrent_path)
+                try:
+                    os.rename(filepath, copy_torrent_file)
+                except OSError, why:
+                    if why.errno == 18:
+                        # This can happen for different mount points
+                        from shutil import copyfile
+                        try:
+                            copyfile(filepath, copy_torrent_file)
+                            os.remove(filepath)
+                        except OSError:
+                            # Last Resort!
                             try:
-                                copyfile(filepath, copy_torrent_file)
+                                open(copy_torrent_file, 'wb').write(
+                                    open(filepath, 'rb').read()
+                                )
                                 os.remove(filepath)
-                            except OSError:
-                                # Last Resort!
-                                try:
-                                    open(copy_torrent_file, 'wb').write(
-                                        open(filepath, 'rb').read()
-                                    )
-                                    os.remove(filepath)
-                                except OSError, why:
-                                    raise why
-                        else:
-                            raise why
-                else:
-                    os.remove(filepath)
+                            except OSError, why:
+                                raise why
+                    else:
+                        raise why
+            else:
+                os.remove(filepath)
 
     def on_update_watchdir_error(self, failure, watchdir_id):
         """Disables any watch folders with un-handled exceptions."""
@@ -306,7 +316,7 @@ def enable_watchdir(self, watchdir_id):
         # Update the config
         if not self.watchdirs[w_id]['enabled']:
             self.watchdirs[w_id]['enabled'] = True
-            self.config.save()
+            self.config.mark_dirty()
             component.get("EventManager").emit(AutoaddOptionsChangedEvent())
 
     @export
@@ -320,7 +330,7 @@ def disable_watchdir(self, watchdir_id):
         # Update the config
         if self.watchdirs[w_id]['enabled']:
             self.watchdirs[w_id]['enabled'] = False
-            self.config.save()
+            self.config.mark_dirty()
             component.get("EventManager").emit(AutoaddOptionsChangedEvent())
 
     @export
@@ -329,7 +339,7 @@ def set_config(self, config):
         config = self._make_unicode(config)
         for key in config.keys():
             self.config[key] = config[key]
-        self.config.save()
+        self.config.mark_dirty()
         component.get("EventManager").emit(AutoaddOptionsChangedEvent())
 
     @export
@@ -383,7 +393,7 @@ def add(self, options={}):
         if options.get('enabled'):
             self.enable_watchdir(watchdir_id)
         self.config['next_id'] = watchdir_id + 1
-        self.config.save()
+        self.config.mark_dirty()
         component.get("EventManager").emit(AutoaddOptionsChangedEvent())
         return watchdir_id
 
@@ -396,7 +406,7 @@ def remove(self, watchdir_id):
         if self.watchdirs[watchdir_id]['enabled']:
             self.disable_watchdir(watchdir_id)
         del self.watchdirs[watchdir_id]
-        self.config.save()
+        self.config.mark_dirty()
         component.get("EventManager").emit(AutoaddOptionsChangedEvent())
 
     def __migrate_config_1_to_2(self, config):
@@ -41,6 +41,8 @@
 import feedparser # for parsing rss feeds
 import threading  # for threaded updates
 import re         # for regular expressions
+from twisted.internet import reactor
+from twisted.internet.defer import DeferredList
 from twisted.internet.task import LoopingCall
 
 from deluge.plugins.pluginbase import CorePluginBase
@@ -377,6 +379,7 @@ def run_filters(self, feedname, filters={}, test=False):
             filters = self.config['filters']
         log.debug("will test filters %s", filters)
         hits = {}
+        torrents = []
         # Test every entry...
         for entry in self.feeds[feedname]['entries']:
             # ...and every filter
@@ -408,7 +411,7 @@ def run_filters(self, feedname, filters={}, test=False):
                         # check history to prevent multiple adds of the same torrent
                         log.debug("testing %s", entry.link)
                         if not entry.link in self.history:
-                            self.add_torrent(entry.link, opts, self.feeds[feedname].cookies)
+                            torrents.append((entry.link, opts))
                             self.history.append(entry.link)
 
                             #limit history to 50 entries
@@ -417,6 +420,10 @@ def run_filters(self, feedname, filters={}, test=False):
                                 log.debug("wrapping history")
                         else:
                             log.debug("'%s' is in history, will not download", entry.link)
+        if torrents:
+            # Filters are run from the feed update thread
+            reactor.callFromThread(
+                self.add_torrents, torrents, self.feeds[feedname].cookies)
         return hits
 
 
@@ -432,3 +439,26 @@ def test_filter(self, entry, filter):
     def add_torrent(self, url, torrent_options, headers):
         log.debug("Attempting to add torrent %s", url)
         component.get("Core").add_torrent_url(url, torrent_options, headers)
+
+    def add_torrents(self, torrents, headers):
+        """Downloads the (url, torrent_options) torrents and adds them to
+        the session in one pass"""
+        core = component.get("Core")
+
+        def on_downloaded(results):
+            torrent_files = []
+            for (url, torrent_options), (success, result) in zip(torrents, results):
+                if success:
+                    torrent_files.append((result[0], result[1], torrent_options))
+                else:
+                    log.warning("Unable to download torrent %s: %s",
+                                url, result.getErrorMessage())
+            if torrent_files:
+                return core.add_torrent_files(torrent_files)
+
+        log.debug("Attempting to add torrents %s", [url for url, opts in torrents])
+        d = DeferredList([core.download_torrent_file(url, headers)
+                          for url, torrent_options in torrents],
+                         consumeErrors=True)
+        d.addCallback(on_downloaded)
+        return d
@@ -116,7 +116,7 @@ def enable(self):
         component.get("EventManager").register_event_handler("TorrentRemovedEvent", self.post_torrent_remove)
 
         #register tree:
-        component.get("FilterManager").register_tree_field("label", self.init_filter_dict)
+        component.get("FilterManager").register_tree_field("label", self.init_filter_dict, indexed=True)
 
         log.debug("Label plugin enabled..")
 
@@ -157,6 +157,8 @@ def clean_config(self):
             if (not label_id in self.labels) or (not torrent_id in self.torrents):
                 log.debug("label: rm %s:%s" % (torrent_id,label_id))
                 del self.torrent_labels[torrent_id]
+                if torrent_id in self.torrents:
+                    component.get("FilterManager").update_index(torrent_id, "label")
 
     def clean_initial_config(self):
         """
@@ -194,7 +196,7 @@ def add(self, label_id):
         CheckInput(not (label_id in self.labels) , _("Label already exists"))
 
         self.labels[label_id] = dict(OPTIONS_DEFAULTS)
-        self.config.save()
+        self.config.mark_dirty()
 
     @export
     def remove(self, label_id):
@@ -202,7 +204,7 @@ def remove(self, label_id):
         CheckInput(label_id in self.labels, _("Unknown Label"))
         del self.labels[label_id]
         self.clean_config()
-        self.config.save()
+        self.config.mark_dirty()
 
     def _set_torrent_options(self, torrent_id, label_id):
         options = self.labels[label_id]
@@ -298,7 +300,7 @@ def set_options(self, label_id, options_dict):
                 if self._has_auto_match(torrent, options):
                     self.set_torrent(torrent_id , label_id)
 
-        self.config.save()
+        self.config.mark_dirty()
 
     @export
     def get_options(self, label_id):
@@ -324,8 +326,9 @@ def set_torrent(self, torrent_id , label_id):
         if label_id:
             self.torrent_labels[torrent_id] = label_id
             self._set_torrent_options(torrent_id, label_id)
+        component.get("FilterManager").update_index(torrent_id, "label")
 
-        self.config.save()
+        self.config.mark_dirty()
 
     @export
     def get_config(self):
@@ -340,7 +343,7 @@ def set_config(self, options):
                 if key in CORE_OPTIONS:
                     self.config[key] = value
 
-            self.config.save()
+            self.config.mark_dirty()
 
     def _status_get_label(self, torrent_id):
         return self.torrent_labels.get(torrent_id) or ""
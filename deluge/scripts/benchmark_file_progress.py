@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+#
+# benchmark_file_progress.py
+#
+# Shows the cost of the "file_progress" and "file_progress_tree" status keys
+# for a torrent with many files, against working the progress out from the
+# files' dicts and rolling it up into the directories like the web UI did.
+#
+
+import os
+import sys
+import time
+import random
+
+from deluge._libtorrent import lt
+
+from deluge.core.torrent import TorrentMetadata
+
+# The old directory rollup is quadratic in the number of files below the top
+# directory, so it's only timed for up to this many files
+OLD_TREE_MAX_FILES = 2000
+
+def make_torrent_info(num_files, files_per_dir=100):
+    storage = lt.file_storage()
+    for i in xrange(num_files):
+        path = "torrent/dir%d/sub%d/file%d" % (i / (files_per_dir * 10),
+                                               i / files_per_dir, i)
+        storage.add_file(path, random.randint(0, 4 * 1024 * 1024))
+    creator = lt.create_torrent(storage)
+    return lt.torrent_info(lt.bdecode(lt.bencode(creator.generate())))
+
+def old_file_progress(files, file_progress):
+    ret = []
+    for i, f in enumerate(files):
+        try:
+            ret.append(float(file_progress[i]) / float(f["size"]))
+        except ZeroDivisionError:
+            ret.append(0.0)
+    return ret
+
+def old_progress_tree(files, progress):
+    info = {}
+    for index, torrent_file in enumerate(files):
+        dirname = os.path.dirname(torrent_file["path"])
+        while dirname:
+            dirinfo = info.setdefault(dirname, {})
+            dirinfo["size"] = dirinfo.get("size", 0) + torrent_file["size"]
+            progresses = dirinfo.setdefault("progresses", [])
+            progresses.append(torrent_file["size"] * (progress[index] / 100.0))
+            dirinfo["progress"] = float(sum(progresses)) / dirinfo["size"] * 100
+            dirname = os.path.dirname(dirname)
+    return info
+
+def timeit(func, *args):
+    best = None
+    for run in xrange(3):
+        start = time.time()
+        func(*args)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+def main(num_files):
+    torrent_info = make_torrent_info(num_files)
+    start = time.time()
+    metadata = TorrentMetadata(torrent_info)
+    print "TorrentMetadata built in %.1f ms" % ((time.time() - start) * 1000)
+
+    file_progress = [int(size * random.random()) for size in metadata.sizes]
+    files = metadata.get_files()
+    progress = metadata.get_file_progress(file_progress)
+
+    print "%-20s %14s %14s" % ("", "old (ms)", "new (ms)")
+    print "%-20s %14.1f %14.1f" % ("file_progress",
+        timeit(lambda: old_file_progress(metadata.get_files(), file_progress)),
+        timeit(metadata.get_file_progress, file_progress))
+    print "%-20s %14.1f %14.1f" % ("file_progress_tree",
+        timeit(old_progress_tree, files[:OLD_TREE_MAX_FILES],
+               progress[:OLD_TREE_MAX_FILES]),
+        timeit(metadata.get_progress_tree, file_progress))
+    if num_files > OLD_TREE_MAX_FILES:
+        print "(the old file_progress_tree was timed for %d files only)" % (
+            OLD_TREE_MAX_FILES)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+#
+# benchmark_logging.py
+#
+# Shows the cost of a log call on a disabled and an enabled level, for the
+# standard library's logger and Deluge's, writing synchronously or through
+# the QueueHandler.
+#
+
+import os
+import sys
+import time
+import logging
+import tempfile
+
+from deluge.log import Logging, QueueHandler
+
+def timeit(func, calls):
+    best = None
+    for run in xrange(3):
+        start = time.time()
+        for i in xrange(calls):
+            func("status of %s: %s", "torrent", i)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / calls * 1000000
+
+def make_logger(cls, name, handler):
+    logger = cls(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    return logger
+
+def main(calls):
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)-8s][%(name)s] %(message)s")
+    file_handler = logging.FileHandler(filename)
+    file_handler.setFormatter(formatter)
+    queue_handler = QueueHandler(logging.FileHandler(filename))
+    queue_handler.setFormatter(formatter)
+
+    print "%-24s %16s %16s" % ("logger", "disabled (us)", "enabled (us)")
+    for label, cls, handler in (("logging.Logger", logging.Logger, file_handler),
+                                ("deluge.log.Logging", Logging, file_handler),
+                                ("Logging + QueueHandler", Logging, queue_handler)):
+        logger = make_logger(cls, "benchmark", handler)
+        disabled = timeit(logger.debug, calls)
+        enabled = timeit(logger.info, calls)
+        handler.flush()
+        print "%-24s %16.3f %16.3f" % (label, disabled, enabled)
+
+    queue_handler.close()
+    file_handler.close()
+    os.remove(filename)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
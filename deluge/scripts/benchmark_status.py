@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+#
+# benchmark_status.py
+#
+# Shows the cost of Torrent.get_status for a few keys and for all of them,
+# using the cached status or fetching a new one from libtorrent.
+#
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from deluge._libtorrent import lt
+
+import deluge.configmanager
+from deluge.configmanager import ConfigManager
+from deluge.core.preferencesmanager import DEFAULT_PREFS
+from deluge.core.rpcserver import RPCServer
+from deluge.core.torrent import Torrent
+
+KEYS = (
+    ("name", ["name"]),
+    ("total_uploaded", ["total_uploaded"]),
+    ("torrentview", ["queue", "name", "total_wanted", "state", "progress",
+                     "num_seeds", "total_seeds", "num_peers", "total_peers",
+                     "download_payload_rate", "upload_payload_rate", "eta",
+                     "ratio", "distributed_copies", "is_auto_managed",
+                     "time_added", "tracker_host", "save_path"]),
+    ("all", []),
+)
+
+def make_torrent(directory, num_files):
+    content = os.path.join(directory, "content")
+    os.makedirs(content)
+    for i in xrange(num_files):
+        open(os.path.join(content, "file%d" % i), "wb").write("x" * 1024)
+    storage = lt.file_storage()
+    lt.add_files(storage, content)
+    creator = lt.create_torrent(storage)
+    creator.add_tracker("http://tracker.example.com/announce")
+    lt.set_piece_hashes(creator, directory)
+    return lt.torrent_info(lt.bdecode(lt.bencode(creator.generate())))
+
+def timeit(torrent, keys, update, calls):
+    best = None
+    for run in xrange(3):
+        start = time.time()
+        for i in xrange(calls):
+            torrent.get_status(keys, update=update)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / calls * 1000000
+
+def main(calls, num_files):
+    directory = tempfile.mkdtemp()
+    try:
+        deluge.configmanager.set_config_dir(directory)
+        ConfigManager("core.conf", DEFAULT_PREFS)
+        RPCServer(listen=False)
+
+        session = lt.session()
+        handle = session.add_torrent({"ti": make_torrent(directory, num_files),
+                                      "save_path": directory,
+                                      "paused": True})
+        torrent = Torrent(handle, {})
+        torrent.prev_status_cleanup_loop.stop()
+
+        print "%-16s %18s %18s" % ("keys", "cached (us)", "update (us)")
+        for label, keys in KEYS:
+            print "%-16s %18.2f %18.2f" % (label,
+                                           timeit(torrent, keys, False, calls),
+                                           timeit(torrent, keys, True, calls))
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    num_files = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    main(calls, num_files)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+#
+# benchmark_transfer.py
+#
+# Shows the cost of receiving a DelugeRPC message, split in chunks like it
+# would arrive from the network, for the legacy and framed message formats.
+#
+
+import sys
+import time
+
+from deluge.transfer import DelugeTransferProtocol, encode_message
+
+CHUNK_SIZE = 16 * 1024
+
+class BenchmarkProtocol(DelugeTransferProtocol):
+    def message_received(self, message):
+        self.received = True
+
+def make_payload(num_torrents):
+    status = {}
+    for i in xrange(num_torrents):
+        status["%040x" % i] = {
+            "name": "Some.Torrent.Name.%d" % i,
+            "state": "Seeding",
+            "progress": 100.0,
+            "download_payload_rate": 0,
+            "upload_payload_rate": i * 1024,
+            "eta": 0,
+            "queue": i,
+            "total_wanted": i * 1024 * 1024,
+        }
+    return (1, 0, status)
+
+def receive(data, runs=3):
+    best = None
+    for run in xrange(runs):
+        protocol = BenchmarkProtocol()
+        protocol.received = False
+        start = time.time()
+        for i in xrange(0, len(data), CHUNK_SIZE):
+            protocol.dataReceived(data[i:i + CHUNK_SIZE])
+        elapsed = time.time() - start
+        assert protocol.received
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(sizes):
+    print "%10s %12s %12s %12s" % ("torrents", "bytes", "legacy (s)", "framed (s)")
+    for num_torrents in sizes:
+        message = make_payload(num_torrents)
+        legacy = encode_message(message, 0)
+        framed = encode_message(message, 1)
+        print "%10d %12d %12.4f %12.4f" % (num_torrents, len(framed),
+                                           receive(legacy), receive(framed))
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 4000, 8000, 16000]
+    main(sizes)
@@ -6,6 +6,25 @@
 from deluge.core.core import Core
 import deluge.component as component
 
+class dummy_alert(object):
+    def message(self):
+        return "dummy"
+
+class other_alert(dummy_alert):
+    pass
+
+class SessionStub(object):
+    """
+    A session which only has pop_alert(), like the older libtorrent versions.
+    """
+    def __init__(self, alerts):
+        self.alerts = list(alerts)
+
+    def pop_alert(self):
+        if self.alerts:
+            return self.alerts.pop(0)
+        return None
+
 class AlertManagerTestCase(unittest.TestCase):
     def setUp(self):
         self.core = Core()
@@ -36,3 +55,36 @@ def handler(alert):
         self.am.register_handler("dummy_alert", handler)
         self.am.deregister_handler(handler)
         self.assertEquals(self.am.handlers["dummy_alert"], [])
+
+    def test_pop_alerts(self):
+        alerts = [dummy_alert(), other_alert(), dummy_alert()]
+        self.am.session = SessionStub(alerts)
+        self.assertEquals(self.am.pop_alerts(), alerts)
+        self.assertEquals(self.am.pop_alerts(), [])
+
+    def test_handle_alerts(self):
+        handled = []
+        self.am.register_handler("dummy_alert", handled.append)
+        alerts = [dummy_alert(), other_alert(), dummy_alert()]
+        self.am.session = SessionStub(alerts)
+
+        self.assertEquals(self.am.handle_alerts(wait=True), 3)
+        self.assertEquals(handled, [alerts[0], alerts[2]])
+        self.assertEquals(self.am.handle_alerts(wait=True), 0)
+
+    def test_alert_stats(self):
+        self.am.register_handler("dummy_alert", lambda alert: None)
+        self.am.alert_queue_size = 3
+        self.am.session = SessionStub([dummy_alert(), other_alert(), dummy_alert()])
+        self.am.handle_alerts(wait=True)
+        self.am.session = SessionStub([other_alert()])
+        self.am.handle_alerts(wait=True)
+
+        stats = self.core.get_alert_stats()
+        self.assertEquals(stats["alerts"], 4)
+        self.assertEquals(stats["handled"], 2)
+        self.assertEquals(stats["ignored"], 2)
+        self.assertEquals(stats["batches"], 2)
+        self.assertEquals(stats["queue_depth"], 1)
+        self.assertEquals(stats["max_queue_depth"], 3)
+        self.assertEquals(stats["queue_full"], 1)
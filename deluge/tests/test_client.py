@@ -1,12 +1,17 @@
 
 import common
 
-from twisted.internet import defer
+from twisted.internet import defer, reactor
+from twisted.internet.task import deferLater
+from twisted.internet.error import ConnectionLost
+from twisted.python.failure import Failure
 from twisted.trial import unittest
 
 from deluge import error
 from deluge.core.authmanager import AUTH_LEVEL_ADMIN
-from deluge.ui.client import client, Client, DaemonSSLProxy
+from deluge.ui.client import (client, Client, DaemonSSLProxy,
+                              DelugeRPCProtocol, DelugeRPCClientFactory,
+                              RPC_EVENT, RPC_EVENT_BATCH)
 
 
 class NoVersionSendingDaemonSSLProxy(DaemonSSLProxy):
@@ -150,3 +155,132 @@ def on_failure(failure):
 
         d.addErrback(on_failure)
         return d
+
+class FactoryStub(object):
+    def __init__(self, event_handlers):
+        self.event_handlers = event_handlers
+        self.bytes_recv = 0
+        self.bytes_sent = 0
+
+class EventDispatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        def handler(*args):
+            self.events.append(args)
+        handlers = {"TorrentAddedEvent": [handler],
+                    "TorrentStateChangedEvent": [handler]}
+        self.protocol = DelugeRPCProtocol()
+        self.protocol.factory = FactoryStub(handlers)
+
+    def test_event(self):
+        self.protocol.message_received(
+            (RPC_EVENT, "TorrentAddedEvent", ("a", False)))
+        d = deferLater(reactor, 0, lambda: self.events)
+        d.addCallback(self.assertEquals, [("a", False)])
+        return d
+
+    def test_event_batch(self):
+        self.protocol.message_received((RPC_EVENT_BATCH, (
+            ("TorrentAddedEvent", ("a", False)),
+            ("SessionPausedEvent", ()),
+            ("TorrentStateChangedEvent", ("a", "Seeding")))))
+        # The events without handlers are skipped, the others are run in order
+        d = deferLater(reactor, 0, lambda: self.events)
+        d.addCallback(self.assertEquals, [("a", False), ("a", "Seeding")])
+        return d
+
+class ProtocolStub(object):
+    def __init__(self):
+        self.sent = []
+
+    def send_requests(self, requests):
+        self.sent.append([request.method for request in requests])
+
+class ConnectorStub(object):
+    host = "localhost"
+    port = 58846
+
+class RequestsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.daemon = DaemonSSLProxy()
+        self.daemon.protocol = ProtocolStub()
+        self.daemon.connected = True
+
+    def next_turn(self, result=None):
+        return deferLater(reactor, 0, lambda: result)
+
+    def respond(self, request_id):
+        self.daemon.pop_deferred(request_id).callback(None)
+
+    def test_requests_sent_together(self):
+        self.daemon.call("core.get_session_state")
+        self.daemon.call("core.get_config")
+        self.assertEquals(self.daemon.protocol.sent, [])
+
+        def check(result):
+            self.assertEquals(self.daemon.protocol.sent,
+                              [["core.get_session_state", "core.get_config"]])
+            self.daemon.call("core.get_free_space")
+            return self.next_turn()
+        d = self.next_turn()
+        d.addCallback(check)
+        d.addCallback(lambda result: self.assertEquals(
+            self.daemon.protocol.sent[1:], [["core.get_free_space"]]))
+        return d
+
+    def test_max_requests_in_flight(self):
+        self.daemon.set_max_requests_in_flight(2)
+        for method in ("a", "b", "c", "d", "e"):
+            self.daemon.call(method)
+
+        def check_capped(result):
+            self.assertEquals(self.daemon.protocol.sent, [["a", "b"]])
+            # The held back requests are sent as the responses arrive
+            self.respond(0)
+            return self.next_turn()
+
+        def check_drained(result):
+            self.assertEquals(self.daemon.protocol.sent, [["a", "b"], ["c"]])
+            self.respond(1)
+            self.respond(2)
+            return self.next_turn()
+
+        d = self.next_turn()
+        d.addCallback(check_capped)
+        d.addCallback(check_drained)
+        d.addCallback(lambda result: self.assertEquals(
+            self.daemon.protocol.sent, [["a", "b"], ["c"], ["d", "e"]]))
+        return d
+
+    def test_connection_lost(self):
+        factory = DelugeRPCClientFactory(self.daemon, {})
+        failures = []
+        self.daemon.call("core.get_config").addErrback(failures.append)
+        d = self.next_turn()
+
+        def on_sent(result):
+            self.daemon.call("core.get_session_state").addErrback(failures.append)
+            factory.clientConnectionLost(ConnectorStub(),
+                                         Failure(ConnectionLost()))
+            self.assertEquals(len(failures), 2)
+            for failure in failures:
+                failure.trap(ConnectionLost)
+            return self.next_turn()
+
+        d.addCallback(on_sent)
+        # The pending request was dropped
+        d.addCallback(lambda result: self.assertEquals(
+            self.daemon.protocol.sent, [["core.get_config"]]))
+        return d
+
+    def test_disconnect(self):
+        factory = DelugeRPCClientFactory(self.daemon, {})
+        results = []
+        d = self.daemon.call("core.get_config")
+        d.addBoth(results.append)
+        # A requested disconnection doesn't fail the requests
+        self.daemon.disconnect_deferred = defer.Deferred()
+        factory.clientConnectionLost(ConnectorStub(), Failure(ConnectionLost()))
+        self.assertEquals(results, [])
+        return self.next_turn().addCallback(lambda result: self.assertEquals(
+            self.daemon.protocol.sent, []))
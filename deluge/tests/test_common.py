@@ -25,6 +25,14 @@ def test_fpeer(self):
     def test_ftime(self):
         self.failUnless(ftime(23011) == "6h 23m")
 
+    def test_pack_pieces(self):
+        states = [3, 3, 0, 1, 2, 3, 1]
+        packed = pack_pieces(states)
+        self.failUnless(packed == "\xf1\xb4")
+        self.failUnless(unpack_pieces(packed, len(states)) == states)
+        self.failUnless(pack_pieces([]) == "")
+        self.failUnless(unpack_pieces("", 0) == [])
+
     def test_fdate(self):
         self.failUnless(fdate(-1) == "")
 
@@ -1,5 +1,6 @@
 from twisted.trial import unittest
-from twisted.internet import threads
+from twisted.internet import threads, reactor
+from twisted.internet.task import deferLater
 import deluge.component as component
 
 class testcomponent(component.Component):
@@ -159,6 +160,43 @@ def on_start(result, c1, counter):
         d.addCallback(on_start, c1, cnt)
         return d
 
+    def test_set_update_interval(self):
+        def on_start(result, c1):
+            c1.set_update_interval(0.01)
+            counter = c1.counter
+            return deferLater(reactor, 0.2, on_interval, c1, counter)
+
+        def on_interval(c1, counter):
+            self.assertTrue(c1._component_timer.running)
+            self.assertEquals(c1._component_timer.interval, 0.01)
+            # The component is updated at the new interval, not every second
+            self.assertTrue(c1.counter > counter + 5)
+            return component.stop()
+
+        c1 = testcomponent_update("test_set_update_interval_c1")
+        d = component.start(["test_set_update_interval_c1"])
+        d.addCallback(on_start, c1)
+        return d
+
+    def test_set_update_interval_from_update(self):
+        def update():
+            c1.counter += 1
+            if c1.counter == 1:
+                c1.set_update_interval(0.01)
+
+        def on_interval(result):
+            # The replaced timer isn't still running alongside the new one
+            self.assertEquals(c1._component_timer.interval, 0.01)
+            self.assertTrue(5 < c1.counter < 30, c1.counter)
+            return component.stop()
+
+        c1 = testcomponent_update("test_set_update_interval_c2")
+        c1.update = update
+        d = component.start(["test_set_update_interval_c2"])
+        d.addCallback(lambda result: deferLater(reactor, 0.2, lambda: None))
+        d.addCallback(on_interval)
+        return d
+
     def test_pause(self):
         def on_pause(result, c1, counter):
             self.assertEqual(c1._component_state, "Paused")
@@ -6,6 +6,7 @@
 import common
 import os
 
+import deluge.config
 from deluge.config import Config
 
 DEFAULTS = {"string": "foobar", "int": 1, "float": 0.435, "bool": True, "unicode": u"foobar"}
@@ -109,6 +110,64 @@ def check_config(config):
         d = deferLater(reactor, 7, check_config, config)
         return d
 
+    def test_flush(self):
+        config = Config("test.conf", defaults=DEFAULTS, config_dir=self.config_dir)
+        config["string"] = "baz"
+        self.assertTrue(config._save_timer.active())
+        config.flush()
+        self.assertTrue(not config._save_timer.active())
+
+        config = Config("test.conf", defaults=DEFAULTS, config_dir=self.config_dir)
+        self.assertEquals(config["string"], "baz")
+
+    def test_mark_dirty(self):
+        config = Config("test.conf", defaults={"dict": {}}, config_dir=self.config_dir)
+        config.save()
+        # Changing a value in place can only be noticed through mark_dirty
+        config["dict"]["foo"] = "bar"
+        config.mark_dirty()
+        self.assertTrue(config._save_timer.active())
+        config.save_in_background()
+        config.flush()
+
+        config = Config("test.conf", config_dir=self.config_dir)
+        self.assertEquals(config["dict"], {"foo": "bar"})
+
+    def test_save_back_to_saved_data(self):
+        config = Config("test.conf", defaults=DEFAULTS, config_dir=self.config_dir)
+        config.save()
+        config["string"] = "baz"
+        config.save_in_background()
+        # The background save mustn't be left to overwrite this one
+        config["string"] = "foobar"
+        config.save()
+        config.flush()
+
+        config = Config("test.conf", config_dir=self.config_dir)
+        self.assertEquals(config["string"], "foobar")
+
+    def test_background_save_error(self):
+        config = Config("test.conf", defaults=DEFAULTS, config_dir=self.config_dir)
+        config.save()
+
+        write_config_file = deluge.config.write_config_file
+        def failing_write_config_file(filename, data):
+            raise OSError("No space left on device")
+        deluge.config.write_config_file = failing_write_config_file
+        try:
+            config["string"] = "baz"
+            config.save_in_background()
+            # The failed save mustn't be left waiting on
+            config.flush()
+        finally:
+            deluge.config.write_config_file = write_config_file
+
+        # The writer is still running
+        config.save_in_background()
+        config.flush()
+        config = Config("test.conf", config_dir=self.config_dir)
+        self.assertEquals(config["string"], "baz")
+
     def test_find_json_objects(self):
         s = """{
   "file": 1,
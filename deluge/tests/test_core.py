@@ -160,6 +160,26 @@ def test_remove_torrent(self):
         self.assertTrue(ret)
         self.assertEquals(len(self.core.get_session_state()), 0)
 
+    def test_get_torrents_status(self):
+        options = {}
+        filename = os.path.join(os.path.dirname(__file__), "test.torrent")
+        import base64
+        torrent_id = self.core.add_torrent_file(filename, base64.encodestring(open(filename).read()), options)
+
+        keys = ["name", "state", "total_size"]
+        status = self.core.get_torrents_status({}, keys)
+        self.assertEquals(status.keys(), [torrent_id])
+        self.assertEquals(status[torrent_id], self.core.get_torrent_status(torrent_id, keys))
+
+        # Only the requested keys are returned
+        status = self.core.get_torrents_status({"id": [torrent_id]}, ["name"])
+        self.assertEquals(status[torrent_id].keys(), ["name"])
+
+        # Nothing changed so the diff is empty
+        status = self.core.get_torrents_status({}, ["name"], True)
+        status = self.core.get_torrents_status({}, ["name"], True)
+        self.assertEquals(status[torrent_id], {})
+
     def test_get_session_status(self):
         status = self.core.get_session_status(["upload_rate", "download_rate"])
         self.assertEquals(type(status), dict)
@@ -0,0 +1,168 @@
+from twisted.trial import unittest
+
+import deluge.component as component
+import deluge.core.filtermanager
+from deluge.core.authmanager import AUTH_LEVEL_ADMIN
+from deluge.core.eventmanager import EventManager
+from deluge.core.filtermanager import FilterManager
+from deluge.event import TorrentAddedEvent, TorrentRemovedEvent, \
+    TorrentStateChangedEvent, TorrentFolderRenamedEvent
+
+class RPCServer(component.Component):
+    def __init__(self):
+        component.Component.__init__(self, "RPCServer")
+
+    def emit_event(self, event):
+        pass
+
+    def get_session_auth_level(self):
+        return AUTH_LEVEL_ADMIN
+
+class AlertManager(component.Component):
+    def __init__(self):
+        component.Component.__init__(self, "AlertManager")
+
+    def register_handler(self, alert_type, handler):
+        pass
+
+class Torrent(object):
+    def __init__(self, name, state, tracker_host, owner):
+        self.name = name
+        self.filename = name + ".torrent"
+        self.state = state
+        self.tracker_host = tracker_host
+        self.trackers = [{"url": "http://%s/announce" % tracker_host, "tier": 0}]
+        self.owner = owner
+        self.tracker_status = ""
+
+    def get_name(self):
+        return self.name
+
+    def get_files(self):
+        return [{"path": self.name + "/readme.txt"}]
+
+    def get_tracker_host(self):
+        return self.tracker_host
+
+class TorrentManager(object):
+    def __init__(self):
+        self.torrents = {}
+
+    def __getitem__(self, torrent_id):
+        return self.torrents[torrent_id]
+
+    def get_torrent_list(self):
+        return self.torrents.keys()
+
+class StatusTable(object):
+    tick = 1.0
+
+    def get_status(self, torrent_ids, keys):
+        return dict([(torrent_id, dict.fromkeys(keys, 0))
+                     for torrent_id in torrent_ids])
+
+class PluginManager(object):
+    def get_status(self, torrent_id, fields):
+        return {}
+
+class Core(object):
+    def __init__(self):
+        self.torrentmanager = TorrentManager()
+        self.statustable = StatusTable()
+        self.pluginmanager = PluginManager()
+
+class FilterManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        RPCServer()
+        AlertManager()
+        self.eventmanager = EventManager()
+        self.core = Core()
+        self.filtermanager = FilterManager(self.core)
+        self.filtermanager.check_indexes = True
+
+        self.add_torrent("a", "Ubuntu Desktop", "Downloading", "tracker.org", "user1")
+        self.add_torrent("b", "Debian Netinst", "Seeding", "tracker.org", "user1")
+        self.add_torrent("c", "Ubuntu Server", "Seeding", "example.com", "user2")
+
+    def tearDown(self):
+        component._ComponentRegistry.components = {}
+
+    def add_torrent(self, torrent_id, name, state, tracker_host, owner):
+        self.core.torrentmanager.torrents[torrent_id] = Torrent(
+            name, state, tracker_host, owner)
+        self.eventmanager.emit(TorrentAddedEvent(torrent_id, False))
+
+    def test_filter_torrent_ids(self):
+        filter_torrent_ids = self.filtermanager.filter_torrent_ids
+        self.assertEquals(sorted(filter_torrent_ids({"state": "Seeding"})),
+                          ["b", "c"])
+        self.assertEquals(filter_torrent_ids(
+            {"tracker_host": "tracker.org", "state": "Seeding"}), ["b"])
+        self.assertEquals(filter_torrent_ids({"owner": "user2"}), ["c"])
+
+    def test_filter_name(self):
+        filter_torrent_ids = self.filtermanager.filter_torrent_ids
+        self.assertEquals(sorted(filter_torrent_ids({"name": "ubuntu"})),
+                          ["a", "c"])
+        self.assertEquals(filter_torrent_ids({"name": "u s"}), ["c"])
+        self.assertEquals(filter_torrent_ids({"name": "ubuntu::match"}), [])
+        self.assertEquals(filter_torrent_ids({"name": "Ubuntu D::match"}), ["a"])
+
+        self.core.torrentmanager.torrents["b"].name = "Ubuntu Netboot"
+        self.eventmanager.emit(TorrentFolderRenamedEvent("b", "", ""))
+        self.assertEquals(sorted(filter_torrent_ids({"name": "ubu"})),
+                          ["a", "b", "c"])
+
+    def test_filter_keyword(self):
+        filter_torrent_ids = self.filtermanager.filter_torrent_ids
+        self.assertEquals(filter_torrent_ids({"keyword": "example.com"}), ["c"])
+        self.assertEquals(sorted(filter_torrent_ids({"keyword": "readme"})),
+                          ["a", "b", "c"])
+        self.assertEquals(filter_torrent_ids({"keyword": "downl"}), ["a"])
+        self.assertEquals(filter_torrent_ids({"keyword": "debian,readme"}),
+                          ["b"])
+
+    def test_filter_keyword_short(self):
+        # Shorter than the n-grams in the keyword index
+        filter_torrent_ids = self.filtermanager.filter_torrent_ids
+        self.assertEquals(filter_torrent_ids({"keyword": "eb"}), ["b"])
+        self.assertEquals(sorted(filter_torrent_ids({"keyword": "e"})),
+                          ["a", "b", "c"])
+
+    def test_filter_keyword_many_files(self):
+        self.patch(deluge.core.filtermanager, "MAX_KEYWORD_INDEX_FILES", 1)
+        self.add_torrent("d", "Fedora", "Seeding", "tracker.org", "user1")
+        self.core.torrentmanager.torrents["d"].get_files = lambda: [
+            {"path": "Fedora/readme.txt"}, {"path": "Fedora/live.iso"}]
+        filter_torrent_ids = self.filtermanager.filter_torrent_ids
+        self.assertEquals(filter_torrent_ids({"keyword": "live.iso"}), ["d"])
+        self.assertEquals(self.filtermanager.keyword_unindexed_files,
+                          set(["d"]))
+        self.assertTrue("live.iso" not in
+                        self.filtermanager.keyword_index.texts["d"])
+
+    def test_filter_tree(self):
+        tree = self.filtermanager.get_filter_tree()
+        self.assertEquals(dict(tree["state"])["Seeding"], 2)
+        self.assertEquals(dict(tree["tracker_host"])["tracker.org"], 2)
+        self.assertEquals(dict(tree["owner"])["user2"], 1)
+
+    def test_indexes_follow_changes(self):
+        self.core.torrentmanager.torrents["a"].state = "Paused"
+        self.eventmanager.emit(TorrentStateChangedEvent("a", "Paused"))
+        del self.core.torrentmanager.torrents["b"]
+        self.eventmanager.emit(TorrentRemovedEvent("b"))
+        self.core.torrentmanager.torrents["c"].owner = "user1"
+        self.filtermanager.update_index("c", "owner")
+
+        self.assertEquals(self.filtermanager.verify_indexes(), [])
+        tree = self.filtermanager.get_filter_tree()
+        self.assertEquals(dict(tree["state"])["Seeding"], 1)
+        self.assertEquals(dict(tree["state"])["Paused"], 1)
+        self.assertEquals(dict(tree["owner"]), {"": 0, "user1": 2})
+
+    def test_verify_indexes(self):
+        # A change the indexes were not told about
+        self.core.torrentmanager.torrents["a"].state = "Paused"
+        self.assertEquals(sorted(self.filtermanager.verify_indexes()), [
+            ("state", "Downloading", 1, 0), ("state", "Paused", 0, 1)])
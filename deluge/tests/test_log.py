@@ -19,3 +19,47 @@ def test_old_LOG_deprecation_warning(self):
         d.addCallback(LOG.debug, "foo")
         self.assertFailure(d, DeprecationWarning)
         warnings.resetwarnings()
+
+    def test_disabled_levels(self):
+        from deluge.log import Logging
+        handler = ListHandler()
+        logger = Logging("deluge.tests.test_log.disabled")
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.debug("foo %s", "bar")
+        logger.trace("foo")
+        logger.info("foo %s", "bar")
+        self.assertEquals(len(handler.records), 1)
+        self.assertEquals(handler.records[0].getMessage(), "foo bar")
+        self.assertEquals(handler.records[0].funcName, "test_disabled_levels")
+        self.assertEquals(handler.records[0].filename, "test_log.py")
+
+    def test_queue_handler(self):
+        from deluge.log import Logging, QueueHandler
+        handler = ListHandler()
+        handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        queue_handler = QueueHandler(handler)
+        logger = Logging("deluge.tests.test_log.queue")
+        logger.addHandler(queue_handler)
+        logger.setLevel(logging.DEBUG)
+        for i in xrange(10):
+            logger.debug("message %d", i)
+        try:
+            raise ValueError("foo")
+        except ValueError:
+            logger.exception("failed")
+        queue_handler.flush()
+        self.assertEquals(len(handler.records), 11)
+        self.assertEquals(handler.lines[0], "DEBUG message 0")
+        self.assertTrue("ValueError: foo" in handler.lines[-1])
+        queue_handler.close()
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+        self.lines = []
+
+    def emit(self, record):
+        self.records.append(record)
+        self.lines.append(self.format(record))
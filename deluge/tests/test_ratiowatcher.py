@@ -0,0 +1,66 @@
+from twisted.trial import unittest
+
+from deluge.core.ratiowatcher import (RatioWatcher, MIN_CHECK_INTERVAL,
+                                      MAX_CHECK_INTERVAL)
+
+class FakeStatus(object):
+    def __init__(self, total_done, all_time_upload, upload_payload_rate):
+        self.total_done = total_done
+        self.all_time_upload = all_time_upload
+        self.upload_payload_rate = upload_payload_rate
+
+class FakeTorrent(object):
+    def __init__(self, uploaded, rate, state="Seeding", stop_at_ratio=True):
+        self.options = {"stop_at_ratio": stop_at_ratio, "stop_ratio": 2.0}
+        self.is_finished = True
+        self.state = state
+        self.status = FakeStatus(1000, uploaded, rate)
+        self.ratio_checks = 0
+
+    def get_ratio(self):
+        self.ratio_checks += 1
+        return float(self.status.all_time_upload) / self.status.total_done
+
+class RatioWatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.torrents = {}
+        self.watcher = RatioWatcher(self.torrents)
+
+    def add_torrent(self, torrent_id, *args, **kwargs):
+        self.torrents[torrent_id] = FakeTorrent(*args, **kwargs)
+        self.watcher.watch(torrent_id)
+        return self.torrents[torrent_id]
+
+    def test_all_reached(self):
+        self.add_torrent("a", 2000, 0)
+        self.add_torrent("b", 3000, 0)
+        self.add_torrent("c", 100, 0)
+        self.assertEquals(sorted(self.watcher.update()), ["a", "b"])
+        self.assertEquals(self.watcher.update(), [])
+
+    def test_projected(self):
+        fast = self.add_torrent("fast", 1900, 10)
+        slow = self.add_torrent("slow", 1000, 1)
+        paused = self.add_torrent("paused", 2000, 0, state="Paused")
+        now = max(self.watcher.due.values())
+        self.assertEquals(self.watcher.update(now), [])
+        self.assertEquals(self.watcher.due["fast"], now + 10)
+        self.assertEquals(self.watcher.due["slow"], now + MAX_CHECK_INTERVAL)
+        self.assertEquals(self.watcher.due["paused"], now + MAX_CHECK_INTERVAL)
+        self.assertEquals(paused.ratio_checks, 0)
+
+        # Only the torrents due are checked
+        self.assertEquals(self.watcher.update(now + MIN_CHECK_INTERVAL), [])
+        self.assertEquals(slow.ratio_checks, 1)
+        fast.status.all_time_upload = 2000
+        self.assertEquals(self.watcher.update(now + 10), ["fast"])
+        self.assertEquals(slow.ratio_checks, 1)
+
+    def test_unwatch(self):
+        self.add_torrent("a", 2000, 0)
+        self.watcher.unwatch("a")
+        self.assertEquals(self.watcher.update(), [])
+        self.add_torrent("b", 2000, 0)
+        del self.torrents["b"]
+        self.assertEquals(self.watcher.update(), [])
+        self.assertEquals(self.watcher.due, {})
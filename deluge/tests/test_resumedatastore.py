@@ -0,0 +1,31 @@
+import os
+
+from twisted.trial import unittest
+
+import common
+from deluge.core.resumedatastore import ResumeDataStore
+
+TORRENT_ID = "a0ab41b9e8a6b4dd8bd4bac0b2d3b7f6b1c3d5e7"
+
+class ResumeDataStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(common.set_tmp_config_dir(), "resume")
+        self.store = ResumeDataStore(self.path)
+
+    def test_get_missing(self):
+        self.assertEquals(self.store.get(TORRENT_ID), None)
+
+    def test_put_get(self):
+        self.assertTrue(self.store.put(TORRENT_ID, "d4:testi1ee"))
+        self.assertEquals(self.store.get(TORRENT_ID), "d4:testi1ee")
+        self.assertTrue(self.store.put(TORRENT_ID, "d4:testi2ee"))
+        self.assertEquals(self.store.get(TORRENT_ID), "d4:testi2ee")
+        self.assertEquals(os.listdir(os.path.join(self.path, "a0")),
+                          [TORRENT_ID + ".fastresume"])
+
+    def test_delete(self):
+        self.store.put(TORRENT_ID, "d4:testi1ee")
+        self.store.delete(TORRENT_ID)
+        self.assertEquals(self.store.get(TORRENT_ID), None)
+        # Deleting missing resume data is fine
+        self.store.delete(TORRENT_ID)
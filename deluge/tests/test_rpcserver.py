@@ -0,0 +1,91 @@
+import zlib
+
+from twisted.trial import unittest
+
+import common
+
+import deluge.component as component
+import deluge.rencode as rencode
+from deluge.core.rpcserver import RPCServer, RPC_EVENT, RPC_EVENT_BATCH
+from deluge.event import (SessionPausedEvent, SessionResumedEvent,
+                          TorrentStateChangedEvent, TorrentAddedEvent)
+
+class ProtocolStub(object):
+    def __init__(self):
+        self.payloads = []
+
+    def transfer_payload(self, payload):
+        self.payloads.append(payload)
+
+    def messages(self):
+        return [rencode.loads(zlib.decompress(p)) for p in self.payloads]
+
+EVENTS = ["SessionPausedEvent", "SessionResumedEvent",
+          "TorrentStateChangedEvent", "TorrentAddedEvent"]
+
+class RPCServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpcserver = RPCServer(listen=False)
+        self.protocols = {}
+        for session_id in (1, 2, 3):
+            self.protocols[session_id] = ProtocolStub()
+            self.rpcserver.factory.session_protocols[session_id] = \
+                self.protocols[session_id]
+            for event in EVENTS:
+                self.rpcserver.factory.event_sessions.setdefault(
+                    event, set()).add(session_id)
+        # Session 3 doesn't accept batched events
+        self.rpcserver.factory.batched_sessions.update([1, 2])
+
+    def tearDown(self):
+        timer = self.rpcserver.event_batch_timer
+        if timer and timer.active():
+            timer.cancel()
+        return component.deregister(self.rpcserver)
+
+    def test_batched_events(self):
+        self.rpcserver.emit_event(TorrentAddedEvent("a", False))
+        self.rpcserver.emit_event(TorrentStateChangedEvent("a", "Seeding"))
+        # The unbatched session gets the events as they are emitted
+        self.assertEquals(self.protocols[3].messages(), [
+            (RPC_EVENT, "TorrentAddedEvent", ("a", False)),
+            (RPC_EVENT, "TorrentStateChangedEvent", ("a", "Seeding"))])
+        self.assertEquals(self.protocols[1].payloads, [])
+
+        self.rpcserver.send_event_batch()
+        batch = (RPC_EVENT_BATCH, (("TorrentAddedEvent", ("a", False)),
+                                   ("TorrentStateChangedEvent", ("a", "Seeding"))))
+        self.assertEquals(self.protocols[1].messages(), [batch])
+        # The sessions getting the same events share one message
+        self.assertTrue(self.protocols[1].payloads[0] is
+                        self.protocols[2].payloads[0])
+
+    def test_coalesced_events(self):
+        self.rpcserver.emit_event(TorrentStateChangedEvent("a", "Checking"))
+        self.rpcserver.emit_event(TorrentStateChangedEvent("b", "Paused"))
+        self.rpcserver.emit_event(TorrentStateChangedEvent("a", "Seeding"))
+        self.rpcserver.send_event_batch()
+        self.assertEquals(self.protocols[1].messages(), [
+            (RPC_EVENT_BATCH, (("TorrentStateChangedEvent", ("b", "Paused")),
+                               ("TorrentStateChangedEvent", ("a", "Seeding"))))])
+
+    def test_coalesced_events_order(self):
+        self.rpcserver.emit_event(SessionPausedEvent())
+        self.rpcserver.emit_event(SessionResumedEvent())
+        self.rpcserver.emit_event(SessionPausedEvent())
+        self.rpcserver.send_event_batch()
+        # The session was paused last
+        self.assertEquals(self.protocols[1].messages(), [
+            (RPC_EVENT_BATCH, (("SessionResumedEvent", ()),
+                               ("SessionPausedEvent", ())))])
+
+    def test_sessions_interested_in_different_events(self):
+        self.rpcserver.factory.event_sessions["TorrentAddedEvent"].discard(2)
+        self.rpcserver.emit_event(TorrentAddedEvent("a", False))
+        self.rpcserver.emit_event(TorrentStateChangedEvent("a", "Seeding"))
+        self.rpcserver.send_event_batch()
+        self.assertEquals(self.protocols[1].messages(), [
+            (RPC_EVENT_BATCH, (("TorrentAddedEvent", ("a", False)),
+                               ("TorrentStateChangedEvent", ("a", "Seeding"))))])
+        self.assertEquals(self.protocols[2].messages(), [
+            (RPC_EVENT_BATCH, (("TorrentStateChangedEvent", ("a", "Seeding")),))])
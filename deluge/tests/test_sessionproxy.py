@@ -70,9 +70,20 @@ def get_torrents_status(self, filter_dict, keys, diff=False):
                     self.prev_status[torrent] = dict(self.torrents[torrent])
                 return succeed(ret)
 
+class Daemon(object):
+    def __init__(self, core):
+        self.core = core
+
+    def subscribe_status(self, filter_dict, keys, interval=1.0):
+        return self.core.get_torrents_status(filter_dict, keys, True)
+
+    def unsubscribe_status(self):
+        return succeed(None)
+
 class Client(object):
     def __init__(self):
         self.core = Core()
+        self.daemon = Daemon(self.core)
 
     def __noop__(self, *args, **kwargs):
         return None
@@ -128,3 +139,27 @@ def test_get_torrents_status_key_not_updated(self):
         d = self.sp.get_torrents_status({"id": ["a"]}, ["key2"])
         d.addCallback(self.assertEquals, {"a": {"key2": 99}})
         return d
+
+    def test_subscribed_keys_not_fetched(self):
+        d = self.sp.subscribe(["key1"])
+        def on_subscribed(result):
+            client.core.torrents["a"]["key1"] = 2
+            time.sleep(self.sp.cache_time + 0.1)
+            # Nothing was pushed yet, so the cached value is still used
+            return self.sp.get_torrent_status("a", ["key1"])
+        def on_status(status):
+            self.assertEquals(status, {"key1": 1})
+            self.sp.on_torrents_status_updated({"a": {"key1": 2}}, [])
+            return self.sp.get_torrent_status("a", ["key1"])
+        d.addCallback(on_subscribed)
+        d.addCallback(on_status)
+        d.addCallback(self.assertEquals, {"key1": 2})
+        return d
+
+    def test_removed_torrents_dropped(self):
+        self.sp.on_torrents_status_updated({"a": {"key1": 2}}, ["b"])
+        self.assertFalse("b" in self.sp.torrents)
+        self.assertFalse("b" in self.sp.cache_times)
+        d = self.sp.get_torrents_status({}, ["key1"])
+        d.addCallback(lambda status: self.assertEquals(sorted(status), ["a", "c"]))
+        return d
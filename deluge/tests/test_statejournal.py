@@ -0,0 +1,63 @@
+import os
+
+from twisted.trial import unittest
+
+import common
+from deluge.core.statejournal import StateJournal, ADD, UPDATE, REMOVE
+
+class TorrentState(object):
+    def __init__(self, torrent_id, queue):
+        self.torrent_id = torrent_id
+        self.queue = queue
+
+class StateJournalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(common.set_tmp_config_dir(),
+                                 "torrents.state.journal")
+        self.journal = StateJournal(self.path)
+        self.torrents = [TorrentState("a", 0), TorrentState("b", 1)]
+
+    def replay(self):
+        return [(state.torrent_id, state.queue) for state in
+                StateJournal(self.path).replay(list(self.torrents))]
+
+    def test_no_journal(self):
+        self.assertEquals(self.replay(), [("a", 0), ("b", 1)])
+
+    def test_replay(self):
+        self.journal.append([(ADD, TorrentState("c", 2))])
+        self.journal.append([(REMOVE, "a"), (UPDATE, TorrentState("b", 0))])
+        self.assertEquals(self.journal.records, 3)
+        self.assertEquals(self.replay(), [("b", 0), ("c", 2)])
+
+    def test_remove_and_add_again(self):
+        self.journal.append([(REMOVE, "a"), (ADD, TorrentState("a", 2))])
+        self.assertEquals(self.replay(), [("a", 2), ("b", 1)])
+
+    def test_truncated_record(self):
+        self.journal.append([(ADD, TorrentState("c", 2)),
+                             (ADD, TorrentState("d", 3))])
+        # Cut the last record in half, like a crash while writing it
+        size = os.path.getsize(self.path)
+        journal = open(self.path, "r+b")
+        journal.truncate(size - 10)
+        journal.close()
+        self.assertEquals(self.replay(), [("a", 0), ("b", 1), ("c", 2)])
+
+    def test_append_after_truncated_record(self):
+        self.journal.append([(ADD, TorrentState("c", 2)),
+                             (ADD, TorrentState("d", 3))])
+        size = os.path.getsize(self.path)
+        journal = open(self.path, "r+b")
+        journal.truncate(size - 10)
+        journal.close()
+        # The torn record is cut off when replayed on start
+        self.assertEquals(self.replay(), [("a", 0), ("b", 1), ("c", 2)])
+        self.journal.append([(ADD, TorrentState("e", 4)), (REMOVE, "a")])
+        self.assertEquals(self.replay(), [("b", 1), ("c", 2), ("e", 4)])
+
+    def test_clear(self):
+        self.journal.append([(REMOVE, "a")])
+        self.journal.clear()
+        self.assertEquals(self.journal.records, 0)
+        self.assertEquals(self.replay(), [("a", 0), ("b", 1)])
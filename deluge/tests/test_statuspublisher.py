@@ -0,0 +1,80 @@
+from twisted.trial import unittest
+
+import deluge.component as component
+from deluge.core.statuspublisher import StatusPublisher
+
+class RPCServer(component.Component):
+    def __init__(self):
+        component.Component.__init__(self, "RPCServer")
+        self.events = []
+
+    def is_session_valid(self, session_id):
+        return True
+
+    def emit_event_for_session_id(self, session_id, event):
+        self.events.append((session_id, event.name, event.args))
+
+class FilterManager(object):
+    def __init__(self, torrents):
+        self.torrents = torrents
+
+    def filter_torrent_ids(self, filter_dict):
+        state = filter_dict.get("state")
+        return [torrent_id for torrent_id, status in self.torrents.iteritems()
+                if state is None or status["state"] == state]
+
+class StatusTable(object):
+    def __init__(self, torrents):
+        self.torrents = torrents
+
+    def get_status(self, torrent_ids, keys):
+        return dict([(torrent_id, dict(self.torrents[torrent_id]))
+                     for torrent_id in torrent_ids])
+
+class Core(object):
+    def __init__(self):
+        self.torrents = {
+            "a": {"state": "Seeding", "progress": 100.0},
+            "b": {"state": "Downloading", "progress": 10.0},
+            "c": {"state": "Downloading", "progress": 50.0},
+        }
+        self.filtermanager = FilterManager(self.torrents)
+        self.statustable = StatusTable(self.torrents)
+
+class StatusPublisherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rpcserver = RPCServer()
+        self.core = Core()
+        self.publisher = StatusPublisher(self.core)
+
+    def tearDown(self):
+        component._ComponentRegistry.components = {}
+
+    def publish(self):
+        for group in self.publisher.groups.values():
+            group.next_update = 0
+        self.rpcserver.events = []
+        self.publisher.update()
+        return self.rpcserver.events
+
+    def test_changes(self):
+        status = self.publisher.subscribe(1, {"state": "Downloading"},
+                                          ["state", "progress"], 1.0)
+        self.assertEquals(sorted(status), ["b", "c"])
+        self.assertEquals(self.publish(), [])
+
+        self.core.torrents["b"]["progress"] = 20.0
+        self.assertEquals(self.publish(), [
+            (1, "TorrentsStatusUpdatedEvent", [{"b": {"progress": 20.0}}, []])])
+
+    def test_removed(self):
+        self.publisher.subscribe(1, {"state": "Downloading"},
+                                 ["state", "progress"], 1.0)
+        # One torrent is removed and the other one leaves the filter
+        del self.core.torrents["b"]
+        self.core.torrents["c"]["state"] = "Seeding"
+        events = self.publish()
+        self.assertEquals(len(events), 1)
+        self.assertEquals(events[0][2][0], {})
+        self.assertEquals(sorted(events[0][2][1]), ["b", "c"])
+        self.assertEquals(self.publish(), [])
@@ -0,0 +1,154 @@
+import time
+from collections import OrderedDict
+
+from twisted.trial import unittest
+
+import deluge.core.torrentmanager
+from deluge.core.torrentmanager import TorrentManager, RESUME_DATA_BATCH_SIZE
+
+class FakeTorrent(object):
+    def __init__(self, dirty=True):
+        self.dirty = dirty
+        self.waiting_on_resume_data = False
+        self.resume_data_saves = 0
+
+    def needs_resume_data(self):
+        return self.dirty
+
+    def save_resume_data(self):
+        self.resume_data_saves += 1
+        self.waiting_on_resume_data = True
+        self.dirty = False
+
+class FakeAlertManager(object):
+    """
+    Delivers the alerts of one torrent, pausing it and writing its resume
+    data, every time the alerts are handled.
+    """
+    def __init__(self, torrentmanager, torrent_ids):
+        self.torrentmanager = torrentmanager
+        self.torrent_ids = list(torrent_ids)
+        self.calls = 0
+
+    def handle_alerts(self, wait=False):
+        self.calls += 1
+        if not self.torrent_ids:
+            return 0
+        torrent_id = self.torrent_ids.pop(0)
+        self.torrentmanager.torrents[torrent_id].waiting_on_resume_data = False
+        if torrent_id in self.torrentmanager.shutdown_torrent_pause_list:
+            self.torrentmanager.shutdown_torrent_pause_list.remove(torrent_id)
+        return 2
+
+class StoppedReactor(object):
+    running = False
+
+class TorrentManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        # Only the parts of the TorrentManager used by the tests, the rest
+        # needs a libtorrent session
+        self.tm = TorrentManager.__new__(TorrentManager)
+        self.tm.torrents = {}
+        self.tm.shutdown_torrent_pause_list = []
+        self.tm.resume_data_queue = OrderedDict()
+        self.tm.resume_data_stats = {"saved": 0, "skipped": 0, "failed": 0}
+
+    def add_torrents(self, torrent_ids, dirty=True):
+        for torrent_id in torrent_ids:
+            self.tm.torrents[torrent_id] = FakeTorrent(dirty)
+
+    def start_shutdown(self, torrent_ids):
+        for torrent_id in torrent_ids:
+            self.tm.shutdown_torrent_pause_list.append(torrent_id)
+        self.tm.save_resume_data(torrent_ids)
+
+    def test_wait_on_shutdown(self):
+        self.add_torrents(["a", "b", "c"])
+        self.start_shutdown(["a", "b", "c"])
+        self.tm.alerts = FakeAlertManager(self.tm, ["b", "a", "c"])
+
+        d = self.tm.wait_on_shutdown(10)
+        d.addCallback(self.assertEquals, [])
+        d.addCallback(lambda result: self.assertEquals(
+            self.tm.get_shutdown_waiting(), set()))
+        return d
+
+    def test_wait_on_shutdown_deadline(self):
+        self.add_torrents(["a", "b", "c"])
+        self.start_shutdown(["a", "b", "c"])
+        # "c" never pauses nor writes its resume data
+        self.tm.alerts = FakeAlertManager(self.tm, ["a", "b"])
+        start = time.time()
+
+        def on_finished(missed):
+            self.assertEquals(missed, ["c"])
+            self.assertTrue(time.time() - start < 2)
+            # The alerts kept being handled until the deadline
+            self.assertTrue(self.tm.alerts.calls > 2)
+
+        d = self.tm.wait_on_shutdown(0.3)
+        return d.addCallback(on_finished)
+
+    def test_wait_on_shutdown_resume_data_only(self):
+        # The paused torrents only wait on their resume data
+        self.add_torrents(["a", "b"])
+        self.tm.save_resume_data(["a", "b"])
+        self.tm.alerts = FakeAlertManager(self.tm, ["a"])
+        d = self.tm.wait_on_shutdown(0.2)
+        return d.addCallback(self.assertEquals, ["b"])
+
+    def test_wait_on_shutdown_reactor_stopped(self):
+        self.patch(deluge.core.torrentmanager, "reactor", StoppedReactor())
+        self.add_torrents(["a", "b"])
+        self.start_shutdown(["a", "b"])
+        self.tm.alerts = FakeAlertManager(self.tm, ["a"])
+        # Waits for the alerts without the reactor
+        d = self.tm.wait_on_shutdown(0.2)
+        self.assertTrue(d.called)
+        return d.addCallback(self.assertEquals, ["b"])
+
+    def test_queue_dirty_resume_data(self):
+        self.add_torrents(["a", "b"])
+        self.add_torrents(["c"], dirty=False)
+        self.tm.queue_dirty_resume_data()
+        self.assertEquals(sorted(self.tm.resume_data_queue), ["a", "b"])
+        self.assertEquals(self.tm.resume_data_stats["skipped"], 1)
+
+        # The queued torrents aren't queued twice
+        self.tm.queue_dirty_resume_data(["b"])
+        self.assertEquals(len(self.tm.resume_data_queue), 2)
+
+        # Nothing is asked for until the queue is saved
+        self.assertEquals(self.tm.torrents["a"].resume_data_saves, 0)
+        self.tm.save_queued_resume_data()
+        self.assertEquals(self.tm.torrents["a"].resume_data_saves, 1)
+        self.assertEquals(self.tm.torrents["c"].resume_data_saves, 0)
+
+        # Clean once saved
+        self.tm.queue_dirty_resume_data()
+        self.assertEquals(len(self.tm.resume_data_queue), 0)
+        self.assertEquals(self.tm.resume_data_stats["skipped"], 4)
+
+    def test_save_queued_resume_data_batches(self):
+        count = RESUME_DATA_BATCH_SIZE * 2 + 10
+        torrent_ids = ["%04d" % i for i in range(count)]
+        self.add_torrents(torrent_ids)
+        self.tm.queue_dirty_resume_data(torrent_ids)
+        # A removed torrent is skipped
+        del self.tm.torrents[torrent_ids[0]]
+
+        saved = []
+        for i in range(3):
+            self.tm.save_queued_resume_data()
+            saved.append(self.tm.resume_data_stats["saved"])
+        self.assertEquals(saved, [RESUME_DATA_BATCH_SIZE,
+                                  RESUME_DATA_BATCH_SIZE * 2, count - 1])
+        self.assertEquals(self.tm.get_resume_data_stats()["queued"], 0)
+        # In the order they were queued
+        self.assertEquals(self.tm.torrents[torrent_ids[1]].resume_data_saves, 1)
+
+    def test_save_resume_data_dequeues(self):
+        self.add_torrents(["a", "b"])
+        self.tm.queue_dirty_resume_data()
+        self.tm.save_resume_data(["a"])
+        self.assertEquals(self.tm.resume_data_queue.keys(), ["b"])
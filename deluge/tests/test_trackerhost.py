@@ -0,0 +1,38 @@
+from twisted.trial import unittest
+
+from deluge.core import trackerhost
+from deluge.core.trackerhost import (get_registered_domain, get_tracker_host,
+                                     parse_public_suffixes)
+
+class TrackerHostTestCase(unittest.TestCase):
+    def setUp(self):
+        self.rules = trackerhost._rules
+        trackerhost._rules = parse_public_suffixes("""
+            // A comment
+            com
+            uk
+            co.uk
+            *.kawasaki.jp
+            !city.kawasaki.jp
+            """.splitlines())
+        trackerhost._hosts.clear()
+
+    def tearDown(self):
+        trackerhost._rules = self.rules
+        trackerhost._hosts.clear()
+
+    def test_registered_domain(self):
+        self.assertEquals(get_registered_domain("tracker.example.com"), "example.com")
+        self.assertEquals(get_registered_domain("a.tracker.example.co.uk"), "example.co.uk")
+        self.assertEquals(get_registered_domain("example.com"), "example.com")
+        self.assertEquals(get_registered_domain("co.uk"), "co.uk")
+        self.assertEquals(get_registered_domain("tracker.example.org"), "example.org")
+        self.assertEquals(get_registered_domain("a.b.kawasaki.jp"), "a.b.kawasaki.jp")
+        self.assertEquals(get_registered_domain("a.city.kawasaki.jp"), "city.kawasaki.jp")
+        self.assertEquals(get_registered_domain("localhost"), "localhost")
+
+    def test_tracker_host(self):
+        self.assertEquals(get_tracker_host("udp://tracker.example.com:80/announce"), "example.com")
+        self.assertEquals(get_tracker_host("http://10.0.0.1:6969/announce"), "10.0.0.1")
+        self.assertEquals(get_tracker_host("dht://"), "DHT")
+        self.assertTrue("udp://tracker.example.com:80/announce" in trackerhost._hosts)
@@ -0,0 +1,90 @@
+from twisted.trial import unittest
+
+import common
+
+from deluge.transfer import DelugeTransferProtocol, encode_message, encode_payload
+
+class TransportStub(object):
+    def __init__(self):
+        self.data = []
+
+    def write(self, data):
+        self.data.append(data)
+
+class TransferTestProtocol(DelugeTransferProtocol):
+    def __init__(self):
+        DelugeTransferProtocol.__init__(self)
+        self.transport = TransportStub()
+        self.messages = []
+
+    def message_received(self, message):
+        self.messages.append(message)
+
+MESSAGES = [
+    (1, 0, "3.0"),
+    (1, 1, {"torrent_id": {"name": "foo", "progress": 50.0}}),
+    (3, "TorrentAddedEvent", ("torrent_id", False)),
+]
+
+class TransferTestCase(unittest.TestCase):
+    def setUp(self):
+        self.protocol = TransferTestProtocol()
+
+    def test_framed_messages(self):
+        data = "".join([encode_message(m, 1) for m in MESSAGES])
+        self.protocol.dataReceived(data)
+        self.assertEquals(self.protocol.messages, MESSAGES)
+        self.assertEquals(self.protocol.transfer_version, 1)
+
+    def test_framed_messages_in_chunks(self):
+        data = "".join([encode_message(m, 1) for m in MESSAGES])
+        for i in range(0, len(data), 3):
+            self.protocol.dataReceived(data[i:i + 3])
+        self.assertEquals(self.protocol.messages, MESSAGES)
+
+    def test_many_framed_messages(self):
+        messages = [(1, i, "result") for i in range(1000)]
+        data = "".join([encode_message(m, 1) for m in messages])
+        # Split the data in the middle of a message
+        self.protocol.dataReceived(data[:len(data) / 2])
+        self.protocol.dataReceived(data[len(data) / 2:])
+        self.assertEquals(self.protocol.messages, messages)
+        self.assertEquals(self.protocol._buffer, "")
+
+    def test_large_message_in_chunks(self):
+        message = (1, 0, dict((str(i), "x" * (i % 50)) for i in range(2000)))
+        data = encode_message(message, 1) + encode_message(MESSAGES[0], 1)
+        for i in range(0, len(data), 100):
+            self.protocol.dataReceived(data[i:i + 100])
+        self.assertEquals(self.protocol.messages, [message, MESSAGES[0]])
+
+    def test_legacy_messages(self):
+        data = "".join([encode_message(m, 0) for m in MESSAGES])
+        for i in range(0, len(data), 7):
+            self.protocol.dataReceived(data[i:i + 7])
+        self.assertEquals(self.protocol.messages, MESSAGES)
+        # The other end doesn't understand framed messages
+        self.assertEquals(self.protocol.transfer_version, 0)
+
+    def test_mixed_messages(self):
+        data = encode_message(MESSAGES[0], 0) + encode_message(MESSAGES[1], 1)
+        data += encode_message(MESSAGES[2], 0)
+        self.protocol.dataReceived(data)
+        self.assertEquals(self.protocol.messages, MESSAGES)
+
+    def test_transfer_message(self):
+        self.protocol.transfer_message(MESSAGES[0])
+        self.protocol.set_transfer_version(1)
+        self.protocol.transfer_message(MESSAGES[1])
+        self.assertEquals(self.protocol.transport.data,
+                          [encode_message(MESSAGES[0], 0),
+                           encode_message(MESSAGES[1], 1)])
+
+    def test_transfer_payload(self):
+        payload = encode_payload(MESSAGES[2])
+        self.protocol.set_transfer_version(1)
+        self.protocol.transfer_payload(payload)
+        self.protocol.set_transfer_version(0)
+        self.protocol.transfer_payload(payload)
+        self.assertEquals(self.protocol.transport.data, [
+            encode_message(MESSAGES[2], 1), encode_message(MESSAGES[2], 0)])
@@ -0,0 +1,300 @@
+#
+# transfer.py
+#
+# Copyright (C) 2026 agent <agent@local>
+#
+# Deluge is free software.
+#
+# You may redistribute it and/or modify it under the terms of the
+# GNU General Public License, as published by the Free Software
+# Foundation; either version 3 of the License, or (at your option)
+# any later version.
+#
+# deluge is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with deluge.    If not, write to:
+# 	The Free Software Foundation, Inc.,
+# 	51 Franklin Street, Fifth Floor
+# 	Boston, MA  02110-1301, USA.
+#
+#    In addition, as a special exception, the copyright holders give
+#    permission to link the code of portions of this program with the OpenSSL
+#    library.
+#    You must obey the GNU General Public License in all respects for all of
+#    the code used other than OpenSSL. If you modify file(s) with this
+#    exception, you may extend this exception to your version of the file(s),
+#    but you are not obligated to do so. If you do not wish to do so, delete
+#    this exception statement from your version. If you delete this exception
+#    statement from all source files in the program, then also delete it here.
+#
+#
+
+"""
+The transfer module handles the encoding of the messages exchanged between the
+daemon and it's clients.
+
+Every message is rencoded and zlib compressed.  Since version 1 of the
+protocol, a message is also prefixed with a header holding a magic byte, the
+protocol version and the length of the compressed payload::
+
+    "D" | version (1 byte) | payload length (4 bytes, network order) | payload
+
+With the legacy format (version 0) only the compressed payload is sent and the
+receiving end can only tell that a message is complete by trying to decode it
+every time more data arrives.  A zlib stream never starts with "D", so both
+formats can be told apart by the first byte of a message.
+
+Each end sends legacy messages until it receives a framed message from the
+other end.  A client announces that it understands framed messages by passing
+`protocol_version` to "daemon.info" or "daemon.login", which makes the daemon
+answer with a framed message.
+
+"""
+
+import zlib
+import struct
+import logging
+
+from twisted.internet.protocol import Protocol
+
+try:
+    import rencode
+except ImportError:
+    import deluge.rencode as rencode
+
+log = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+
+MESSAGE_HEADER_MAGIC = "D"
+MESSAGE_HEADER_FORMAT = "!cBI"
+MESSAGE_HEADER_SIZE = struct.calcsize(MESSAGE_HEADER_FORMAT)
+
+def encode_message(data, version=PROTOCOL_VERSION):
+    """
+    Encodes a message to be sent to the other end.
+
+    :param data: the message
+    :type data: object
+    :param version: the protocol version to encode the message with, 0 for
+        the legacy format
+    :type version: int
+
+    :returns: the encoded message
+    :rtype: str
+
+    """
+    return frame_payload(encode_payload(data), version)
+
+def encode_payload(data):
+    """
+    Encodes the payload of a message, the same payload can be framed for any
+    protocol version with :func:`frame_payload`.
+
+    :param data: the message
+    :type data: object
+
+    :returns: the rencoded and compressed message
+    :rtype: str
+
+    """
+    return zlib.compress(rencode.dumps(data))
+
+def frame_payload(payload, version=PROTOCOL_VERSION):
+    """
+    Frames an encoded payload as a message of the protocol version.
+
+    :param payload: the payload, see :func:`encode_payload`
+    :type payload: str
+    :param version: the protocol version, 0 for the legacy format
+    :type version: int
+
+    :returns: the encoded message
+    :rtype: str
+
+    """
+    if not version:
+        return payload
+    return struct.pack(MESSAGE_HEADER_FORMAT, MESSAGE_HEADER_MAGIC, version,
+                       len(payload)) + payload
+
+class DelugeTransferProtocol(Protocol):
+    """
+    Base of the DelugeRPC protocols, it takes care of encoding the messages
+    sent and of buffering and decoding the messages received.  Each complete
+    message is passed to :meth:`message_received`, which subclasses need to
+    implement.
+
+    """
+    # The protocol version used for the messages sent to the other end
+    transfer_version = 0
+
+    def __init__(self):
+        # The data received which hasn't been decoded yet, it starts at
+        # _offset while the messages in it are being decoded
+        self._buffer = ""
+        self._offset = 0
+        # The data received since the buffer was last decoded, it's only
+        # joined to the buffer once _needed bytes are available
+        self._chunks = []
+        self._buffered = 0
+        self._needed = 0
+        # The header of the framed message being received
+        self._message_header = None
+
+    def transfer_message(self, data):
+        """
+        Encodes and sends a message to the other end.
+
+        :param data: the message
+        :type data: object
+
+        :returns: the number of bytes written
+        :rtype: int
+
+        """
+        return self.transfer_payload(encode_payload(data))
+
+    def transfer_payload(self, payload):
+        """
+        Sends an already encoded message to the other end, this allows
+        encoding a message once to send it to several.
+
+        :param payload: the encoded message, see :func:`encode_payload`
+        :type payload: str
+
+        :returns: the number of bytes written
+        :rtype: int
+
+        """
+        data = frame_payload(payload, self.transfer_version)
+        self.transport.write(data)
+        return len(data)
+
+    def set_transfer_version(self, version):
+        """
+        Sets the protocol version used for the messages sent to the other end.
+
+        :param version: the highest version the other end understands
+        :type version: int
+
+        """
+        self.transfer_version = min(version, PROTOCOL_VERSION)
+
+    def dataReceived(self, data):
+        """
+        This method is called whenever data is received.  The data is buffered
+        until a message is complete and it is only decoded then.
+
+        :param data: the data received
+        :type data: str
+
+        """
+        self._chunks.append(data)
+        self._buffered += len(data)
+        if self._buffered < self._needed:
+            # The message being received isn't complete yet
+            return
+
+        self._chunks.insert(0, self._buffer)
+        self._buffer = "".join(self._chunks)
+        self._chunks = []
+        self._needed = 0
+
+        while self._offset < len(self._buffer):
+            if self._message_header is None:
+                if self._buffer[self._offset] != MESSAGE_HEADER_MAGIC:
+                    if not self._legacy_data_received():
+                        # Any more data could complete the legacy message
+                        self._needed = len(self._buffer) + 1
+                        break
+                    continue
+
+                if len(self._buffer) - self._offset < MESSAGE_HEADER_SIZE:
+                    self._needed = MESSAGE_HEADER_SIZE
+                    break
+                self._message_header = struct.unpack(
+                    MESSAGE_HEADER_FORMAT, self._consume(MESSAGE_HEADER_SIZE))
+
+            magic, version, length = self._message_header
+            if len(self._buffer) - self._offset < length:
+                # Wait for the rest of the message
+                self._needed = length
+                break
+
+            payload = self._consume(length)
+            self._message_header = None
+
+            if version > PROTOCOL_VERSION:
+                log.warning("Received message with unsupported protocol "
+                            "version %s", version)
+                continue
+
+            try:
+                message = rencode.loads(zlib.decompress(payload))
+            except Exception, e:
+                log.warning("Received invalid message: %s", e)
+                continue
+
+            if version > self.transfer_version:
+                # The other end understands framed messages
+                self.set_transfer_version(version)
+            self.message_received(message)
+
+        # Drop the decoded messages from the buffer, once per call
+        if self._offset:
+            self._buffer = self._buffer[self._offset:]
+            self._offset = 0
+        self._buffered = len(self._buffer)
+
+    def message_received(self, message):
+        """
+        This method is called for every complete message received.
+
+        :param message: the decoded message
+        :type message: object
+
+        """
+        raise NotImplementedError
+
+    def _consume(self, length):
+        """
+        Returns the next `length` bytes of the buffer and moves past them.
+        """
+        data = self._buffer[self._offset:self._offset + length]
+        self._offset += length
+        return data
+
+    def _legacy_data_received(self):
+        """
+        Decodes the legacy messages at the start of the buffer.
+
+        :returns: True if the buffer now starts at a framed message or is
+            empty, False if the legacy message is not complete yet
+        :rtype: bool
+
+        """
+        data = self._buffer[self._offset:]
+        self._offset = 0
+        while data and data[0] != MESSAGE_HEADER_MAGIC:
+            dobj = zlib.decompressobj()
+            try:
+                message = rencode.loads(dobj.decompress(data))
+                if not dobj.unused_data:
+                    # The payload can be decoded before the end of the zlib
+                    # stream has been received, so make sure it's complete.
+                    zlib.decompress(data)
+            except Exception:
+                # This could be cut-off data, so we keep it in the buffer and
+                # try again on the next dataReceived()
+                self._buffer = data
+                return False
+            data = dobj.unused_data
+            self.message_received(message)
+
+        self._buffer = data
+        return True
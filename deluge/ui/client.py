@@ -35,18 +35,14 @@
 #
 
 import logging
-from twisted.internet.protocol import Protocol, ClientFactory
+from twisted.internet.protocol import ClientFactory
 from twisted.internet import reactor, ssl, defer
-try:
-    import rencode
-except ImportError:
-    import deluge.rencode as rencode
-
-import zlib
+from twisted.python.failure import Failure
 
 import deluge.common
 from deluge import error
 from deluge.event import known_events
+from deluge.transfer import DelugeTransferProtocol, PROTOCOL_VERSION
 
 if deluge.common.windows_check():
     import win32api
@@ -56,6 +52,10 @@
 RPC_RESPONSE = 1
 RPC_ERROR = 2
 RPC_EVENT = 3
+RPC_EVENT_BATCH = 4
+
+# The default maximum of requests waiting on a response from the daemon
+MAX_REQUESTS_IN_FLIGHT = 100
 
 log = logging.getLogger(__name__)
 
@@ -104,11 +104,10 @@ def format_message(self):
 
         return (self.request_id, self.method, self.args, self.kwargs)
 
-class DelugeRPCProtocol(Protocol):
+class DelugeRPCProtocol(DelugeTransferProtocol):
 
     def connectionMade(self):
         self.__rpc_requests = {}
-        self.__buffer = None
         # Set the protocol in the daemon so it can send data
         self.factory.daemon.protocol = self
         # Get the address of the daemon that we've connected to
@@ -124,94 +123,98 @@ def dataReceived(self, data):
         """
         This method is called whenever we receive data from the daemon.
 
-        :param data: a zlib compressed and rencoded string that should be either
-            a RPCResponse, RCPError or RPCSignal
+        :param data: the data received from the daemon
         """
-        if self.__buffer:
-            # We have some data from the last dataReceived() so lets prepend it
-            data = self.__buffer + data
-            self.__buffer = None
+        # Increase the byte counter
+        self.factory.bytes_recv += len(data)
+        DelugeTransferProtocol.dataReceived(self, data)
 
-        while data:
-            # Increase the byte counter
-            self.factory.bytes_recv += len(data)
+    def handle_event(self, event, args):
+        """
+        Runs the handlers registered for an event received from the daemon.
 
-            dobj = zlib.decompressobj()
-            try:
-                request = rencode.loads(dobj.decompress(data))
-            except Exception, e:
-                #log.debug("Received possible invalid message (%r): %s", data, e)
-                # This could be cut-off data, so we'll save this in the buffer
-                # and try to prepend it on the next dataReceived()
-                self.__buffer = data
-                return
+        :param event: the name of the event
+        :type event: str
+        :param args: the arguments of the event
+        :type args: list
+
+        """
+        #log.debug("Received RPCEvent: %s", event)
+        if event in self.factory.event_handlers:
+            for handler in self.factory.event_handlers[event]:
+                reactor.callLater(0, handler, *args)
+
+    def message_received(self, request):
+        """
+        This method is called for every message received from the daemon.
+
+        :param request: a RPCResponse, RCPError or RPCSignal
+        """
+        if type(request) is not tuple:
+            log.debug("Received invalid message: type is not tuple")
+            return
+
+        if request and request[0] == RPC_EVENT_BATCH:
+            # Several events sent by the daemon in one message
+            for event, args in request[1]:
+                self.handle_event(event, args)
+            return
+
+        if len(request) < 3:
+            log.debug("Received invalid message: number of items in "
+                      "response is %s", len(3))
+            return
+
+        message_type = request[0]
+
+        if message_type == RPC_EVENT:
+            self.handle_event(request[1], request[2])
+            return
+
+        request_id = request[1]
+
+        # We get the Deferred object for this request_id to either run the
+        # callbacks or the errbacks dependent on the response from the daemon.
+        d = self.factory.daemon.pop_deferred(request_id)
+
+        if message_type == RPC_RESPONSE:
+            # Run the callbacks registered with this Deferred object
+            d.callback(request[2])
+        elif message_type == RPC_ERROR:
+            # Recreate exception and errback'it
+            exception_cls = getattr(error, request[2])
+            exception = exception_cls(*request[3], **request[4])
+
+            # Ideally we would chain the deferreds instead of instance
+            # checking just to log them. But, that would mean that any
+            # errback on the fist deferred should returns it's failure
+            # so it could pass back to the 2nd deferred on the chain. But,
+            # that does not always happen.
+            # So, just do some instance checking and just log rpc error at
+            # diferent levels.
+            r = self.__rpc_requests[request_id]
+            msg = "RPCError Message Received!"
+            msg += "\n" + "-" * 80
+            msg += "\n" + "RPCRequest: " + r.__repr__()
+            msg += "\n" + "-" * 80
+            if isinstance(exception, error.WrappedException):
+                msg += "\n" + exception.type + "\n" + exception.message + ": "
+                msg += exception.traceback
             else:
-                data = dobj.unused_data
+                msg += "\n" + request[5] + "\n" + request[2] + ": "
+                msg += str(exception)
+            msg += "\n" + "-" * 80
 
-            if type(request) is not tuple:
-                log.debug("Received invalid message: type is not tuple")
-                return
-            if len(request) < 3:
-                log.debug("Received invalid message: number of items in "
-                          "response is %s", len(3))
-                return
+            if not isinstance(exception, error._ClientSideRecreateError):
+                # Let's log these as errors
+                log.error(msg)
+            else:
+                # The rest just get's logged in debug level, just to log
+                # what's happening
+                log.debug(msg)
 
-            message_type = request[0]
-
-            if message_type == RPC_EVENT:
-                event = request[1]
-                #log.debug("Received RPCEvent: %s", event)
-                # A RPCEvent was received from the daemon so run any handlers
-                # associated with it.
-                if event in self.factory.event_handlers:
-                    for handler in self.factory.event_handlers[event]:
-                        reactor.callLater(0, handler, *request[2])
-                continue
-
-            request_id = request[1]
-
-            # We get the Deferred object for this request_id to either run the
-            # callbacks or the errbacks dependent on the response from the daemon.
-            d = self.factory.daemon.pop_deferred(request_id)
-
-            if message_type == RPC_RESPONSE:
-                # Run the callbacks registered with this Deferred object
-                d.callback(request[2])
-            elif message_type == RPC_ERROR:
-                # Recreate exception and errback'it
-                exception_cls = getattr(error, request[2])
-                exception = exception_cls(*request[3], **request[4])
-
-                # Ideally we would chain the deferreds instead of instance
-                # checking just to log them. But, that would mean that any
-                # errback on the fist deferred should returns it's failure
-                # so it could pass back to the 2nd deferred on the chain. But,
-                # that does not always happen.
-                # So, just do some instance checking and just log rpc error at
-                # diferent levels.
-                r = self.__rpc_requests[request_id]
-                msg = "RPCError Message Received!"
-                msg += "\n" + "-" * 80
-                msg += "\n" + "RPCRequest: " + r.__repr__()
-                msg += "\n" + "-" * 80
-                if isinstance(exception, error.WrappedException):
-                    msg += "\n" + exception.type + "\n" + exception.message + ": "
-                    msg += exception.traceback
-                else:
-                    msg += "\n" + request[5] + "\n" + request[2] + ": "
-                    msg += str(exception)
-                msg += "\n" + "-" * 80
-
-                if not isinstance(exception, error._ClientSideRecreateError):
-                    # Let's log these as errors
-                    log.error(msg)
-                else:
-                    # The rest just get's logged in debug level, just to log
-                    # what's happening
-                    log.debug(msg)
-
-                d.errback(exception)
-            del self.__rpc_requests[request_id]
+            d.errback(exception)
+        del self.__rpc_requests[request_id]
 
     def send_request(self, request):
         """
@@ -220,15 +223,25 @@ def send_request(self, request):
         :param request: RPCRequest
 
         """
-        # Store the DelugeRPCRequest object just in case a RPCError is sent in
-        # response to this request.  We use the extra information when printing
-        # out the error for debugging purposes.
-        self.__rpc_requests[request.request_id] = request
-        #log.debug("Sending RPCRequest %s: %s", request.request_id, request)
-        # Send the request in a tuple because multiple requests can be sent at once
-        data = zlib.compress(rencode.dumps((request.format_message(),)))
-        self.factory.bytes_sent += len(data)
-        self.transport.write(data)
+        self.send_requests([request])
+
+    def send_requests(self, requests):
+        """
+        Sends multiple RPCRequests to the server in a single message.
+
+        :param requests: the RPCRequests to send
+        :type requests: list
+
+        """
+        # Send the requests in a tuple because multiple requests can be sent at once
+        self.factory.bytes_sent += self.transfer_message(
+            tuple([request.format_message() for request in requests]))
+        for request in requests:
+            # Store the DelugeRPCRequest object just in case a RPCError is sent
+            # in response to this request.  We use the extra information when
+            # printing out the error for debugging purposes.
+            self.__rpc_requests[request.request_id] = request
+            #log.debug("Sending RPCRequest %s: %s", request.request_id, request)
 
 class DelugeRPCClientFactory(ClientFactory):
     protocol = DelugeRPCProtocol
@@ -256,6 +269,13 @@ def clientConnectionLost(self, connector, reason):
         self.daemon.port = None
         self.daemon.username = None
         self.daemon.connected = False
+        # The requests still waiting on a response will never get one
+        if self.daemon.disconnect_deferred:
+            # The disconnection was asked for, the callers don't expect the
+            # responses anymore
+            self.daemon.clear_requests()
+        else:
+            self.daemon.fail_requests(reason)
         if self.daemon.disconnect_deferred:
             self.daemon.disconnect_deferred.callback(reason.value)
 
@@ -266,11 +286,21 @@ class DaemonProxy(object):
     pass
 
 class DaemonSSLProxy(DaemonProxy):
-    def __init__(self, event_handlers={}):
+    def __init__(self, event_handlers={},
+                 max_requests_in_flight=MAX_REQUESTS_IN_FLIGHT):
         self.__factory = DelugeRPCClientFactory(self, event_handlers)
         self.__request_counter = 0
         self.__deferred = {}
 
+        # Requests made during the current reactor turn that are waiting to be
+        # sent together in one message
+        self.__pending_requests = []
+        self.__send_call = None
+        # The number of requests sent that haven't been answered yet
+        self.__requests_in_flight = 0
+        # The maximum number of requests in flight, 0 means no limit
+        self.max_requests_in_flight = max_requests_in_flight
+
         # This is set when a connection is made to the daemon
         self.protocol = None
 
@@ -315,6 +345,8 @@ def connect(self, host, port):
 
     def disconnect(self):
         log.debug("sslproxy.disconnect()")
+        if self.__send_call and self.__send_call.active():
+            self.__send_call.cancel()
         self.disconnect_deferred = defer.Deferred()
         self.__connector.disconnect()
         return self.disconnect_deferred
@@ -324,6 +356,11 @@ def call(self, method, *args, **kwargs):
         Makes a RPCRequest to the daemon.  All methods should be in the form of
         'component.method'.
 
+        The requests made during the same reactor turn are sent together in a
+        single message.  If `max_requests_in_flight` requests are already
+        waiting on a response, the request is held back until responses
+        arrive.
+
         :params method: str, the method to call in the form of 'component.method'
         :params args: the arguments to call the remote method with
         :params kwargs: the keyword arguments to call the remote method with
@@ -332,14 +369,15 @@ def call(self, method, *args, **kwargs):
             or RPCError is received from the daemon
 
         """
-        # Create the DelugeRPCRequest to pass to protocol.send_request()
+        # Create the DelugeRPCRequest to pass to protocol.send_requests()
         request = DelugeRPCRequest()
         request.request_id = self.__request_counter
         request.method = method
         request.args = args
         request.kwargs = kwargs
-        # Send the request to the server
-        self.protocol.send_request(request)
+        # Queue the request to be sent to the server
+        self.__pending_requests.append(request)
+        self.__schedule_send()
         # Create a Deferred object to return and add a default errback to print
         # the error.
         d = defer.Deferred()
@@ -362,8 +400,93 @@ def pop_deferred(self, request_id):
         :type request_id: int
 
         """
+        self.__requests_in_flight -= 1
+        if self.__pending_requests:
+            # There's room for the requests that were held back
+            self.__schedule_send()
         return self.__deferred.pop(request_id)
 
+    def __schedule_send(self):
+        if not self.__send_call or not self.__send_call.active():
+            self.__send_call = reactor.callLater(0, self.__send_pending_requests)
+
+    def __send_pending_requests(self):
+        """
+        Sends the pending requests to the daemon in one message, as long as
+        the limit of requests in flight allows it.
+        """
+        if self.max_requests_in_flight:
+            available = self.max_requests_in_flight - self.__requests_in_flight
+            if available <= 0:
+                # The requests will be sent once responses are received
+                return
+            requests = self.__pending_requests[:available]
+            del self.__pending_requests[:available]
+        else:
+            requests = self.__pending_requests
+            self.__pending_requests = []
+
+        if requests:
+            self.__requests_in_flight += len(requests)
+            try:
+                self.protocol.send_requests(requests)
+            except Exception, e:
+                # This runs from the reactor, so the callers only get to know
+                # through their Deferreds
+                log.error("Unable to send %d requests to the daemon: %s",
+                          len(requests), e)
+                self.__requests_in_flight -= len(requests)
+                failure = Failure()
+                for request in requests:
+                    self.__deferred.pop(request.request_id).errback(failure)
+                if self.__pending_requests:
+                    # The slots are free again for the requests held back
+                    self.__schedule_send()
+
+    def clear_requests(self):
+        """
+        Drops the requests which are pending or waiting on a response, their
+        Deferreds will never fire.
+
+        :returns: the Deferreds of the requests dropped {request_id: Deferred}
+        :rtype: dict
+
+        """
+        if self.__send_call and self.__send_call.active():
+            self.__send_call.cancel()
+        self.__pending_requests = []
+        self.__requests_in_flight = 0
+        deferreds = self.__deferred
+        self.__deferred = {}
+        return deferreds
+
+    def fail_requests(self, reason):
+        """
+        Fails the requests which are pending or waiting on a response, ie,
+        when the connection to the daemon is lost unexpectedly.
+
+        :param reason: the reason the requests failed
+        :type reason: twisted.python.failure.Failure
+
+        """
+        deferreds = self.clear_requests()
+        for request_id in sorted(deferreds):
+            deferreds[request_id].errback(reason)
+
+    def set_max_requests_in_flight(self, max_requests_in_flight):
+        """
+        Sets the maximum number of requests sent to the daemon that can be
+        waiting on a response.  Any other request is held back until a
+        response is received.
+
+        :param max_requests_in_flight: the maximum, 0 means no limit
+        :type max_requests_in_flight: int
+
+        """
+        self.max_requests_in_flight = max_requests_in_flight
+        if self.__pending_requests:
+            self.__schedule_send()
+
     def register_event_handler(self, event, handler):
         """
         Registers a handler function to be called when `:param:event` is received
@@ -381,7 +504,7 @@ def register_event_handler(self, event, handler):
             # that we're interested in receiving this type of event
             self.__factory.event_handlers[event] = []
             if self.connected:
-                self.call("daemon.set_event_interest", [event])
+                self.call("daemon.set_event_interest", [event], batched=True)
 
         # Only add the handler if it's not already registered
         if handler not in self.__factory.event_handlers[event]:
@@ -413,7 +536,9 @@ def on_info_fail(reason):
             log.exception(reason)
             self.daemon_info_deferred.errback(reason)
 
-        self.call("daemon.info").addCallback(on_info).addErrback(on_info_fail)
+        # Let the daemon know we understand framed messages
+        d = self.call("daemon.info", protocol_version=PROTOCOL_VERSION)
+        d.addCallback(on_info).addErrback(on_info_fail)
         return self.daemon_info_deferred
 
     def __on_connect_fail(self, reason):
@@ -435,7 +560,7 @@ def __on_login(self, result, username):
         # We need to tell the daemon what events we're interested in receiving
         if self.__factory.event_handlers:
             self.call("daemon.set_event_interest",
-                      self.__factory.event_handlers.keys())
+                      self.__factory.event_handlers.keys(), batched=True)
 
             self.call("core.get_auth_levels_mappings").addCallback(
                 self.__on_auth_levels_mappings
@@ -564,6 +689,7 @@ def __init__(self):
         self._daemon_proxy = None
         self.disconnect_callback = None
         self.__started_in_classic = False
+        self.__max_requests_in_flight = MAX_REQUESTS_IN_FLIGHT
 
     def connect(self, host="127.0.0.1", port=58846, username="", password="",
                 skip_authentication=False):
@@ -579,7 +705,8 @@ def connect(self, host="127.0.0.1", port=58846, username="", password="",
             has been established or fails
         """
 
-        self._daemon_proxy = DaemonSSLProxy(dict(self.__event_handlers))
+        self._daemon_proxy = DaemonSSLProxy(dict(self.__event_handlers),
+                                            self.__max_requests_in_flight)
         self._daemon_proxy.set_disconnect_callback(self.__on_disconnect)
 
         d = self._daemon_proxy.connect(host, port)
@@ -756,6 +883,19 @@ def __on_disconnect(self):
         if self.disconnect_callback:
             self.disconnect_callback()
 
+    def set_max_requests_in_flight(self, max_requests_in_flight):
+        """
+        Sets the maximum number of requests that can be waiting on a response
+        from the daemon, further requests are held back until responses
+        arrive.
+
+        :param max_requests_in_flight: the maximum, 0 means no limit
+        :type max_requests_in_flight: int
+        """
+        self.__max_requests_in_flight = max_requests_in_flight
+        if isinstance(self._daemon_proxy, DaemonSSLProxy):
+            self._daemon_proxy.set_max_requests_in_flight(max_requests_in_flight)
+
     def get_bytes_recv(self):
         """
         Returns the number of bytes received from the daemon.
@@ -245,6 +245,7 @@ def shutdown(self, *args, **kwargs):
 
         # Make sure the config is saved.
         self.config.save()
+        deluge.configmanager.flush()
 
     def print_rpc_stats(self):
         import time
@@ -40,6 +40,7 @@
 import pangocairo
 import logging
 from math import pi
+from deluge.common import unpack_pieces
 from deluge.configmanager import ConfigManager
 
 log = logging.getLogger(__name__)
@@ -293,7 +294,11 @@ def update_from_status(self, status):
             # Skip the pieces assignment
             return
 
-        self.set_pieces(status['pieces'], status['num_pieces'])
+        pieces = status["pieces"]
+        if isinstance(pieces, str):
+            # The daemon sends the piece states packed, 4 to a byte
+            pieces = unpack_pieces(pieces, status["num_pieces"])
+        self.set_pieces(pieces, status["num_pieces"])
         self.update()
 
     def clear(self):
@@ -52,6 +52,10 @@ class SessionProxy(component.Component):
     the status of the torrents and will try to satisfy client requests from the
     cache.
 
+    When connected to a daemon, the keys used by the torrent views are kept up
+    to date by subscribing to the status changes, which the daemon then pushes
+    with a TorrentsStatusUpdatedEvent.  Those keys never need to be fetched.
+
     """
     def __init__(self):
         log.debug("SessionProxy init..")
@@ -67,9 +71,15 @@ def __init__(self):
         # Holds the time of the last key update.. {torrent_id: {key1, time, ...}, ...}
         self.cache_times = {}
 
+        # How often, in seconds, the daemon should push status changes
+        self.status_interval = 1.0
+        # The keys kept up to date by the daemon
+        self.subscribed_keys = set()
+
         client.register_event_handler("TorrentStateChangedEvent", self.on_torrent_state_changed)
         client.register_event_handler("TorrentRemovedEvent", self.on_torrent_removed)
         client.register_event_handler("TorrentAddedEvent", self.on_torrent_added)
+        client.register_event_handler("TorrentsStatusUpdatedEvent", self.on_torrents_status_updated)
 
     def start(self):
         def on_get_session_state(torrent_ids):
@@ -89,15 +99,45 @@ def on_get_session_state(torrent_ids):
                 'queue', 'state', 'name', 'total_wanted', 'progress', 'state',
                 'download_payload_rate', 'upload_payload_rate', 'eta', 'owner'
             ]
-            self.get_torrents_status({'id': torrent_ids}, inital_keys)
+            if client.is_classicmode():
+                # There's no round-trip to save in classic mode
+                self.get_torrents_status({'id': torrent_ids}, inital_keys)
+            else:
+                self.subscribe(inital_keys)
         return client.core.get_session_state().addCallback(on_get_session_state)
 
     def stop(self):
         client.deregister_event_handler("TorrentStateChangedEvent", self.on_torrent_state_changed)
         client.deregister_event_handler("TorrentRemovedEvent", self.on_torrent_removed)
         client.deregister_event_handler("TorrentAddedEvent", self.on_torrent_added)
+        client.deregister_event_handler("TorrentsStatusUpdatedEvent", self.on_torrents_status_updated)
+        if self.subscribed_keys and client.connected():
+            client.daemon.unsubscribe_status()
+        self.subscribed_keys = set()
         self.torrents = {}
 
+    def subscribe(self, keys):
+        """
+        Subscribes to the status changes of all the torrents for `keys`.  If
+        the daemon doesn't support subscriptions, the status is fetched and
+        the keys will be polled like any other.
+
+        :param keys: the status keys
+        :type keys: list of strings
+
+        """
+        def on_subscribed(status):
+            self.subscribed_keys = set(keys)
+            self.on_torrents_status_updated(status, [])
+
+        def on_subscribe_failed(failure):
+            log.debug("Unable to subscribe to status updates: %s",
+                      failure.getErrorMessage())
+            return self.get_torrents_status({}, keys)
+
+        d = client.daemon.subscribe_status({}, keys, self.status_interval)
+        return d.addCallbacks(on_subscribed, on_subscribe_failed)
+
     def create_status_dict(self, torrent_ids, keys):
         """
         Creates a status dict from the cache.
@@ -143,6 +183,8 @@ def get_torrent_status(self, torrent_id, keys):
                 keys = self.torrents[torrent_id][1].keys()
 
             for key in keys:
+                if key in self.subscribed_keys:
+                    continue
                 if time.time() - self.cache_times[torrent_id].get(key, 0.0) > self.cache_time:
                     keys_to_get.append(key)
 
@@ -211,11 +253,15 @@ def find_torrents_to_fetch(torrent_ids):
             t = time.time()
             for torrent_id in torrent_ids:
                 torrent = self.torrents[torrent_id]
-                if t - torrent[0] > self.cache_time:
-                    to_fetch.append(torrent_id)
+                if not keys:
+                    if t - torrent[0] > self.cache_time:
+                        to_fetch.append(torrent_id)
                 else:
-                    # We need to check if a key is expired
+                    # We need to check if a key is expired, the subscribed
+                    # keys are always up to date
                     for key in keys:
+                        if key in self.subscribed_keys:
+                            continue
                         if t - self.cache_times[torrent_id].get(key, 0.0) > self.cache_time:
                             to_fetch.append(torrent_id)
                             break
@@ -265,6 +311,21 @@ def on_status(status):
                 self.cache_times[torrent_id][key] = t
         client.core.get_torrent_status(torrent_id, []).addCallback(on_status)
 
+    def on_torrents_status_updated(self, status, removed):
+        # The torrents removed, or which left the subscription's filter
+        for torrent_id in removed:
+            self.torrents.pop(torrent_id, None)
+            self.cache_times.pop(torrent_id, None)
+
+        t = time.time()
+        for torrent_id, torrent_status in status.iteritems():
+            torrent = self.torrents.setdefault(torrent_id, [t, {}])
+            torrent[0] = t
+            torrent[1].update(torrent_status)
+            cache_times = self.cache_times.setdefault(torrent_id, {})
+            for key in torrent_status:
+                cache_times[key] = t
+
     def on_torrent_removed(self, torrent_id):
         del self.torrents[torrent_id]
         del self.cache_times[torrent_id]
@@ -332,7 +332,7 @@ def register_object(self, obj, name=None):
 HOSTS_STATUS = 3
 HOSTS_INFO = 4
 
-FILES_KEYS = ["files", "file_progress", "file_priorities"]
+FILES_KEYS = ["files", "file_progress", "file_priorities", "file_progress_tree"]
 
 class EventQueue(object):
     """
@@ -571,9 +571,12 @@ def _on_got_files(self, torrent, d):
         files = torrent.get("files")
         file_progress = torrent.get("file_progress")
         file_priorities = torrent.get("file_priorities")
+        # Daemons which don't provide the directories' progress ignore the key
+        progress_tree = torrent.get("file_progress_tree")
 
         paths = []
         info = {}
+        dirs = []
         for index, torrent_file in enumerate(files):
             path = torrent_file["path"]
             paths.append(path)
@@ -586,20 +589,30 @@ def _on_got_files(self, torrent, d):
             # update the directory info
             dirname = os.path.dirname(path)
             while dirname:
-                dirinfo = info.setdefault(dirname, {})
-                dirinfo["size"] = dirinfo.get("size", 0) + torrent_file["size"]
-                if "priority" not in dirinfo:
-                    dirinfo["priority"] = torrent_file["priority"]
-                else:
-                    if dirinfo["priority"] != torrent_file["priority"]:
-                        dirinfo["priority"] = 9
-
-                progresses = dirinfo.setdefault("progresses", [])
-                progresses.append(torrent_file["size"] * (torrent_file["progress"] / 100.0))
-                dirinfo["progress"] = float(sum(progresses)) / dirinfo["size"] * 100
-                dirinfo["path"] = dirname
+                dirinfo = info.get(dirname)
+                if dirinfo is None:
+                    dirinfo = info[dirname] = {
+                        "path": dirname,
+                        "size": 0,
+                        "priority": torrent_file["priority"],
+                        "done": 0.0
+                    }
+                    dirs.append(dirinfo)
+                dirinfo["size"] += torrent_file["size"]
+                if dirinfo["priority"] != torrent_file["priority"]:
+                    dirinfo["priority"] = 9
+                dirinfo["done"] += torrent_file["size"] * torrent_file["progress"]
                 dirname = os.path.dirname(dirname)
 
+        for dirinfo in dirs:
+            done = dirinfo.pop("done")
+            if progress_tree and dirinfo["path"] in progress_tree:
+                dirinfo["progress"] = progress_tree[dirinfo["path"]]
+            elif dirinfo["size"]:
+                dirinfo["progress"] = done / dirinfo["size"]
+            else:
+                dirinfo["progress"] = 0.0
+
         def walk(path, item):
             if item["type"] == "dir":
                 item.update(info[path])
@@ -716,12 +729,14 @@ def add_torrents(self, torrents):
             }])
 
         """
+        torrent_files = []
         for torrent in torrents:
             filename = os.path.basename(torrent["path"])
             fdump = base64.encodestring(open(torrent["path"], "rb").read())
             log.info("Adding torrent from file `%s` with options `%r`",
                      filename, torrent["options"])
-            client.core.add_torrent_file(filename, fdump, torrent["options"])
+            torrent_files.append((filename, fdump, torrent["options"]))
+        client.core.add_torrent_files(torrent_files)
         return True
 
     @export